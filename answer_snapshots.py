@@ -0,0 +1,144 @@
+"""
+Pre-rendered answers per vendor, refreshed only when that vendor changes
+
+Most questions ask for one of a few fixed views of one vendor's orders: the
+summary or detailed listing, payment status, order dates, items or the
+total. AnswerSnapshots keeps those answers rendered for each vendor with an
+ETag, so answering is a dictionary lookup and a client that already holds
+the answer can be sent a 304. Inserting an order re-renders only the
+snapshot of the vendor it belongs to. Any other change to the data (a bulk
+load, archiving, a new index generation in a worker) shows up as a new
+data version and drops every snapshot; they are rendered again on next use.
+"""
+
+import hashlib
+import threading
+from typing import Any, Callable, Dict, Iterable
+
+
+# Views kept rendered for every vendor (the answer intents of _answer_vendor_query)
+PRERENDERED_VIEWS = ('summary', 'details', 'payment_status', 'dates', 'items', 'total', 'orders')
+
+
+def answer_etag(text: str) -> str:
+    """ETag (unquoted) of an answer's text; equal answers get equal tags in every process"""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class RenderedAnswer(str):
+    """Answer text carrying its ETag and the number of orders it lists"""
+
+    def __new__(cls, text: str, shown: int = 0):
+        answer = super().__new__(cls, text)
+        answer.etag = answer_etag(text)
+        answer.shown = shown
+        return answer
+
+
+class VendorSnapshot:
+    """One vendor's orders and the answers rendered from them"""
+
+    __slots__ = ('vendor', 'results', 'answers')
+
+    def __init__(self, vendor: str, results: Dict[str, Any], answers: Dict[str, RenderedAnswer]):
+        self.vendor = vendor
+        self.results = results
+        self.answers = answers
+
+    def approx_bytes(self) -> int:
+        return (sum(2 * len(answer) + 120 for answer in self.answers.values())
+                + 600 * len(self.results.get('ids') or []))
+
+
+class AnswerSnapshots:
+    """Vendor snapshots valid for one data version"""
+
+    def __init__(self, render: Callable[[str, Dict[str, Any]], Dict[str, RenderedAnswer]]):
+        """
+        Args:
+            render: Renders every view of a vendor from its orders (collection.get() shape)
+        """
+        self.render = render
+        self.renders = 0
+        self._snapshots: Dict[str, VendorSnapshot] = {}
+        self._version: Any = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
+
+    def _render(self, vendor: str, results: Dict[str, Any]) -> VendorSnapshot:
+        self.renders += 1
+        return VendorSnapshot(vendor, results, self.render(vendor, results))
+
+    def get(self, vendor: str, version: Any, fetch: Callable[[], Dict[str, Any]]) -> VendorSnapshot:
+        """
+        A vendor's snapshot at a data version, rendered on a miss
+
+        Args:
+            vendor: Vendor name
+            version: Current data version; snapshots of other versions are dropped
+            fetch: Reads the vendor's orders when the snapshot has to be rendered
+        """
+        with self._lock:
+            if version != self._version:
+                self._snapshots.clear()
+                self._version = version
+            snapshot = self._snapshots.get(vendor)
+        if snapshot is not None:
+            return snapshot
+
+        snapshot = self._render(vendor, fetch())
+        with self._lock:
+            if version == self._version:
+                self._snapshots[vendor] = snapshot
+        return snapshot
+
+    def order_added(self, vendor: str, old_version: Any, new_version: Any, order_id: str,
+                    metadata: Dict[str, Any], document: str):
+        """
+        Fold one inserted order into its vendor's snapshot
+
+        Only that vendor is re-rendered (from its cached orders plus the new
+        one); every other snapshot carries over to the new version. If the
+        snapshots were not at old_version, something else changed as well
+        and they are all dropped.
+        """
+        with self._lock:
+            if self._version != old_version:
+                self._snapshots.clear()
+                self._version = new_version
+                return
+            self._version = new_version
+            snapshot = self._snapshots.pop(vendor, None)
+        if snapshot is None:
+            return
+
+        results = snapshot.results
+        refreshed = self._render(vendor, {
+            'ids': list(results['ids']) + [order_id],
+            'metadatas': list(results['metadatas']) + [metadata],
+            'documents': list(results.get('documents') or []) + [document],
+        })
+        with self._lock:
+            if self._version == new_version:
+                self._snapshots[vendor] = refreshed
+
+    def vendors_changed(self, vendors: Iterable[str], old_version: Any, new_version: Any):
+        """Drop the snapshots of vendors whose orders changed; the rest carry over to new_version"""
+        with self._lock:
+            if self._version != old_version:
+                self._snapshots.clear()
+            else:
+                for vendor in vendors:
+                    self._snapshots.pop(vendor, None)
+            self._version = new_version
+
+    def clear(self, bytes_to_free: int = 0):
+        """Drop every snapshot (they are rendered again on next use)"""
+        with self._lock:
+            self._snapshots.clear()
+
+    def approx_bytes(self) -> int:
+        with self._lock:
+            return sum(snapshot.approx_bytes() for snapshot in self._snapshots.values())
@@ -1,14 +1,96 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, Response
 from rag_system import initialize_database
+from answer_snapshots import PRERENDERED_VIEWS
+from session_cache import SessionStore
+from validation import validate_order
+from maintenance import QueryLog, parse_schedules, schedule_maintenance
 from datetime import datetime
 import os
+import threading
 
 app = Flask(__name__)
 
-# Initialize RAG system
-print("Initializing RAG system for web server...")
-rag = initialize_database(interactive=False)
-print("Web server RAG system ready!")
+# RAG system, created on startup (or set by serve.py for the multi-process mode)
+rag = None
+_rag_lock = threading.Lock()
+
+# Conversation context per browser tab, so follow-up questions work (per process, not shared by serve.py workers)
+sessions = SessionStore()
+
+# Background maintenance and the query log it warms caches from
+query_log = None
+maintenance = None
+
+
+def get_rag():
+    """Get the RAG system, initializing it on first use"""
+    global rag
+    if rag is None:
+        with _rag_lock:
+            if rag is None:
+                print("Initializing RAG system for web server...")
+                rag_system = initialize_database(interactive=False,
+                                                 memory_budget_mb=float(os.environ.get('MEMORY_BUDGET_MB', 512)))
+                rag_system.archive_after_days = float(os.environ.get('ARCHIVE_AFTER_DAYS',
+                                                                     rag_system.archive_after_days))
+                setup_rag(rag_system)
+                print("Web server RAG system ready!")
+    return rag
+
+
+def setup_rag(rag_system, schedules=None, cpu_budget=None, jobs=None):
+    """
+    Prepare rag_system for serving and make it the app's RAG system
+    
+    Warms the suggestion index and pre-rendered answers, accounts sessions in
+    its memory budget and starts background maintenance (see
+    start_maintenance for the arguments). get_rag() does this on first use;
+    serve.py and loadtest.py call it with the system they built.
+    """
+    global rag
+    rag_system.get_suggestion_index()
+    rag_system.prerender_answers()
+    register_sessions(rag_system)
+    start_maintenance(rag_system, schedules, cpu_budget, jobs)
+    rag = rag_system
+    return rag_system
+
+
+def register_sessions(rag_system):
+    """Account conversation sessions in the RAG system's memory budget"""
+    rag_system.memory.register('sessions', sessions.approx_bytes, sessions.shrink, rebuild_seconds=5.0)
+
+
+def start_maintenance(rag_system, schedules=None, cpu_budget=None, jobs=None):
+    """
+    Start background maintenance for rag_system
+    
+    Schedules default to the MAINTENANCE_SCHEDULE environment variable
+    (e.g. "compact=6h,warm_cache=15m") and the CPU budget to
+    MAINTENANCE_CPU_BUDGET (fraction of one core, default 0.25).
+    """
+    global query_log, maintenance
+    if schedules is None:
+        schedules = parse_schedules(os.environ.get('MAINTENANCE_SCHEDULE', ''))
+    if cpu_budget is None:
+        cpu_budget = float(os.environ.get('MAINTENANCE_CPU_BUDGET', 0.25))
+    query_log = QueryLog(os.path.join(rag_system.db_path, "query_log.jsonl"))
+    maintenance = schedule_maintenance(rag_system, query_log, schedules, cpu_budget=cpu_budget, jobs=jobs)
+
+
+def etag_response(payload, etag):
+    """
+    JSON response tagged with etag, or 304 Not Modified if the client already has it
+    
+    Only for GET endpoints: a conditional response to a POST is not valid HTTP.
+    """
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(payload)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 @app.route('/')
 def home():
@@ -24,6 +106,9 @@ def query():
     if not user_query:
         return jsonify({'error': 'No query provided'}), 400
     
+    session = sessions.get(data.get('session_id'))
+    get_rag().memory.touch('sessions')
+    
     # Process query using RAG system
     try:
         # Check for conversational phrases (simple version for web)
@@ -34,13 +119,72 @@ def query():
         if clean_query in conversational_phrases or (len(clean_query) < 5 and any(g in clean_query for g in ['hi', 'hey'])):
             answer = "😊 Hello! I'm your Sakthi Infra Tech Assistant.\n\nI can help you with:\n• Order details\n• Payment status\n• Vendor information\n\nWhat would you like to know?"
         else:
-            answer = rag.answer_query(user_query)
+            answer = get_rag().answer_query(user_query, session=session)
+            if query_log is not None:
+                query_log.record(user_query)
             
-        return jsonify({'answer': answer})
+        return jsonify({'answer': answer, 'session_id': session.session_id})
     except Exception as e:
         print(f"Error processing query: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/vendors/<vendor_name>/answers/<view>', methods=['GET'])
+def vendor_answer(vendor_name, view):
+    """A pre-rendered answer about a vendor (summary, details, payment_status, dates, items, total, orders)"""
+    if view not in PRERENDERED_VIEWS:
+        return jsonify({'error': f'Unknown view: {view}',
+                        'views': list(PRERENDERED_VIEWS)}), 404
+    rag_system = get_rag()
+    vendor = rag_system.find_vendor_in_query(vendor_name)
+    if vendor is None:
+        return jsonify({'error': f'Unknown vendor: {vendor_name}'}), 404
+    answer = rag_system.get_answer_snapshot(vendor).answers[view]
+    return etag_response({'vendor': vendor, 'view': view, 'answer': answer}, answer.etag)
+
+@app.route('/api/suggest', methods=['GET'])
+def suggest():
+    """Typeahead suggestions for what the user is typing"""
+    text = request.args.get('q', '')
+    limit = min(request.args.get('limit', 8, type=int), 20)
+    return jsonify(get_rag().suggest(text, limit))
+
+@app.route('/api/duplicates', methods=['GET'])
+def duplicates():
+    """Report clusters of duplicate orders and recently rejected duplicates"""
+    return jsonify(get_rag().duplicate_report())
+
+@app.route('/api/admin/maintenance', methods=['GET'])
+def maintenance_status():
+    """Maintenance jobs, schedules and run history"""
+    rag_system = get_rag()
+    status = {'process': maintenance.status() if maintenance else None}
+    if hasattr(rag_system, 'writer_maintenance_status'):
+        status['writer'] = rag_system.writer_maintenance_status()
+    return jsonify(status)
+
+@app.route('/api/admin/memory', methods=['GET'])
+def memory_report():
+    """Approximate memory used by each cache and index, against the budget"""
+    rag_system = get_rag()
+    report = {'process': rag_system.memory.report()}
+    if hasattr(rag_system, 'writer_memory_report'):
+        report['writer'] = rag_system.writer_memory_report()
+    return jsonify(report)
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Memory usage in Prometheus text format"""
+    return Response(get_rag().memory.metrics(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/admin/maintenance/<job>', methods=['POST'])
+def run_maintenance_job(job):
+    """Run a maintenance job now (in the background)"""
+    get_rag()
+    if maintenance is None or job not in maintenance.jobs:
+        return jsonify({'error': f'Unknown maintenance job: {job}'}), 404
+    maintenance.run_now(job)
+    return jsonify({'queued': job}), 202
+
 @app.route('/api/add', methods=['POST'])
 def add_order():
     """Handle adding new orders"""
@@ -52,8 +196,7 @@ def add_order():
         # Simplified for demo: just ensuring required fields exist
         
         # Determine Order ID (simplified)
-        current_count = rag.collection.count()
-        next_id = current_count + 1
+        next_id = get_rag().next_order_id()
         
         # Prepare order data with defaults
         order_data = {
@@ -83,26 +226,41 @@ def add_order():
             'quality_check_status': "Pending"
         }
         
-        # Calculate totals
+        # Calculate totals (18% GST split evenly into CGST and SGST)
         taxable = order_data['quantity'] * order_data['unit_price']
-        tax = taxable * 0.18 # 18% GST assumption
-        total = taxable + tax
+        cgst = sgst = round(taxable * 0.09, 2)
         
         order_data['taxable_amount'] = taxable
-        order_data['total_tax'] = tax
-        order_data['total_invoice_amount'] = total
+        order_data['cgst_rate'] = 9
+        order_data['cgst_amount'] = cgst
+        order_data['sgst_rate'] = 9
+        order_data['sgst_amount'] = sgst
+        order_data['total_tax'] = cgst + sgst
+        order_data['total_invoice_amount'] = taxable + cgst + sgst
         
-        # Add to RAG
-        success = rag.add_new_order(order_data)
+        # Normalise dates and enums; refuse malformed orders
+        order_data, errors = validate_order(order_data)
+        if errors:
+            return jsonify({'success': False, 'errors': errors,
+                            'error': 'Invalid order: ' + '; '.join(errors)}), 400
+        
+        # Add to RAG; likely duplicates are refused unless the client confirms them
+        on_duplicate = 'flag' if data.get('allow_duplicate') else 'reject'
+        success, duplicate = get_rag().try_add_order(order_data, on_duplicate=on_duplicate)
         
         if success:
             return jsonify({'success': True, 'order_id': next_id})
-        else:
-            return jsonify({'success': False, 'error': 'Failed to add to database'}), 500
+        
+        if duplicate:
+            original_id = duplicate['duplicate_of'].replace('order_', '')
+            return jsonify({'success': False, 'duplicate_of': original_id,
+                            'error': f'This looks like a duplicate of order {original_id}'}), 409
+        return jsonify({'success': False, 'error': 'Failed to add to database'}), 500
             
     except Exception as e:
         print(f"Error adding order: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
 if __name__ == '__main__':
+    get_rag()
     app.run(debug=True, port=5000)
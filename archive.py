@@ -0,0 +1,278 @@
+"""
+Cold storage tier: archived orders in compressed Parquet files
+
+Old, fully paid orders are rarely asked about, so they are moved out of the
+vector index into zstd-compressed Parquet files partitioned by order month
+(orders/month=YYYY-MM/part-*.parquet). A summary table keeps per vendor,
+item, month and payment status aggregates, so totals and item lists still
+cover every order without reading the archive, and an id file lists every
+archived order so ingest checks never scan it. Questions about archived
+periods scan it with Arrow: only the months in scope are opened, only the
+requested columns are read, and filters run over whole columns at a time.
+"""
+
+import functools
+import operator
+import os
+import shutil
+import threading
+import uuid
+from typing import Dict, List, Optional, Set
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from order_store import order_number
+
+
+NUMERIC_COLUMNS = ('quantity', 'unit_price', 'taxable_amount', 'cgst_rate', 'cgst_amount',
+                   'sgst_rate', 'sgst_amount', 'total_tax', 'total_invoice_amount')
+
+SUMMARY_KEYS = ['vendor_name', 'item_name', 'month', 'payment_status']
+SUMMARY_VALUES = ['orders', 'quantity', 'taxable_amount', 'total_tax', 'total_invoice_amount']
+
+
+def _normalise(orders: pd.DataFrame) -> pd.DataFrame:
+    """Numbers as float64, everything else as strings, so every file has the same schema"""
+    orders = orders.copy()
+    for column in orders.columns:
+        if column in NUMERIC_COLUMNS:
+            orders[column] = pd.to_numeric(orders[column], errors="coerce").astype("float64")
+        else:
+            values = orders[column]
+            orders[column] = values.where(values.notna(), "").astype(str)
+    return orders
+
+
+class OrderArchive:
+    """Month-partitioned Parquet archive of orders with a summary table"""
+
+    def __init__(self, path: str, compression: str = "zstd"):
+        """
+        Args:
+            path: Archive directory (created on the first append)
+            compression: Parquet compression codec
+        """
+        self.path = path
+        self.orders_path = os.path.join(path, "orders")
+        self.summary_path = os.path.join(path, "summary.parquet")
+        self.ids_path = os.path.join(path, "ids.parquet")
+        self.compression = compression
+        self._lock = threading.Lock()
+        self._summary: Optional[pd.DataFrame] = None
+        self._summary_mtime: Optional[float] = None
+        self._totals: Dict[tuple, Dict[str, float]] = {}
+        self._ids: Optional[Set[str]] = None
+        self._max_number: Optional[int] = None
+
+    def months(self) -> List[str]:
+        """Archived order months (YYYY-MM), oldest first"""
+        try:
+            names = os.listdir(self.orders_path)
+        except FileNotFoundError:
+            return []
+        return sorted(name.split("=", 1)[1] for name in names if name.startswith("month="))
+
+    def months_in_range(self, date_from: Optional[str], date_to: Optional[str]) -> List[str]:
+        """Archived months overlapping an inclusive YYYY-MM-DD date range"""
+        low = date_from[:7] if date_from else None
+        high = date_to[:7] if date_to else None
+        return [month for month in self.months()
+                if (low is None or month >= low) and (high is None or month <= high)]
+
+    def covers(self, date_from: Optional[str], date_to: Optional[str]) -> bool:
+        """Whether any archived orders may fall in the date range"""
+        return bool(self.months_in_range(date_from, date_to))
+
+    def _files(self, months: List[str]) -> List[str]:
+        files = []
+        for month in months:
+            directory = os.path.join(self.orders_path, f"month={month}")
+            files += [os.path.join(directory, name) for name in sorted(os.listdir(directory))
+                      if name.endswith(".parquet") and not name.startswith(".")]
+        return files
+
+    def scan(self, vendor: Optional[str] = None, date_from: Optional[str] = None,
+             date_to: Optional[str] = None, columns: Optional[List[str]] = None,
+             where: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+        """
+        Read archived orders matching the filters
+
+        Args:
+            vendor: Only this vendor's orders
+            date_from: First order date (YYYY-MM-DD), inclusive
+            date_to: Last order date (YYYY-MM-DD), inclusive
+            columns: Columns to read (default: all)
+            where: Further {column: value} equality filters
+
+        Returns:
+            Matching orders, oldest first when order_date is read
+        """
+        files = self._files(self.months_in_range(date_from, date_to))
+        if not files:
+            return pd.DataFrame(columns=columns or [])
+
+        schema = pa.unify_schemas([pq.read_schema(path) for path in files])
+        if columns is not None:
+            # Columns no file has (e.g. fields added later) are left out
+            columns = [column for column in columns if column in schema.names]
+        dataset = ds.dataset(files, schema=schema, format="parquet")
+        conditions = []
+        if vendor:
+            conditions.append(ds.field('vendor_name') == vendor)
+        if date_from:
+            conditions.append(ds.field('order_date') >= date_from)
+        if date_to:
+            conditions.append(ds.field('order_date') <= date_to)
+        for column, value in (where or {}).items():
+            conditions.append(ds.field(column) == value)
+        condition = functools.reduce(operator.and_, conditions) if conditions else None
+
+        orders = dataset.to_table(columns=columns, filter=condition).to_pandas()
+        if 'order_date' in orders:
+            orders = orders.sort_values('order_date', kind="stable").reset_index(drop=True)
+        return orders
+
+    def append(self, orders: pd.DataFrame) -> int:
+        """
+        Add orders to their month partitions and to the summary table
+
+        Orders whose id is already archived are skipped, so an interrupted
+        archive run can simply be repeated.
+
+        Args:
+            orders: Full order records with an "id" column of collection ids
+
+        Returns:
+            Number of orders written
+        """
+        if orders.empty:
+            return 0
+        orders = _normalise(orders)
+        months = orders['order_date'].str[:7]
+
+        with self._lock:
+            archived = self._id_set()
+            new = ~orders['id'].isin(archived)
+            orders, months = orders[new], months[new]
+            if orders.empty:
+                return 0
+
+            for month, part in orders.groupby(months):
+                directory = os.path.join(self.orders_path, f"month={month}")
+                os.makedirs(directory, exist_ok=True)
+                name = f"part-{uuid.uuid4().hex}.parquet"
+                table = pa.Table.from_pandas(part.reset_index(drop=True), preserve_index=False)
+                # Dot-prefixed until complete, so scans never see a half-written file
+                pq.write_table(table, os.path.join(directory, "." + name), compression=self.compression)
+                os.replace(os.path.join(directory, "." + name), os.path.join(directory, name))
+
+            ids = archived | set(orders['id'])
+            self._write_ids(ids)
+
+            totals = orders.assign(month=months, orders=1)[SUMMARY_KEYS + SUMMARY_VALUES]
+            summary = pd.concat([self.summary(), totals]).groupby(SUMMARY_KEYS, as_index=False).sum()
+            pq.write_table(pa.Table.from_pandas(summary, preserve_index=False),
+                           self.summary_path + ".tmp", compression=self.compression)
+            os.replace(self.summary_path + ".tmp", self.summary_path)
+
+            self._summary, self._summary_mtime, self._totals = summary, os.path.getmtime(self.summary_path), {}
+            self._ids = ids
+            if self._max_number is not None:
+                self._max_number = max(self._max_number, max(order_number(order_id) for order_id in orders['id']))
+        return len(orders)
+
+    def _write_ids(self, ids: Set[str]):
+        os.makedirs(self.path, exist_ok=True)
+        pq.write_table(pa.table({'id': sorted(ids)}), self.ids_path + ".tmp", compression=self.compression)
+        os.replace(self.ids_path + ".tmp", self.ids_path)
+
+    def _id_set(self) -> Set[str]:
+        """Every archived id, read from the id file once (and again after another process archived)"""
+        self.summary()
+        if self._ids is None:
+            if os.path.exists(self.ids_path):
+                self._ids = set(pq.read_table(self.ids_path).column('id').to_pylist())
+            elif self.months():
+                # Archives written before the id file existed are indexed once
+                self._ids = set(self.scan(columns=['id'])['id'])
+                self._write_ids(self._ids)
+            else:
+                self._ids = set()
+        return self._ids
+
+    def summary(self) -> pd.DataFrame:
+        """Aggregates per vendor, item, month and payment status (re-read when another process changed it)"""
+        try:
+            mtime = os.path.getmtime(self.summary_path)
+        except OSError:
+            mtime = None
+        if self._summary is None or mtime != self._summary_mtime:
+            if mtime is None:
+                self._summary = pd.DataFrame({column: pd.Series(dtype="float64" if column in SUMMARY_VALUES else str)
+                                              for column in SUMMARY_KEYS + SUMMARY_VALUES})
+            else:
+                self._summary = pd.read_parquet(self.summary_path)
+            self._summary_mtime = mtime
+            self._totals = {}
+            self._ids = None
+            self._max_number = None
+        return self._summary
+
+    def totals(self, vendor: Optional[str] = None, date_from: Optional[str] = None,
+               date_to: Optional[str] = None) -> Dict[str, float]:
+        """Summed aggregates of archived orders, from the summary table"""
+        summary = self.summary()
+        key = (vendor, date_from, date_to)
+        if key not in self._totals:
+            mask = pd.Series(True, index=summary.index)
+            if vendor:
+                mask &= summary['vendor_name'] == vendor
+            if date_from:
+                mask &= summary['month'] >= date_from[:7]
+            if date_to:
+                mask &= summary['month'] <= date_to[:7]
+            self._totals[key] = {column: float(summary.loc[mask, column].sum()) for column in SUMMARY_VALUES}
+        return self._totals[key]
+
+    def max_order_number(self) -> int:
+        """Highest numeric order id archived (0 when empty), so new orders never reuse an archived id"""
+        archived = self._id_set()
+        if self._max_number is None:
+            self._max_number = max((order_number(order_id) for order_id in archived), default=0)
+        return self._max_number
+
+    def archived_ids(self, ids: List[str]) -> Set[str]:
+        """The ids that are already archived"""
+        return self._id_set() & set(ids)
+
+    def vendors(self) -> List[str]:
+        return sorted(self.summary()['vendor_name'].unique())
+
+    def items(self, vendor: Optional[str] = None) -> List[str]:
+        summary = self.summary()
+        if vendor:
+            summary = summary[summary['vendor_name'] == vendor]
+        return sorted(summary['item_name'].unique())
+
+    def __len__(self) -> int:
+        return int(self.summary()['orders'].sum())
+
+    def approx_bytes(self) -> int:
+        """Memory held by the cached summary table and id set"""
+        summary = int(self._summary.memory_usage(deep=True).sum()) if self._summary is not None else 0
+        return summary + (len(self._ids) * 100 if self._ids is not None else 0)
+
+    def clear(self):
+        """Delete every archived order and the summary table"""
+        with self._lock:
+            shutil.rmtree(self.path, ignore_errors=True)
+            self.drop_summary()
+
+    def drop_summary(self, bytes_to_free: int = 0):
+        """Forget the cached summary table (and id set); they are re-read on next use"""
+        self._summary = None
+        self._summary_mtime = None
+        self._ids = None
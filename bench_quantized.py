@@ -0,0 +1,136 @@
+"""
+Benchmark the quantized vector tier against the Chroma-only query path
+
+Reports recall@k against an exact float32 scan, mean/p95 latency and the
+RSS of a process that served the query set through that path. Each path
+runs in its own fresh subprocess, so one path's memory never shows up in
+the other's numbers; the quantized child only loads the embedding model
+and memory-maps the tier, without opening Chroma.
+
+Usage:
+    python bench_quantized.py [--k 10] [--dtype int8]
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from quantized_index import QuantizedVectorIndex
+from rag_system import initialize_database
+
+
+QUERIES = [
+    "pending payment for cotton yarn",
+    "rejected quality check dyed fabric",
+    "polyester yarn delivered by courier",
+    "knitted cloth orders paid by cheque",
+    "grey fabric partial payment",
+    "orders from Lakshmi Fabrics in 2025",
+    "Vijay Spinning RTGS payments",
+    "approved cotton yarn by road",
+    "Sri Yarn Mills pending orders",
+    "ABC Textiles dyed fabric",
+]
+
+
+def rss_mb() -> float:
+    """Current resident set size in MB (falls back to peak RSS off Linux)"""
+    try:
+        with open("/proc/self/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def timed(fn, queries):
+    """Run fn over every query, returning (results, latencies in ms)"""
+    results, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(fn(query))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return results, latencies
+
+
+def run_path(path: str, k: int, truth_file: str, index_path: str):
+    """Child process: serve the queries through one path and print its measurements as JSON"""
+    with open(truth_file, encoding="utf-8") as f:
+        truth = [set(ids) for ids in json.load(f)]
+
+    # Setup output goes to stderr; stdout carries only the result
+    stdout, sys.stdout = sys.stdout, sys.stderr
+    if path == "chroma":
+        rag = initialize_database(interactive=False)
+        search = lambda q: rag.query(q, n_results=k)['ids'][0]
+    else:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer('all-MiniLM-L6-v2')
+        index = QuantizedVectorIndex(index_path)
+        search = lambda q: index.search(model.encode(q, normalize_embeddings=True), k=k)[0]
+    rss_before = rss_mb()
+    results, latencies = timed(search, QUERIES)
+    sys.stdout = stdout
+
+    recall = np.mean([len(set(ids) & expected) / k for ids, expected in zip(results, truth)])
+    print(json.dumps({
+        'recall': float(recall),
+        'mean_ms': float(np.mean(latencies)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'rss_before_mb': rss_before,
+        'rss_mb': rss_mb(),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantized tier vs Chroma")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--dtype", default="int8", choices=["int8", "float16"])
+    parser.add_argument("--run-path", help=argparse.SUPPRESS)
+    parser.add_argument("--truth", help=argparse.SUPPRESS)
+    parser.add_argument("--index", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_path:
+        run_path(args.run_path, args.k, args.truth, args.index)
+        return
+
+    rag = initialize_database(interactive=False)
+    index = rag.build_quantized_index(dtype=args.dtype)
+
+    # Exact float32 ground truth over the same stored embeddings
+    full = np.asarray(index.full)
+    query_vectors = rag.embedding_model.encode(QUERIES, normalize_embeddings=True)
+    ids = index.ids
+    truth = [[ids[i] for i in np.argsort(-(full @ q))[:args.k]] for q in query_vectors]
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump(truth, f)
+
+    try:
+        print(f"\n{'path':<12} {'recall@' + str(args.k):>10} {'mean ms':>9} {'p95 ms':>9} "
+              f"{'RSS MB':>9} {'+queries':>9}")
+        print("-" * 63)
+        for path in ("chroma", args.dtype):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--run-path", path,
+                 "--k", str(args.k), "--truth", f.name, "--index", rag.quantized_path],
+                check=True, stdout=subprocess.PIPE, text=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{path:<12} {result['recall']:>10.3f} {result['mean_ms']:>9.2f} {result['p95_ms']:>9.2f} "
+                  f"{result['rss_mb']:>9.1f} {result['rss_mb'] - result['rss_before_mb']:>9.1f}")
+    finally:
+        os.unlink(f.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Shared pytest fixtures
+
+Tests build small systems in temporary directories with the offline hashing
+embedder, so they need no model download and never touch ./chroma_db.
+"""
+
+import os
+
+import pandas as pd
+import pytest
+
+from offline_embedder import HashingEmbedder
+from rag_system import SakthiTextilesRAG
+
+
+CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "textile_orders_5000.csv")
+
+# Manual check against the real database and model; run it as a script
+collect_ignore = ["test_vendor_detection.py"]
+
+
+@pytest.fixture(scope="session")
+def orders() -> pd.DataFrame:
+    """The shipped order data"""
+    return pd.read_csv(CSV_PATH)
+
+
+@pytest.fixture
+def make_rag(tmp_path, orders):
+    """Build a system over the first rows of the shipped data"""
+    def make(rows: int = 500, name: str = "db", **options) -> SakthiTextilesRAG:
+        rag = SakthiTextilesRAG(csv_path=CSV_PATH, db_path=str(tmp_path / name),
+                                embedder=HashingEmbedder(), **options)
+        rag.add_orders_to_db(orders.head(rows))
+        return rag
+    return make
+
+
+@pytest.fixture
+def rag(make_rag) -> SakthiTextilesRAG:
+    return make_rag()
+
+
+def new_order(orders: pd.DataFrame, order_id: int, row: int = 0, **fields) -> dict:
+    """A copy of a shipped order under a new id and invoice number"""
+    order = orders.iloc[row].to_dict()
+    order.update(order_id=order_id, invoice_no=f"INV-T{order_id}", **fields)
+    return order
@@ -0,0 +1,284 @@
+"""
+Near-duplicate order detection with MinHash signatures and LSH banding
+
+Each order is reduced to a small set of tokens over its key fields (vendor
+and item, quantity, unit price, dates, invoice number). Orders whose
+MinHash signatures agree on any whole band land in the same LSH bucket and
+become candidates; only candidates are compared field by field, so checking
+a batch costs roughly linear time instead of comparing every pair.
+"""
+
+import hashlib
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from fuzzy_index import allowed_distance, bounded_edit_distance, normalize
+
+
+# Mersenne prime for the (a * x + b) mod p permutations; token hashes stay below it
+MERSENNE_PRIME = (1 << 31) - 1
+
+ON_DUPLICATE_ACTIONS = ('reject', 'flag', 'allow')
+
+# Order fields read by order_key()
+KEY_COLUMNS = ('vendor_name', 'item_name', 'quantity', 'unit_price', 'order_date', 'invoice_date',
+               'delivery_date', 'invoice_no')
+
+
+def order_key(order: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalised key fields of an order, used for tokens and re-checks"""
+    def number(value) -> float:
+        try:
+            return round(float(value), 2)
+        except (TypeError, ValueError):
+            return 0.0
+
+    def date(value) -> str:
+        return str(value or "").strip()[:10]
+
+    return {
+        'vendor': normalize(order.get('vendor_name', '')),
+        'item': normalize(order.get('item_name', '')),
+        'quantity': number(order.get('quantity')),
+        'unit_price': number(order.get('unit_price')),
+        'order_date': date(order.get('order_date')),
+        'invoice_date': date(order.get('invoice_date')),
+        'delivery_date': date(order.get('delivery_date')),
+        'invoice_no': str(order.get('invoice_no') or "").strip().upper(),
+    }
+
+
+def order_tokens(key: Dict[str, Any]) -> List[str]:
+    """
+    Token set hashed into the MinHash signature
+
+    Vendor and item are one token (there are only a handful of each, so on
+    their own they would make most pairs look alike). The combined key token
+    lets an exact re-import share one more token than a re-keyed copy.
+    """
+    return [
+        f"vi:{key['vendor']}|{key['item']}",
+        f"q:{key['quantity']}",
+        f"p:{key['unit_price']}",
+        f"od:{key['order_date']}",
+        f"id:{key['invoice_date']}",
+        f"dd:{key['delivery_date']}",
+        f"inv:{key['invoice_no']}",
+        f"key:{key['vendor']}|{key['item']}|{key['quantity']}|{key['unit_price']}|{key['order_date']}",
+    ]
+
+
+def _names_match(a: str, b: str) -> bool:
+    """Equal names, or within the typo tolerance used for vendor lookup"""
+    limit = allowed_distance(min(len(a), len(b)))
+    return bounded_edit_distance(a, b, limit) <= limit
+
+
+def compare_keys(a: Dict[str, Any], b: Dict[str, Any]) -> Optional[str]:
+    """
+    Exact re-check of an LSH candidate pair
+
+    Two orders are duplicates when they are for the same vendor and item
+    (allowing a typo), on the same order date, with the same quantity and
+    unit price.
+
+    Returns:
+        "exact" if the invoice numbers also match, "near" if only the order
+        fields do, None if the pair is not a duplicate
+    """
+    if a['order_date'] != b['order_date']:
+        return None
+    if abs(a['quantity'] - b['quantity']) > 0.01 or abs(a['unit_price'] - b['unit_price']) > 0.01:
+        return None
+    if not (_names_match(a['vendor'], b['vendor']) and _names_match(a['item'], b['item'])):
+        return None
+    if a['invoice_no'] and a['invoice_no'] == b['invoice_no']:
+        return "exact"
+    return "near"
+
+
+class MinHasher:
+    """Vectorised MinHash over token sets"""
+
+    def __init__(self, num_perm: int = 144, seed: int = 7):
+        """
+        Args:
+            num_perm: Signature length (number of hash permutations)
+            seed: Seed for the permutation coefficients; fixed so signatures are reproducible
+        """
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self._a = rng.integers(1, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+    @staticmethod
+    def _hash_token(token: str) -> int:
+        digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "little") % MERSENNE_PRIME
+
+    def signatures(self, token_sets: List[List[str]], chunk_rows: int = 4096) -> np.ndarray:
+        """
+        Signatures for many token sets at once
+
+        Returns:
+            uint64 array of shape (len(token_sets), num_perm)
+        """
+        result = np.empty((len(token_sets), self.num_perm), dtype=np.uint64)
+        for start in range(0, len(token_sets), chunk_rows):
+            chunk = token_sets[start:start + chunk_rows]
+            lengths = np.array([len(tokens) for tokens in chunk])
+            hashes = np.fromiter((self._hash_token(t) for tokens in chunk for t in tokens),
+                                 dtype=np.uint64, count=int(lengths.sum()))
+            # (a * x + b) mod p for every token and permutation; a, x < 2**31 so nothing overflows
+            permuted = (hashes[:, None] * self._a[None, :] + self._b[None, :]) % MERSENNE_PRIME
+            offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+            result[start:start + len(chunk)] = np.minimum.reduceat(permuted, offsets, axis=0)
+        return result
+
+
+class DuplicateMatch:
+    """One order found to duplicate another"""
+
+    __slots__ = ('order_id', 'duplicate_of', 'kind')
+
+    def __init__(self, order_id: str, duplicate_of: str, kind: str):
+        self.order_id = order_id
+        self.duplicate_of = duplicate_of
+        self.kind = kind
+
+    def to_dict(self) -> Dict[str, str]:
+        return {'order_id': self.order_id, 'duplicate_of': self.duplicate_of, 'kind': self.kind}
+
+
+class DuplicateIndex:
+    """LSH index over stored orders for ingest-time duplicate checks"""
+
+    def __init__(self, bands: int = 48, rows: int = 3, seed: int = 7):
+        """
+        Args:
+            bands: Number of LSH bands
+            rows: Signature rows per band. With 48 x 3 a copy re-added with a
+                new invoice (about 45% token overlap) is a candidate 99% of
+                the time, while two different orders of the same vendor and
+                item collide about 2% of the time.
+            seed: MinHash seed
+        """
+        self.bands = bands
+        self.rows = rows
+        self.hasher = MinHasher(bands * rows, seed)
+        self._band_mixers = np.random.default_rng(seed + 1).integers(
+            1, np.iinfo(np.int64).max, size=rows, dtype=np.uint64) | np.uint64(1)
+        self._buckets: List[Dict[int, List[str]]] = [defaultdict(list) for _ in range(bands)]
+        self._keys: Dict[str, Dict[str, Any]] = {}
+        self._parent: Dict[str, str] = {}  # union-find over stored duplicates
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _band_keys(self, orders: Iterable[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[List[int]]]:
+        """Normalised keys and one bucket key per band for each order"""
+        keys = [order_key(order) for order in orders]
+        signatures = self.hasher.signatures([order_tokens(key) for key in keys])
+        # Fold each band's rows into one 64-bit bucket key (multiplication wraps around)
+        bands = signatures.reshape(len(keys), self.bands, self.rows)
+        with np.errstate(over='ignore'):
+            folded = (bands * self._band_mixers).sum(axis=2, dtype=np.uint64)
+        return keys, folded.tolist()
+
+    def _find(self, order_id: str) -> str:
+        root = order_id
+        while self._parent.get(root, root) != root:
+            root = self._parent[root]
+        self._parent[order_id] = root
+        return root
+
+    def check(self, order_ids: List[str], orders: Iterable[Dict[str, Any]]) -> List[Optional[DuplicateMatch]]:
+        """
+        Check a batch against the index and against earlier rows of the same batch
+
+        Nothing is added to the index; call add() once the batch is stored.
+
+        Returns:
+            One entry per order: the match it duplicates, or None
+        """
+        keys, all_band_keys = self._band_keys(orders)
+        batch_buckets: List[Dict[int, List[int]]] = [defaultdict(list) for _ in range(self.bands)]
+        matches: List[Optional[DuplicateMatch]] = []
+
+        for row, (order_id, key, band_keys) in enumerate(zip(order_ids, keys, all_band_keys)):
+            stored, earlier = set(), set()
+            for band, band_key in enumerate(band_keys):
+                stored.update(self._buckets[band].get(band_key, ()))
+                earlier.update(batch_buckets[band].get(band_key, ()))
+
+            match = None
+            for candidate in sorted(stored):
+                kind = compare_keys(key, self._keys[candidate])
+                if kind and candidate != order_id:
+                    match = DuplicateMatch(order_id, candidate, kind)
+                    break
+            if match is None:
+                for candidate in sorted(earlier):
+                    kind = compare_keys(key, keys[candidate])
+                    if kind:
+                        match = DuplicateMatch(order_id, order_ids[candidate], kind)
+                        break
+
+            matches.append(match)
+            for band, band_key in enumerate(band_keys):
+                batch_buckets[band][band_key].append(row)
+        return matches
+
+    def add(self, order_ids: List[str], orders: Iterable[Dict[str, Any]],
+            matches: Optional[List[Optional[DuplicateMatch]]] = None):
+        """Index stored orders; matches from check() link flagged duplicates into clusters"""
+        keys, all_band_keys = self._band_keys(orders)
+        for order_id, key, band_keys in zip(order_ids, keys, all_band_keys):
+            if order_id in self._keys:
+                continue
+            self._keys[order_id] = key
+            for band, band_key in enumerate(band_keys):
+                self._buckets[band][band_key].append(order_id)
+        for match in matches or []:
+            if match is not None and match.duplicate_of in self._keys:
+                self._parent[self._find(match.order_id)] = self._find(match.duplicate_of)
+
+    def clusters(self) -> List[List[str]]:
+        """Groups of stored order ids that duplicate each other"""
+        groups: Dict[str, List[str]] = defaultdict(list)
+        for order_id in self._parent:
+            groups[self._find(order_id)].append(order_id)
+        # Shorter ids first so "order_2" sorts before "order_1002"
+        return [sorted(group, key=lambda order_id: (len(order_id), order_id))
+                for group in groups.values() if len(group) > 1]
+
+    def approx_bytes(self) -> int:
+        """Rough memory held by keys and buckets"""
+        return len(self._keys) * (600 + self.bands * 150)
+
+    def scan(self) -> List[Tuple[str, str, str]]:
+        """
+        Find duplicate pairs among everything already indexed
+
+        Used for the report on stores filled before duplicates were checked.
+
+        Returns:
+            (order id, duplicate of, kind) for each confirmed candidate pair
+        """
+        pairs = set()
+        for buckets in self._buckets:
+            for members in buckets.values():
+                if len(members) < 2:
+                    continue
+                for i, first in enumerate(members):
+                    for second in members[i + 1:]:
+                        pairs.add((first, second))
+        found = []
+        for first, second in sorted(pairs):
+            kind = compare_keys(self._keys[first], self._keys[second])
+            if kind:
+                found.append((second, first, kind))
+                self._parent[self._find(second)] = self._find(first)
+        return found
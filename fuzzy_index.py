@@ -0,0 +1,218 @@
+"""
+Character-trigram index for typo-tolerant vendor, item and keyword lookup
+"""
+
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Generic words that appear in many vendor names and must never resolve a vendor alone
+COMMON_VENDOR_WORDS = {'textiles', 'traders', 'mills', 'fabrics', 'spinning', 'yarn', 'tech'}
+
+# Lowest confidence accepted for a fuzzy match. Intent keywords are short and
+# close to ordinary words ("state" is one edit from the alias "stat"), so
+# they need a closer match.
+MIN_SCORE = 0.7
+MIN_SCORES = {'intent': 0.82}
+
+
+def normalize(text: str) -> str:
+    """Lowercase text and collapse it to space separated alphanumeric tokens"""
+    return " ".join(TOKEN_PATTERN.findall(str(text).lower()))
+
+
+def trigrams(text: str) -> Set[str]:
+    """Return the padded character trigrams of a normalized string"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def allowed_distance(length: int) -> int:
+    """Maximum number of edits tolerated for a term of the given length"""
+    if length <= 3:
+        return 0
+    if length <= 5:
+        return 1
+    return 2
+
+
+def bounded_edit_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    Optimal string alignment distance (Levenshtein plus adjacent transpositions)
+
+    Stops early once every cell in a row exceeds max_distance.
+
+    Returns:
+        The distance, or max_distance + 1 if it is larger than max_distance
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    if a == b:
+        return 0
+
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = current[0]
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous_previous is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                value = min(value, previous_previous[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+
+    return previous[-1] if previous[-1] <= max_distance else max_distance + 1
+
+
+def _distinct_words_match(text: str, alias: str) -> bool:
+    """
+    Whether a misspelled vendor name matches on its distinctive words
+
+    "all textiles" is two edits from "abc textiles" but only shares the
+    generic word, so it is not a match. Word by word, every word of the
+    alias that is not generic must be within its own typo tolerance.
+    """
+    words, alias_words = text.split(), alias.split()
+    if len(words) != len(alias_words):
+        return True
+    for word, alias_word in zip(words, alias_words):
+        if alias_word in COMMON_VENDOR_WORDS:
+            continue
+        limit = allowed_distance(len(alias_word))
+        if bounded_edit_distance(word, alias_word, limit) > limit:
+            return False
+    return True
+
+
+class TrigramIndex:
+    """Inverted trigram index mapping (possibly misspelled) text to known terms"""
+
+    def __init__(self):
+        """Create an empty index"""
+        # alias id -> (normalized alias, target term, kind, weight)
+        self._aliases: List[Tuple[str, str, str, float]] = []
+        self._alias_ids: Dict[Tuple[str, str], int] = {}
+        self._postings: Dict[str, Set[int]] = defaultdict(set)
+        self._max_words = 1
+
+    def __len__(self) -> int:
+        return len(self._aliases)
+
+    def approx_bytes(self) -> int:
+        """Rough memory held by aliases and postings"""
+        postings = sum(len(ids) for ids in self._postings.values())
+        return 300 * len(self._aliases) + 250 * len(self._postings) + 40 * postings
+
+    def add(self, term: str, kind: str, alias: Optional[str] = None, weight: float = 1.0):
+        """
+        Register a term (or an alias that resolves to it)
+
+        Args:
+            term: Canonical value returned on a match (e.g. "Lakshmi Fabrics")
+            kind: Term category such as "vendor", "item" or "intent"
+            alias: Alternative spelling that resolves to term, defaults to term
+            weight: Multiplier applied to the confidence of alias matches
+        """
+        text = normalize(alias if alias is not None else term)
+        if not text or (text, kind) in self._alias_ids:
+            return
+
+        alias_id = len(self._aliases)
+        self._aliases.append((text, term, kind, weight))
+        self._alias_ids[(text, kind)] = alias_id
+        for gram in trigrams(text):
+            self._postings[gram].add(alias_id)
+        self._max_words = max(self._max_words, len(text.split()))
+
+    def add_vendor(self, vendor_name: str):
+        """Register a vendor name plus its significant single words as aliases"""
+        self.add(vendor_name, "vendor")
+        for word in normalize(vendor_name).split():
+            if len(word) > 4 and word not in COMMON_VENDOR_WORDS:
+                self.add(vendor_name, "vendor", alias=word, weight=0.9)
+
+    def _candidates(self, text: str, kind: str) -> List[int]:
+        """Alias ids sharing enough trigrams with text to be worth scoring"""
+        counts: Dict[int, int] = defaultdict(int)
+        for gram in trigrams(text):
+            for alias_id in self._postings.get(gram, ()):
+                if self._aliases[alias_id][2] == kind:
+                    counts[alias_id] += 1
+
+        # A single edit destroys at most three trigrams, so anything below this can't match
+        candidates = []
+        for alias_id, shared in counts.items():
+            alias = self._aliases[alias_id][0]
+            if shared >= len(trigrams(alias)) - 3 * allowed_distance(len(alias)):
+                candidates.append(alias_id)
+        return candidates
+
+    def lookup(self, text: str, kind: str) -> Tuple[Optional[str], float]:
+        """
+        Resolve a short piece of text (one or a few words) to a known term
+
+        Returns:
+            Tuple of (matched term or None, confidence between 0 and 1);
+            matches below the kind's minimum score are not returned
+        """
+        text = normalize(text)
+        best_term, best_score = None, 0.0
+        if not text:
+            return best_term, best_score
+
+        min_score = MIN_SCORES.get(kind, MIN_SCORE)
+        for alias_id in self._candidates(text, kind):
+            alias, term, _, weight = self._aliases[alias_id]
+            max_edits = allowed_distance(len(alias))
+            distance = bounded_edit_distance(text, alias, max_edits)
+            if distance > max_edits:
+                continue
+            score = weight * (1.0 - distance / max(len(alias), len(text)))
+            if score < min_score or (kind == "vendor" and distance and not _distinct_words_match(text, alias)):
+                continue
+            if score > best_score:
+                best_term, best_score = term, score
+
+        return best_term, best_score
+
+    def find_in_text(self, text: str, kind: str) -> Tuple[Optional[str], float]:
+        """
+        Find the best matching term anywhere inside free text
+
+        Every window of one up to the longest alias word count is scored,
+        so "Laksmi Fabrcs" inside a longer question still resolves.
+
+        Returns:
+            Tuple of (matched term or None, confidence between 0 and 1)
+        """
+        tokens = normalize(text).split()
+        best_term, best_score = None, 0.0
+        for size in range(self._max_words, 0, -1):
+            for start in range(len(tokens) - size + 1):
+                term, score = self.lookup(" ".join(tokens[start:start + size]), kind)
+                if score > best_score:
+                    best_term, best_score = term, score
+                    if best_score == 1.0:
+                        return best_term, best_score
+        return best_term, best_score
+
+    def has_intent(self, text: str, intent: str) -> bool:
+        """Check whether any word of text is an intent keyword or a close misspelling of it"""
+        for token in normalize(text).split():
+            alias_id = self._alias_ids.get((token, "intent"))
+            if alias_id is not None:
+                if self._aliases[alias_id][1] == intent:
+                    return True
+                continue
+            if self.lookup(token, "intent")[0] == intent:
+                return True
+        return False
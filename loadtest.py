@@ -0,0 +1,405 @@
+"""
+Offline HTTP load test for the web assistant
+
+Starts (or targets) a local server that uses the deterministic offline
+embedder, replays a weighted mix of /api/query intents and /api/add writes
+at a fixed request rate, and reports throughput, latency percentiles,
+error rates and the server's CPU and memory use.
+
+Usage:
+    # Start a throwaway server and load it in one go
+    python loadtest.py run --start-server --rps 20 --duration 30
+
+    # Same against the multi-process server with 4 workers
+    python loadtest.py run --start-server --server-workers 4 --rps 80
+
+    # Against an already running server, comparing with an earlier report
+    python loadtest.py run --url http://127.0.0.1:5050 --server-pid 1234 \\
+        --output today.json --baseline yesterday.json
+
+    # Just the offline server
+    python loadtest.py server --port 5050
+
+Started servers load the CSV into a new temporary database that is removed
+afterwards, so orders added by one run never skew the next; pass --db-path
+to keep one.
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+
+DEFAULT_MIX = "vendor_total=25,items=20,gst=15,search=30,add=10"
+
+SEARCH_TEMPLATES = [
+    "{status} payment {item} orders",
+    "{item} with rejected quality check",
+    "{item} delivered by {transport}",
+    "orders paid by {mode}",
+]
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """Parse "intent=weight,..." into a weight dict"""
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        weights[name.strip()] = float(weight)
+    unknown = set(weights) - {"vendor_total", "items", "gst", "search", "add"}
+    if unknown:
+        raise ValueError(f"Unknown intents in mix: {', '.join(sorted(unknown))}")
+    return weights
+
+
+class RequestFactory:
+    """Builds deterministic requests for each intent from values seen in the CSV"""
+
+    def __init__(self, csv_path: str, seed: int):
+        with open(csv_path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        self.vendors = sorted({row['vendor_name'] for row in rows})
+        self.gst_numbers = {row['vendor_name']: row['gst_number'] for row in rows}
+        self.items = sorted({row['item_name'] for row in rows})
+        self.statuses = sorted({row['payment_status'] for row in rows})
+        self.transports = sorted({row['transport_mode'] for row in rows})
+        self.modes = sorted({row['payment_mode'] for row in rows})
+        self.random = random.Random(seed)
+
+    def build(self, intent: str) -> Tuple[str, dict]:
+        """Return (path, JSON body) for one request of an intent"""
+        pick = self.random.choice
+        vendor = pick(self.vendors)
+        if intent == "vendor_total":
+            return "/api/query", {"query": f"Total amount spent by {vendor}"}
+        if intent == "items":
+            return "/api/query", {"query": f"What items did {vendor} order?"}
+        if intent == "gst":
+            return "/api/query", {"query": f"GST number of {vendor}"}
+        if intent == "search":
+            text = pick(SEARCH_TEMPLATES).format(
+                status=pick(self.statuses).lower(), item=pick(self.items),
+                transport=pick(self.transports), mode=pick(self.modes)
+            )
+            return "/api/query", {"query": text}
+        return "/api/add", {
+            "vendor_name": vendor,
+            "item_name": pick(self.items),
+            "quantity": self.random.randint(1, 1000),
+            "unit": "Kg",
+            "unit_price": self.random.randint(50, 500),
+            "gst_number": self.gst_numbers[vendor],
+            "order_date": f"2025-{self.random.randint(1, 12):02d}-{self.random.randint(1, 28):02d}",
+        }
+
+
+class ResourceSampler:
+    """Samples CPU time and RSS of a process and its descendants from /proc"""
+
+    def __init__(self, pid: int, interval: float = 0.5):
+        self.pid = pid
+        self.interval = interval
+        self.samples: List[Tuple[float, float, float]] = []  # (wall time, cpu seconds, rss MB)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._ticks = os.sysconf("SC_CLK_TCK")
+        self._page_mb = os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+    def _process_tree(self) -> List[int]:
+        children = defaultdict(list)
+        for entry in os.listdir("/proc"):
+            if entry.isdigit():
+                try:
+                    with open(f"/proc/{entry}/stat") as f:
+                        parent = int(f.read().rsplit(")", 1)[1].split()[1])
+                    children[parent].append(int(entry))
+                except (OSError, IndexError, ValueError):
+                    continue
+        tree, stack = [], [self.pid]
+        while stack:
+            pid = stack.pop()
+            tree.append(pid)
+            stack.extend(children.get(pid, []))
+        return tree
+
+    def _sample(self) -> Optional[Tuple[float, float]]:
+        cpu, rss = 0.0, 0.0
+        for pid in self._process_tree():
+            try:
+                with open(f"/proc/{pid}/stat") as f:
+                    fields = f.read().rsplit(")", 1)[1].split()
+                with open(f"/proc/{pid}/statm") as f:
+                    rss += int(f.read().split()[1]) * self._page_mb
+                cpu += (int(fields[11]) + int(fields[12])) / self._ticks
+            except (OSError, IndexError, ValueError):
+                continue
+        return cpu, rss
+
+    def _run(self):
+        while not self._stop.is_set():
+            cpu, rss = self._sample()
+            self.samples.append((time.monotonic(), cpu, rss))
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if os.path.exists(f"/proc/{self.pid}"):
+            self._thread.start()
+
+    def stop(self) -> Dict[str, float]:
+        """Stop sampling and summarise average CPU % (of one core) and peak RSS"""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        if len(self.samples) < 2:
+            return {}
+        (t0, cpu0, _), (t1, cpu1, _) = self.samples[0], self.samples[-1]
+        return {
+            "cpu_percent": round(100 * (cpu1 - cpu0) / (t1 - t0), 1),
+            "rss_start_mb": round(self.samples[0][2], 1),
+            "rss_peak_mb": round(max(rss for _, _, rss in self.samples), 1),
+        }
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_load(url: str, factory: RequestFactory, mix: Dict[str, float], rps: float,
+             duration: float, concurrency: int, timeout: float) -> Dict:
+    """
+    Send requests open-loop at a fixed rate
+
+    Latency is measured from each request's scheduled send time, so queueing
+    caused by a slow server is included instead of hidden.
+    """
+    intents = list(mix)
+    weights = [mix[intent] for intent in intents]
+    total = int(rps * duration)
+    plan = [(intent, *factory.build(intent)) for intent in factory.random.choices(intents, weights, k=total)]
+
+    results = defaultdict(list)  # intent -> [(latency ms, ok, status)]
+    lock = threading.Lock()
+
+    def send(intent: str, path: str, body: dict, scheduled: float):
+        request = urllib.request.Request(
+            url + path, data=json.dumps(body).encode("utf-8"),
+            headers={"Content-Type": "application/json"}, method="POST"
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        except Exception:
+            status = 0
+        latency = (time.monotonic() - scheduled) * 1000
+        with lock:
+            results[intent].append((latency, 200 <= status < 300, status))
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for i, (intent, path, body) in enumerate(plan):
+            scheduled = start + i / rps
+            delay = scheduled - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(send, intent, path, body, scheduled)
+    elapsed = time.monotonic() - start
+
+    report = {"target_rps": rps, "duration_s": round(elapsed, 2), "intents": {}}
+    all_latencies, errors, completed = [], 0, 0
+    for intent, samples in sorted(results.items()):
+        latencies = [latency for latency, _, _ in samples]
+        failed = sum(1 for _, ok, _ in samples if not ok)
+        statuses = defaultdict(int)
+        for _, _, status in samples:
+            statuses[str(status)] += 1
+        report["intents"][intent] = {
+            "requests": len(samples),
+            "error_rate": round(failed / len(samples), 4),
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "statuses": dict(statuses),
+        }
+        all_latencies.extend(latencies)
+        errors += failed
+        completed += len(samples)
+
+    report.update({
+        "requests": completed,
+        "throughput_rps": round(completed / elapsed, 2) if elapsed else 0.0,
+        "error_rate": round(errors / completed, 4) if completed else 0.0,
+        "p50_ms": round(percentile(all_latencies, 50), 2),
+        "p90_ms": round(percentile(all_latencies, 90), 2),
+        "p95_ms": round(percentile(all_latencies, 95), 2),
+        "p99_ms": round(percentile(all_latencies, 99), 2),
+        "max_ms": round(max(all_latencies), 2) if all_latencies else 0.0,
+    })
+    return report
+
+
+def print_report(report: Dict, baseline: Optional[Dict] = None):
+    print("\n" + "=" * 70)
+    print("  LOAD TEST REPORT")
+    print("=" * 70)
+    print(f"Requests: {report['requests']} in {report['duration_s']}s "
+          f"(target {report['target_rps']} rps, achieved {report['throughput_rps']} rps)")
+    print(f"Errors: {report['error_rate']:.2%}")
+    print(f"Latency ms: p50 {report['p50_ms']}  p90 {report['p90_ms']}  p95 {report['p95_ms']}  "
+          f"p99 {report['p99_ms']}  max {report['max_ms']}")
+    if report.get("server"):
+        server = report["server"]
+        print(f"Server: CPU {server['cpu_percent']}% of one core, "
+              f"RSS {server['rss_start_mb']} → peak {server['rss_peak_mb']} MB")
+
+    print(f"\n{'intent':<14} {'requests':>9} {'errors':>8} {'p50':>9} {'p95':>9} {'p99':>9}")
+    print("-" * 62)
+    for intent, stats in report["intents"].items():
+        print(f"{intent:<14} {stats['requests']:>9} {stats['error_rate']:>8.2%} "
+              f"{stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f}")
+
+    if baseline:
+        print("\nCompared with baseline:")
+        for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms", "error_rate"):
+            old, new = baseline.get(key, 0), report[key]
+            change = f"{(new - old) / old:+.1%}" if old else "n/a"
+            print(f"  {key:<15} {old:>10} → {new:<10} ({change})")
+
+
+def wait_for_server(url: str, timeout: float = 300):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url + "/", timeout=2):
+                return
+        except Exception:
+            time.sleep(0.5)
+    raise RuntimeError(f"Server at {url} did not come up within {timeout:.0f}s")
+
+
+def start_server(args) -> subprocess.Popen:
+    """Launch the offline server in a child process"""
+    if args.server_workers > 1:
+        command = [sys.executable, "serve.py", "--offline-embedder", "--workers", str(args.server_workers),
+                   "--port", str(args.port), "--db-path", args.db_path, "--host", "127.0.0.1"]
+    else:
+        command = [sys.executable, __file__, "server", "--port", str(args.port), "--db-path", args.db_path]
+    return subprocess.Popen(command, cwd=os.path.dirname(os.path.abspath(__file__)))
+
+
+def fresh_db_path(args) -> Optional[str]:
+    """Point args.db_path at a new temporary directory unless one was given, returning the directory to remove"""
+    if args.db_path is not None:
+        return None
+    args.db_path = tempfile.mkdtemp(prefix="rag_loadtest_db_")
+    return args.db_path
+
+
+def serve_offline(args):
+    """Run app.py's Flask app with the offline embedder on a separate database, set up like get_rag() does"""
+    from werkzeug.serving import make_server
+    from offline_embedder import HashingEmbedder
+    from rag_system import initialize_database
+    import app as web
+
+    web.setup_rag(initialize_database(interactive=False, db_path=args.db_path, embedder=HashingEmbedder()))
+    print(f"✅ Offline server on http://127.0.0.1:{args.port}")
+    make_server("127.0.0.1", args.port, web.app, threaded=True).serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test for the web assistant")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    server_parser = commands.add_parser("server", help="Run the offline server only")
+    server_parser.add_argument("--port", type=int, default=5050)
+    server_parser.add_argument("--db-path", default=None, help="Database to use and keep (default: a fresh temporary one)")
+
+    run_parser = commands.add_parser("run", help="Generate load and report")
+    run_parser.add_argument("--url", default=None, help="Server to load (default: the started one)")
+    run_parser.add_argument("--start-server", action="store_true", help="Start an offline server first")
+    run_parser.add_argument("--server-workers", type=int, default=1, help="Use serve.py with N workers")
+    run_parser.add_argument("--server-pid", type=int, default=None, help="Pid to sample for CPU/RSS")
+    run_parser.add_argument("--port", type=int, default=5050)
+    run_parser.add_argument("--db-path", default=None,
+                            help="Database for the started server, kept afterwards (default: a fresh temporary one)")
+    run_parser.add_argument("--csv", default="textile_orders_5000.csv")
+    run_parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Intent weights (default: {DEFAULT_MIX})")
+    run_parser.add_argument("--rps", type=float, default=20)
+    run_parser.add_argument("--duration", type=float, default=30, help="Seconds of load")
+    run_parser.add_argument("--concurrency", type=int, default=64, help="Maximum requests in flight")
+    run_parser.add_argument("--timeout", type=float, default=30)
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument("--output", default=None, help="Write the JSON report here")
+    run_parser.add_argument("--baseline", default=None, help="Earlier JSON report to compare with")
+
+    args = parser.parse_args()
+    if args.command == "server":
+        temporary_db = fresh_db_path(args)
+        try:
+            serve_offline(args)
+        finally:
+            if temporary_db:
+                shutil.rmtree(temporary_db, ignore_errors=True)
+        return
+
+    server = None
+    temporary_db = None
+    url = args.url or f"http://127.0.0.1:{args.port}"
+    server_pid = args.server_pid
+    if args.start_server:
+        temporary_db = fresh_db_path(args)
+        server = start_server(args)
+        server_pid = server.pid
+    try:
+        print(f"⏳ Waiting for {url}...")
+        wait_for_server(url)
+
+        sampler = ResourceSampler(server_pid) if server_pid else None
+        if sampler:
+            sampler.start()
+        print(f"🚀 Sending {args.rps} rps for {args.duration}s ({args.mix})")
+        report = run_load(url, RequestFactory(args.csv, args.seed), parse_mix(args.mix),
+                          args.rps, args.duration, args.concurrency, args.timeout)
+        if sampler:
+            report["server"] = sampler.stop()
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+        if temporary_db:
+            shutil.rmtree(temporary_db, ignore_errors=True)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📝 Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
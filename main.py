@@ -1,10 +1,21 @@
 """
 Sakthi Textiles Smart RAG Assistant - Interactive CLI
+
+Batch mode answers a file of questions without prompts, e.g. for nightly reports:
+    python main.py --batch queries.txt --output answers.jsonl --workers 8
 """
 
 from rag_system import SakthiTextilesRAG, initialize_database
+from session_cache import SessionContext
+import argparse
+import contextlib
+import json
+import os
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import Any, Dict, List, TextIO
 
 
 def print_banner():
@@ -52,8 +63,7 @@ def add_new_order_interactive(rag):
     
     try:
         # Get next order ID
-        current_count = rag.collection.count()
-        next_order_id = current_count + 1
+        next_order_id = rag.next_order_id()
         
         print("Please enter the order details:")
         print("(Press Ctrl+C to cancel at any time)\n")
@@ -106,7 +116,7 @@ def add_new_order_interactive(rag):
         # Dates
         print("\n--- Dates ---")
         today = datetime.now().strftime("%Y-%m-%d")
-        order_data['order_date'] = input(f"Order Date (YYYY-MM-DD, default: {today}): ").strip() or today
+        order_data['order_date'] = input(f"Order Date (YYYY-MM-DD or DD-MM-YYYY, default: {today}): ").strip() or today
         order_data['invoice_date'] = input(f"Invoice Date (default: {today}): ").strip() or today
         order_data['delivery_date'] = input("Delivery Date (optional): ").strip() or today
         order_data['payment_due_date'] = input("Payment Due Date (optional): ").strip() or today
@@ -157,14 +167,129 @@ def add_new_order_interactive(rag):
         print(f"\n❌ Error: {e}")
 
 
+def read_queries(source: TextIO) -> List[Dict[str, Any]]:
+    """
+    Read batch queries: one question per line, or JSON lines with "query" (and optional "id")
+    
+    Blank lines and lines starting with # are skipped. Queries without an
+    id are numbered by their line.
+    """
+    queries = []
+    for line_number, line in enumerate(source, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("{"):
+            entry = json.loads(line)
+            queries.append({'id': entry.get('id', line_number), 'query': str(entry['query'])})
+        else:
+            queries.append({'id': line_number, 'query': line})
+    return queries
+
+
+def answer_batch_query(rag: SakthiTextilesRAG, entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Answer one batch query, recording its time and any error"""
+    result = dict(entry)
+    started = time.perf_counter()
+    try:
+        result['answer'] = rag.answer_query(entry['query'])
+    except Exception as e:
+        result['answer'] = None
+        result['error'] = str(e)
+    result['seconds'] = round(time.perf_counter() - started, 4)
+    return result
+
+
+def run_batch(rag: SakthiTextilesRAG, queries: List[Dict[str, Any]], output: TextIO,
+              workers: int = 4) -> Dict[str, Any]:
+    """
+    Answer queries concurrently and write one JSON line per query, in input order
+    
+    Every worker thread shares the one initialized RAG system. Vendor lookups
+    are served from a single scan of the collection instead of one Chroma
+    read per question.
+    
+    Args:
+        rag: Initialized RAG system
+        queries: Entries from read_queries()
+        output: Stream the JSON lines are written to
+        workers: Number of worker threads
+        
+    Returns:
+        Summary with counts and timings
+    """
+    started = time.perf_counter()
+    # Build the lazy indexes once up front rather than racing to build them in every thread
+    rag.get_term_index()
+    
+    timings = []
+    failed = 0
+    with rag.shared_vendor_scans(), ThreadPoolExecutor(max_workers=workers) as pool:
+        for result in pool.map(lambda entry: answer_batch_query(rag, entry), queries):
+            output.write(json.dumps(result, ensure_ascii=False) + "\n")
+            output.flush()
+            timings.append(result['seconds'])
+            failed += 'error' in result
+    
+    timings.sort()
+    return {
+        'queries': len(queries),
+        'failed': failed,
+        'workers': workers,
+        'seconds': round(time.perf_counter() - started, 3),
+        'p50_seconds': timings[len(timings) // 2] if timings else 0.0,
+        'p95_seconds': timings[int(len(timings) * 0.95)] if timings else 0.0,
+    }
+
+
+def batch_main(args) -> int:
+    """Batch mode: no banner or prompts, answers as JSON lines"""
+    if args.batch == "-":
+        queries = read_queries(sys.stdin)
+    else:
+        with open(args.batch, encoding="utf-8") as source:
+            queries = read_queries(source)
+    
+    output = sys.stdout
+    # Progress messages go to stderr so stdout carries only the JSON lines
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            rag = initialize_database(interactive=False, db_path=args.db_path)
+        except Exception as e:
+            print(f"❌ Error initializing system: {e}")
+            return 1
+        if args.output == "-":
+            summary = run_batch(rag, queries, output, workers=args.workers)
+        else:
+            with open(args.output, "w", encoding="utf-8") as output:
+                summary = run_batch(rag, queries, output, workers=args.workers)
+    
+    print(f"✅ Answered {summary['queries']} queries in {summary['seconds']}s with {summary['workers']} workers "
+          f"(p50 {summary['p50_seconds']}s, p95 {summary['p95_seconds']}s, {summary['failed']} failed)",
+          file=sys.stderr)
+    return 1 if summary['failed'] else 0
+
+
 def main():
     """Main interactive loop"""
+    parser = argparse.ArgumentParser(description="Sakthi Textiles Smart RAG Assistant")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="Answer the queries in FILE (- for stdin) without prompts and exit")
+    parser.add_argument("--output", default="-", help="Batch results as JSON lines (default: stdout)")
+    parser.add_argument("--workers", type=int, default=min(8, os.cpu_count() or 2),
+                        help="Concurrent batch queries")
+    parser.add_argument("--db-path", default="./chroma_db")
+    args = parser.parse_args()
+    
+    if args.batch:
+        sys.exit(batch_main(args))
+    
     print_banner()
     
     # Initialize RAG system
     print("🔄 Initializing RAG system...\n")
     try:
-        rag = initialize_database()
+        rag = initialize_database(db_path=args.db_path)
     except Exception as e:
         print(f"❌ Error initializing system: {e}")
         print("\nMake sure:")
@@ -174,6 +299,9 @@ def main():
     
     print("\n✅ System ready! Type 'help' for usage examples or 'exit' to quit.\n")
     
+    # Remembers the last vendor so follow-ups like "and their payment status?" work
+    session = SessionContext("cli")
+    
     # Interactive loop
     while True:
         try:
@@ -238,7 +366,7 @@ def main():
             
             # Process query
             print("\n🔍 Searching...")
-            answer = rag.answer_query(user_input)
+            answer = rag.answer_query(user_input, session=session)
             
             print("\n📊 Answer:")
             print("-" * 70)
@@ -0,0 +1,275 @@
+"""
+Background maintenance: storage compaction, index rebuilds, snapshots, cache warming and archiving
+
+A MaintenanceScheduler runs registered jobs on their own intervals in one
+low-priority daemon thread. The thread is niced and kept under a CPU budget
+(a fraction of one core, averaged over its run time) by sleeping between
+jobs and at the checkpoints jobs call, so maintenance never competes with
+request handling. Every run is recorded in a bounded history for the admin
+endpoint.
+
+The QueryLog records answered questions so the warm-up job can replay the
+most frequent recent ones after a restart.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Callable, Dict, List, Optional
+
+
+# Seconds between runs of each job; 0 disables a job
+DEFAULT_SCHEDULES = {
+    'compact': 6 * 3600,
+    'rebuild_indexes': 3600,
+    'snapshot': 0,  # index generations are only read under serve.py, whose writer enables it
+    'warm_cache': 900,
+    'archive': 0,  # opt in, e.g. "archive=1d"
+}
+
+# The cache warm-up also runs shortly after startup, when caches are cold
+WARM_START_DELAY = 10.0
+
+_DURATION_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_schedules(spec: str, defaults: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+    """
+    Parse "compact=6h,warm_cache=15m,snapshot=0" into seconds per job
+
+    Jobs that are not mentioned keep their interval in defaults
+    (DEFAULT_SCHEDULES unless given).
+    """
+    schedules = dict(defaults or DEFAULT_SCHEDULES)
+    for part in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, value = part.partition("=")
+        match = re.fullmatch(r"(\d+(?:\.\d+)?)([smhd]?)", value.strip())
+        if name not in schedules or not match:
+            raise ValueError(f"Bad maintenance schedule entry: {part!r}")
+        schedules[name] = float(match.group(1)) * _DURATION_UNITS[match.group(2) or 's']
+    return schedules
+
+
+class QueryLog:
+    """Append-only JSON-lines log of answered queries"""
+
+    def __init__(self, path: str, max_bytes: int = 5 * 1024 * 1024):
+        """
+        Args:
+            path: Log file; rotated to path + ".1" once it grows past max_bytes
+            max_bytes: Size at which the log is rotated
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def record(self, query: str):
+        """Log one query"""
+        line = json.dumps({"t": round(time.time(), 3), "q": query}) + "\n"
+        with self._lock:
+            try:
+                if os.path.getsize(self.path) > self.max_bytes:
+                    os.replace(self.path, self.path + ".1")
+            except OSError:
+                pass
+            # Small appends are atomic, so worker processes can share the file
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def top(self, n: int = 20, since_seconds: float = 7 * 86400, tail_bytes: int = 1024 * 1024) -> List[str]:
+        """The n most frequent queries of the recent past (read from the end of the log)"""
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(max(0, os.path.getsize(self.path) - tail_bytes))
+                lines = f.read().decode("utf-8", errors="ignore").splitlines()
+        except OSError:
+            return []
+
+        cutoff = time.time() - since_seconds
+        counts: Counter = Counter()
+        spelling: Dict[str, str] = {}
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # first line may be cut in half by the seek
+            if entry.get("t", 0) < cutoff or not entry.get("q"):
+                continue
+            key = " ".join(entry["q"].lower().split())
+            counts[key] += 1
+            spelling.setdefault(key, entry["q"])
+        return [spelling[key] for key, _ in counts.most_common(n)]
+
+
+class MaintenanceJob:
+    """A named job and when it runs next"""
+
+    def __init__(self, name: str, func: Callable[[], Any], interval: float, first_delay: Optional[float] = None):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.next_run = time.monotonic() + (interval if first_delay is None else first_delay)
+        self.runs = 0
+        self.last_status: Optional[str] = None
+
+
+class MaintenanceScheduler:
+    """Runs maintenance jobs in one low-priority thread under a CPU budget"""
+
+    def __init__(self, cpu_budget: float = 0.25, history_size: int = 100):
+        """
+        Args:
+            cpu_budget: Fraction of one CPU core the maintenance thread may use on average
+            history_size: Number of past runs kept for the admin endpoint
+        """
+        if not 0 < cpu_budget <= 1:
+            raise ValueError("cpu_budget must be in (0, 1]")
+        self.cpu_budget = cpu_budget
+        self.jobs: Dict[str, MaintenanceJob] = {}
+        self.history: deque = deque(maxlen=history_size)
+        self._requested: deque = deque()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._cpu_mark = 0.0
+        self._wall_mark = 0.0
+        self._lock = threading.Lock()
+
+    def add_job(self, name: str, func: Callable[[], Any], interval: float, first_delay: Optional[float] = None):
+        """Register a job; an interval of 0 leaves it to run only on request"""
+        job = MaintenanceJob(name, func, interval, first_delay)
+        if interval <= 0 and first_delay is None:
+            job.next_run = float("inf")
+        self.jobs[name] = job
+
+    def start(self):
+        """Start the maintenance thread (once)"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="maintenance", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def run_now(self, name: str):
+        """Queue a job to run as soon as the thread is free"""
+        if name not in self.jobs:
+            raise KeyError(name)
+        self._requested.append(name)
+        self._wake.set()
+
+    def throttle(self):
+        """
+        Sleep long enough to keep the thread under its CPU budget
+
+        Jobs call this between units of work; the scheduler calls it between jobs.
+        """
+        cpu = time.thread_time() - self._cpu_mark
+        wall = time.monotonic() - self._wall_mark
+        pause = cpu / self.cpu_budget - wall
+        if pause > 0:
+            self._stop.wait(pause)
+        self._cpu_mark = time.thread_time()
+        self._wall_mark = time.monotonic()
+
+    def _lower_priority(self):
+        """Nice this thread only (Linux schedules threads individually)"""
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+        except (AttributeError, OSError):
+            pass
+
+    def _run(self):
+        self._lower_priority()
+        self._cpu_mark = time.thread_time()
+        self._wall_mark = time.monotonic()
+        while not self._stop.is_set():
+            if self._requested:
+                job = self.jobs[self._requested.popleft()]
+            else:
+                job = min(self.jobs.values(), key=lambda j: j.next_run, default=None)
+                if job is None or job.next_run > time.monotonic():
+                    wait = None if job is None else min(job.next_run - time.monotonic(), 60.0)
+                    self._wake.wait(wait)
+                    self._wake.clear()
+                    continue
+            self._execute(job)
+            self.throttle()
+
+    def _execute(self, job: MaintenanceJob):
+        started = time.time()
+        cpu_started = time.thread_time()
+        entry: Dict[str, Any] = {'job': job.name, 'started_at': time.strftime("%Y-%m-%d %H:%M:%S")}
+        try:
+            result = job.func()
+            entry['status'] = 'ok'
+            if result is not None:
+                entry['result'] = result
+        except Exception as e:
+            entry['status'] = 'error'
+            entry['error'] = str(e)
+            print(f"❌ Maintenance job {job.name} failed: {e}")
+        entry['seconds'] = round(time.time() - started, 3)
+        entry['cpu_seconds'] = round(time.thread_time() - cpu_started, 3)
+
+        with self._lock:
+            job.runs += 1
+            job.last_status = entry['status']
+            job.next_run = time.monotonic() + job.interval if job.interval > 0 else float("inf")
+            self.history.append(entry)
+
+    def status(self) -> Dict[str, Any]:
+        """Jobs, their schedules and the run history (newest first)"""
+        now = time.monotonic()
+        with self._lock:
+            jobs = [{
+                'name': job.name,
+                'interval_seconds': job.interval,
+                'next_run_in_seconds': None if job.next_run == float("inf") else round(max(0.0, job.next_run - now), 1),
+                'runs': job.runs,
+                'last_status': job.last_status,
+            } for job in self.jobs.values()]
+            history = list(reversed(self.history))
+        return {'cpu_budget': self.cpu_budget, 'running': self._thread is not None, 'jobs': jobs, 'history': history}
+
+
+def schedule_maintenance(rag, query_log: Optional[QueryLog], schedules: Optional[Dict[str, float]] = None,
+                         cpu_budget: float = 0.25, jobs: Optional[List[str]] = None,
+                         overrides: Optional[Dict[str, Callable[[], Any]]] = None) -> MaintenanceScheduler:
+    """
+    Create and start a scheduler with the standard jobs for a RAG system
+
+    Args:
+        rag: SakthiTextilesRAG (or a subclass) to maintain
+        query_log: Log the warm-up job replays queries from (None disables warming)
+        schedules: Seconds between runs per job name (see DEFAULT_SCHEDULES)
+        cpu_budget: Fraction of one core the maintenance thread may use
+        jobs: Job names to register (default: all)
+        overrides: Functions to run instead of the standard ones, by job name
+    """
+    schedules = schedules or DEFAULT_SCHEDULES
+    scheduler = MaintenanceScheduler(cpu_budget=cpu_budget)
+
+    def warm_cache():
+        queries = query_log.top() if query_log is not None else []
+        return rag.warm_caches(queries, pause=scheduler.throttle)
+
+    available = {
+        'compact': rag.compact_storage,
+        'rebuild_indexes': rag.rebuild_side_indexes,
+        'snapshot': rag.persist_snapshot,
+        'warm_cache': warm_cache,
+        'archive': rag.archive_orders,
+    }
+    available.update(overrides or {})
+    for name in jobs or list(available):
+        interval = schedules.get(name, 0)
+        first_delay = WARM_START_DELAY if name == 'warm_cache' and interval > 0 else None
+        scheduler.add_job(name, available[name], interval, first_delay)
+    scheduler.start()
+    return scheduler
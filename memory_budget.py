@@ -0,0 +1,190 @@
+"""
+Process-wide memory accounting for caches and in-memory indexes
+
+Every cache and index registers a component with the MemoryBudget: a
+function reporting its approximate size in bytes and, if it can be
+dropped, an evict function. When the total goes over the budget the
+least valuable components are evicted first. Value is cost-aware LRU:
+
+    value = rebuild seconds / (size in MB * (1 + idle seconds))
+
+so a large index that is cheap to rebuild and has not been used for a
+while goes before a small, expensive or busy one. Indexes that were
+evicted are rebuilt lazily on their next use.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+MB = 1024 * 1024
+
+# How often touch() re-checks the budget
+ENFORCE_INTERVAL = 1.0
+
+
+def process_rss_bytes() -> int:
+    """Resident set size of this process (0 where /proc is unavailable)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+class MemoryComponent:
+    """One registered cache or index"""
+
+    def __init__(self, name: str, size: Callable[[], int], evict: Optional[Callable[[int], Any]],
+                 rebuild_seconds: float):
+        self.name = name
+        self.size = size
+        self.evict = evict
+        self.rebuild_seconds = rebuild_seconds
+        self.last_used = time.monotonic()
+        self.evictions = 0
+
+    def bytes(self) -> int:
+        try:
+            return int(self.size() or 0)
+        except Exception:
+            return 0
+
+    def value(self, size: int, now: float) -> float:
+        """How much keeping this component is worth per byte (lowest is evicted first)"""
+        idle = max(0.0, now - self.last_used)
+        return self.rebuild_seconds / (max(size, 1) / MB * (1.0 + idle))
+
+
+class MemoryBudget:
+    """Keeps registered components under a total byte budget"""
+
+    def __init__(self, budget_mb: float = 512):
+        """
+        Args:
+            budget_mb: Total approximate memory allowed for all registered components
+        """
+        self.budget_bytes = int(budget_mb * MB)
+        self._components: Dict[str, MemoryComponent] = {}
+        self._lock = threading.RLock()
+        self._checked_at = 0.0
+
+    def register(self, name: str, size: Callable[[], int], evict: Optional[Callable[[int], Any]] = None,
+                 rebuild_seconds: float = 1.0):
+        """
+        Register (or replace) a component
+
+        Args:
+            name: Component name shown in reports
+            size: Returns the component's approximate size in bytes
+            evict: Called with the number of bytes to free; drops all or part
+                of the component. None for components that cannot be evicted.
+            rebuild_seconds: Initial estimate of the cost of losing the
+                component; update it with touch() after measuring a rebuild
+        """
+        with self._lock:
+            self._components[name] = MemoryComponent(name, size, evict, rebuild_seconds)
+
+    def touch(self, name: str, rebuild_seconds: Optional[float] = None):
+        """
+        Mark a component as used (and record a measured rebuild time); enforces the budget now and then
+
+        The touched component is never evicted by that check, so a caller can
+        return the index it just built or looked up.
+        """
+        component = self._components.get(name)
+        if component is None:
+            return
+        component.last_used = time.monotonic()
+        if rebuild_seconds is not None:
+            component.rebuild_seconds = max(rebuild_seconds, 0.001)
+        if component.last_used - self._checked_at >= ENFORCE_INTERVAL:
+            self.enforce(blocking=False, keep=name)
+
+    def usage(self) -> Dict[str, int]:
+        """Approximate bytes per component"""
+        with self._lock:
+            return {name: component.bytes() for name, component in self._components.items()}
+
+    def enforce(self, blocking: bool = True, keep: Optional[str] = None) -> List[str]:
+        """
+        Evict the least valuable components until the total fits the budget
+
+        Args:
+            blocking: Wait if another thread is enforcing; otherwise return at once
+            keep: Name of a component that must not be evicted this time
+
+        Returns:
+            Names of the components that were evicted from
+        """
+        evicted = []
+        if not self._lock.acquire(blocking=blocking):
+            return evicted
+        try:
+            self._checked_at = time.monotonic()
+            sizes = {name: component.bytes() for name, component in self._components.items()}
+            over = sum(sizes.values()) - self.budget_bytes
+            if over <= 0:
+                return evicted
+
+            now = time.monotonic()
+            candidates = sorted(
+                (component for component in self._components.values()
+                 if component.evict is not None and sizes[component.name] > 0 and component.name != keep),
+                key=lambda component: component.value(sizes[component.name], now)
+            )
+            for component in candidates:
+                if over <= 0:
+                    break
+                try:
+                    component.evict(over)
+                except Exception as e:
+                    print(f"❌ Could not evict {component.name}: {e}")
+                    continue
+                freed = sizes[component.name] - component.bytes()
+                if freed > 0:
+                    component.evictions += 1
+                    evicted.append(component.name)
+                    over -= freed
+        finally:
+            self._lock.release()
+        if evicted:
+            print(f"♻️  Memory budget: evicted {', '.join(evicted)}")
+        return evicted
+
+    def report(self) -> Dict[str, Any]:
+        """Budget, total and per-component usage (largest first)"""
+        now = time.monotonic()
+        with self._lock:
+            components = [{
+                'name': component.name,
+                'bytes': component.bytes(),
+                'evictable': component.evict is not None,
+                'idle_seconds': round(now - component.last_used, 1),
+                'rebuild_seconds': round(component.rebuild_seconds, 3),
+                'evictions': component.evictions,
+            } for component in self._components.values()]
+        components.sort(key=lambda component: -component['bytes'])
+        return {
+            'budget_bytes': self.budget_bytes,
+            'total_bytes': sum(component['bytes'] for component in components),
+            'process_rss_bytes': process_rss_bytes(),
+            'components': components,
+        }
+
+    def metrics(self, prefix: str = "sakthi_memory") -> str:
+        """The report in Prometheus text exposition format"""
+        report = self.report()
+        lines = [
+            f"# TYPE {prefix}_budget_bytes gauge",
+            f"{prefix}_budget_bytes {report['budget_bytes']}",
+            f"# TYPE {prefix}_process_rss_bytes gauge",
+            f"{prefix}_process_rss_bytes {report['process_rss_bytes']}",
+            f"# TYPE {prefix}_bytes gauge",
+        ]
+        lines += [f'{prefix}_bytes{{component="{c["name"]}"}} {c["bytes"]}' for c in report['components']]
+        lines.append(f"# TYPE {prefix}_evictions_total counter")
+        lines += [f'{prefix}_evictions_total{{component="{c["name"]}"}} {c["evictions"]}' for c in report['components']]
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,56 @@
+"""
+Deterministic offline embedder
+
+Hashes word unigrams/bigrams and character trigrams into a fixed number of
+dimensions. It needs no model download, gives identical vectors on every
+run and is fast, which makes it suitable for load tests and local
+experiments. It is NOT a substitute for the MiniLM model in production:
+never use it against a database that was embedded with the real model.
+"""
+
+import hashlib
+import re
+from typing import List, Union
+
+import numpy as np
+
+
+class HashingEmbedder:
+    """Feature-hashing embedder usable as a SentenceTransformer and as a Chroma embedding function"""
+
+    def __init__(self, dim: int = 384):
+        """
+        Args:
+            dim: Number of output dimensions (384 matches all-MiniLM-L6-v2)
+        """
+        self.dim = dim
+
+    def _bucket(self, feature: str) -> int:
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "little")
+
+    def _embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        words = re.findall(r"[a-z0-9]+", text.lower())
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        for word in words:
+            padded = f" {word} "
+            features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+
+        for feature in features:
+            bucket = self._bucket(feature)
+            sign = 1.0 if bucket & 1 else -1.0
+            vector[(bucket >> 1) % self.dim] += sign
+
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def encode(self, sentences: Union[str, List[str]], normalize_embeddings: bool = True, **kwargs) -> np.ndarray:
+        """Same call shape as SentenceTransformer.encode (vectors are always normalised)"""
+        if isinstance(sentences, str):
+            return self._embed(sentences)
+        return np.vstack([self._embed(text) for text in sentences]) if sentences else np.zeros((0, self.dim))
+
+    def __call__(self, input: List[str]) -> List[List[float]]:
+        """Chroma embedding function interface"""
+        return [self._embed(text).tolist() for text in input]
@@ -0,0 +1,163 @@
+"""
+Document store for full order records
+
+The vector index only needs the text that is embedded. The complete order
+record and its full display document live here, keyed by the same ids as
+the Chroma collection, and are fetched only when an answer displays them.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+
+def _json_default(value: Any) -> Any:
+    """Convert numpy/pandas scalars so order records can be serialised"""
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+def order_number(order_id: str) -> int:
+    """Numeric part of a collection id such as "order_123" (0 if it has none)"""
+    _, _, number = str(order_id).rpartition("_")
+    return int(number) if number.isdigit() else 0
+
+
+class OrderStore:
+    """SQLite-backed store of full order documents and records"""
+
+    def __init__(self, path: str):
+        """
+        Open (or create) the store
+
+        Args:
+            path: SQLite file path, ":memory:" for a throwaway store
+        """
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS orders ("
+            " id TEXT PRIMARY KEY,"
+            " document TEXT NOT NULL,"
+            " record TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.commit()
+
+    def put_many(self, ids: List[str], documents: List[str], records: List[Dict[str, Any]]):
+        """
+        Insert a batch of new orders
+
+        Raises:
+            ValueError: If any id is already stored; nothing from the batch is written
+        """
+        rows = [
+            (order_id, document, json.dumps(record, default=_json_default))
+            for order_id, document, record in zip(ids, documents, records)
+        ]
+        with self._lock:
+            try:
+                with self._conn:
+                    self._conn.executemany("INSERT INTO orders (id, document, record) VALUES (?, ?, ?)", rows)
+            except sqlite3.IntegrityError:
+                taken = self._existing(ids)
+                raise ValueError(f"Order ids already stored: {', '.join(sorted(taken)[:5])}") from None
+
+    def existing(self, ids: List[str]) -> Set[str]:
+        """The ids that are already stored"""
+        with self._lock:
+            return self._existing(ids)
+
+    def _existing(self, ids: List[str]) -> Set[str]:
+        found = set()
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            cursor = self._conn.execute(f"SELECT id FROM orders WHERE id IN ({placeholders})", chunk)
+            found.update(order_id for order_id, in cursor.fetchall())
+        return found
+
+    def max_order_number(self) -> int:
+        """Highest numeric order id stored (0 when empty)"""
+        with self._lock:
+            ids = [order_id for order_id, in self._conn.execute("SELECT id FROM orders")]
+        return max((order_number(order_id) for order_id in ids), default=0)
+
+    def get_documents(self, ids: List[str]) -> List[Optional[str]]:
+        """Get full display documents in the order of ids (None where missing)"""
+        found = self._fetch("document", ids)
+        return [found.get(order_id) for order_id in ids]
+
+    def get_records(self, ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Get full order records in the order of ids (None where missing)"""
+        found = self._fetch("record", ids)
+        return [json.loads(found[order_id]) if order_id in found else None for order_id in ids]
+
+    def _fetch(self, column: str, ids: List[str]) -> Dict[str, str]:
+        """Fetch one column for a list of ids, chunked under SQLite's variable limit"""
+        found = {}
+        with self._lock:
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                cursor = self._conn.execute(
+                    f"SELECT id, {column} FROM orders WHERE id IN ({placeholders})", chunk
+                )
+                found.update(cursor.fetchall())
+        return found
+
+    def all_records(self) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """Get the ids and full records of every stored order"""
+        with self._lock:
+            rows = self._conn.execute("SELECT id, record FROM orders").fetchall()
+        return [order_id for order_id, _ in rows], [json.loads(record) for _, record in rows]
+
+    def delete(self, ids: List[str]):
+        """Remove orders from the store"""
+        with self._lock:
+            self._conn.executemany("DELETE FROM orders WHERE id = ?", [(order_id,) for order_id in ids])
+            self._conn.commit()
+
+    def vacuum(self) -> int:
+        """Rebuild the database file to reclaim free pages, returning the bytes saved"""
+        if self.path == ":memory:":
+            return 0
+        before = os.path.getsize(self.path)
+        with self._lock:
+            self._conn.execute("VACUUM")
+            self._conn.execute("PRAGMA optimize")
+        return before - os.path.getsize(self.path)
+
+    def clear(self):
+        """Remove every order from the store"""
+        with self._lock:
+            self._conn.execute("DELETE FROM orders")
+            self._conn.commit()
+
+    def get_setting(self, key: str) -> Optional[str]:
+        """Value stored for a database-wide setting (None if never set)"""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_setting(self, key: str, value: str):
+        """Store a database-wide setting, such as the embedding template"""
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, value))
+            self._conn.commit()
+
+    def count(self) -> int:
+        """Number of stored orders"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+
+    def close(self):
+        """Close the SQLite connection"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,263 @@
+"""
+Time-partitioned vector indexes with parallel fan-out search
+
+Orders are split into one quantized index per month or quarter of
+order_date. Date-scoped searches open only the partitions that overlap the
+scope; unscoped searches fan out over every partition in a thread pool and
+the per-partition top-k lists are merged with a heap. Partitions are opened
+lazily and the least recently used ones are closed once the loaded indexes
+exceed the memory budget. Single orders are added to the loaded partition and
+its files are rewritten in batches; a full rebuild is written next to the
+live directory and swapped in.
+"""
+
+import heapq
+import os
+import shutil
+import threading
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from quantized_index import QuantizedVectorIndex
+
+
+GRANULARITIES = ('month', 'quarter')
+
+# Orders added one by one to a partition before its files are rewritten
+COMPACT_EVERY = 64
+
+
+def partition_key(order_date: str, granularity: str) -> str:
+    """
+    Partition key for an order date
+
+    Args:
+        order_date: Date in YYYY-MM-DD form
+        granularity: "month" (2025-03) or "quarter" (2025-Q1)
+    """
+    year, month = order_date[:4], int(order_date[5:7])
+    if granularity == 'quarter':
+        return f"{year}-Q{(month - 1) // 3 + 1}"
+    return f"{year}-{month:02d}"
+
+
+class PartitionedIndex:
+    """Set of per-period QuantizedVectorIndex partitions under one directory"""
+
+    def __init__(self, path: str, granularity: str = 'month', memory_budget_mb: float = 256,
+                 max_workers: int = 4, dtype: str = 'int8'):
+        """
+        Open (or prepare) a partitioned index
+
+        Args:
+            path: Directory holding one sub-directory per partition
+            granularity: "month" or "quarter"
+            memory_budget_mb: Approximate limit for loaded partitions
+            max_workers: Threads used to search partitions in parallel
+            dtype: Quantized storage type of new partitions
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown partition granularity: {granularity}")
+
+        self.path = path
+        self.granularity = granularity
+        self.memory_budget_bytes = int(memory_budget_mb * 1024 * 1024)
+        self.dtype = dtype
+        self._loaded: "OrderedDict[str, QuantizedVectorIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="partition")
+        os.makedirs(path, exist_ok=True)
+
+    def keys(self) -> List[str]:
+        """All partition keys on disk, oldest first"""
+        with self._lock:
+            return sorted(
+                name for name in os.listdir(self.path)
+                if os.path.exists(os.path.join(self.path, name, "meta.json"))
+            )
+
+    def count(self) -> int:
+        """Number of orders across all partitions, including ones not yet written"""
+        total = 0
+        for key in self.keys():
+            with self._lock:
+                index = self._loaded.get(key)
+            if index is not None:
+                total += len(index)
+            else:
+                total += QuantizedVectorIndex.stored_count(os.path.join(self.path, key))
+        return total
+
+    def keys_for_range(self, date_from: Optional[str], date_to: Optional[str]) -> List[str]:
+        """Partition keys overlapping an inclusive YYYY-MM-DD date range"""
+        low = partition_key(date_from, self.granularity) if date_from else None
+        high = partition_key(date_to, self.granularity) if date_to else None
+        return [
+            key for key in self.keys()
+            if (low is None or key >= low) and (high is None or key <= high)
+        ]
+
+    def loaded_bytes(self) -> int:
+        """Approximate memory held by the currently loaded partitions"""
+        with self._lock:
+            return sum(index.approx_bytes() for index in self._loaded.values())
+
+    def _get(self, key: str) -> QuantizedVectorIndex:
+        """Open a partition (or reuse it) and evict old ones beyond the budget"""
+        with self._lock:
+            if key in self._loaded:
+                self._loaded.move_to_end(key)
+                return self._loaded[key]
+
+            index = QuantizedVectorIndex(os.path.join(self.path, key))
+            self._loaded[key] = index
+            self._evict()
+            return index
+
+    def _evict(self):
+        """Close least recently used partitions until the loaded set fits the budget"""
+        total = sum(index.approx_bytes() for index in self._loaded.values())
+        while total > self.memory_budget_bytes and len(self._loaded) > 1:
+            total -= self._close_oldest()
+
+    def _close_oldest(self) -> int:
+        """Close the least recently used partition, writing its pending orders first"""
+        _, evicted = self._loaded.popitem(last=False)
+        if evicted.pending:
+            evicted.compact()
+        return evicted.approx_bytes()
+
+    def shrink(self, bytes_to_free: int):
+        """Close least recently used partitions until about bytes_to_free were released"""
+        with self._lock:
+            freed = 0
+            while self._loaded and freed < bytes_to_free:
+                freed += self._close_oldest()
+
+    def evict_all(self):
+        """Close every loaded partition"""
+        with self._lock:
+            while self._loaded:
+                self._close_oldest()
+
+    def compact(self) -> int:
+        """Write the pending orders of every loaded partition, returning how many were written"""
+        written = 0
+        with self._lock:
+            for key, index in list(self._loaded.items()):
+                if index.pending:
+                    written += index.pending
+                    self._loaded[key] = index.compact()
+        return written
+
+    def rebuild(self, ids: List[str], embeddings, metadatas: List[Dict]):
+        """
+        Replace all partitions from a full scan of the collection
+
+        The new partitions are written to a separate directory and swapped in
+        under the lock, so searches keep using the old ones until then.
+
+        Args:
+            ids: Collection ids
+            embeddings: Embedding of each order
+            metadatas: Metadata of each order (needs vendor_name and order_date)
+        """
+        groups = defaultdict(list)
+        for position, metadata in enumerate(metadatas):
+            groups[partition_key(metadata['order_date'], self.granularity)].append(position)
+
+        building, retired = self.path + ".building", self.path + ".old"
+        shutil.rmtree(building, ignore_errors=True)
+        os.makedirs(building)
+        for key, positions in groups.items():
+            QuantizedVectorIndex.build(
+                os.path.join(building, key),
+                [ids[i] for i in positions],
+                [embeddings[i] for i in positions],
+                [metadatas[i]['vendor_name'] for i in positions],
+                dtype=self.dtype,
+                dates=[metadatas[i]['order_date'] for i in positions],
+            )
+
+        with self._lock:
+            self._loaded.clear()
+            shutil.rmtree(retired, ignore_errors=True)
+            os.rename(self.path, retired)
+            os.rename(building, self.path)
+        # Open memory maps of the old partitions stay valid after the files are removed
+        shutil.rmtree(retired, ignore_errors=True)
+
+    def add(self, order_id: str, embedding, metadata: Dict):
+        """Add one order to its partition, writing the partition every COMPACT_EVERY orders"""
+        self.add_many([order_id], [embedding], [metadata], compact=False)
+
+    def add_many(self, ids: List[str], embeddings, metadatas: List[Dict], compact: bool = True):
+        """
+        Add orders to their partitions
+
+        Args:
+            ids: Collection ids
+            embeddings: Embedding of each order
+            metadatas: Metadata of each order (needs vendor_name and order_date)
+            compact: Rewrite each touched partition once at the end instead of
+                leaving the orders pending until COMPACT_EVERY accumulate
+        """
+        groups = defaultdict(list)
+        for position, metadata in enumerate(metadatas):
+            groups[partition_key(metadata['order_date'], self.granularity)].append(position)
+
+        for key, positions in groups.items():
+            path = os.path.join(self.path, key)
+            if not os.path.exists(os.path.join(path, "meta.json")):
+                index = QuantizedVectorIndex.build(
+                    path,
+                    [ids[i] for i in positions],
+                    [embeddings[i] for i in positions],
+                    [metadatas[i]['vendor_name'] for i in positions],
+                    dtype=self.dtype,
+                    dates=[metadatas[i]['order_date'] for i in positions],
+                )
+            else:
+                index = self._get(key)
+                for i in positions:
+                    index.add(ids[i], embeddings[i], metadatas[i]['vendor_name'], metadatas[i]['order_date'])
+                if compact or index.pending >= COMPACT_EVERY:
+                    index = index.compact()
+
+            with self._lock:
+                self._loaded[key] = index
+                self._loaded.move_to_end(key)
+                self._evict()
+
+    def search(self, query_embedding, k: int = 10, vendor_filter: Optional[str] = None,
+               date_from: Optional[str] = None, date_to: Optional[str] = None) -> Tuple[List[str], List[float]]:
+        """
+        Search the partitions overlapping a date scope (all of them if unscoped)
+
+        Returns:
+            Tuple of (ids, cosine distances), closest first
+        """
+        keys = self.keys_for_range(date_from, date_to)
+        date_range = None
+        if date_from or date_to:
+            date_range = (date_from or "0000-00-00", date_to or "9999-99-99")
+
+        def search_partition(key: str) -> List[Tuple[float, str]]:
+            try:
+                index = self._get(key)
+            except FileNotFoundError:
+                # Dropped by a rebuild that finished after the keys were listed
+                return []
+            ids, distances = index.search(
+                query_embedding, k=k, vendor_filter=vendor_filter, date_range=date_range
+            )
+            return list(zip(distances, ids))
+
+        if len(keys) == 1:
+            per_partition = [search_partition(keys[0])]
+        else:
+            per_partition = list(self._executor.map(search_partition, keys))
+
+        best = heapq.nsmallest(k, heapq.merge(*(sorted(hits) for hits in per_partition)))
+        return [order_id for _, order_id in best], [distance for distance, _ in best]
@@ -0,0 +1,127 @@
+"""
+Prefix tries for typeahead suggestions
+
+Every trie node keeps its own short list of the best completions below it,
+so answering a keystroke is one walk down the prefix plus a copy of that
+list; nothing is enumerated at query time.
+"""
+
+import threading
+from typing import Dict, List, Tuple
+
+
+SUGGESTION_KINDS = ('vendor', 'item', 'invoice', 'order')
+
+
+class _Node:
+    __slots__ = ('children', 'top')
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.top: List[Tuple[int, str]] = []  # (-weight, value), best first
+
+
+class PrefixTrie:
+    """Case-insensitive prefix trie returning the most frequent completions"""
+
+    def __init__(self, top_k: int = 8):
+        """
+        Args:
+            top_k: Completions cached per node (the most a lookup can return)
+        """
+        self.top_k = top_k
+        self._root = _Node()
+        self._weights: Dict[str, int] = {}
+        self._nodes = 1
+
+    def __len__(self) -> int:
+        return len(self._weights)
+
+    def __contains__(self, value: str) -> bool:
+        return str(value).strip() in self._weights
+
+    def add(self, value: str, weight: int = 1):
+        """Insert a value, or increase its weight if it is already present"""
+        value = str(value).strip()
+        if not value:
+            return
+        new_weight = self._weights.get(value, 0) + weight
+        self._weights[value] = new_weight
+        old_entry = (-(new_weight - weight), value)
+        entry = (-new_weight, value)
+
+        node = self._root
+        for char in value.lower():
+            child = node.children.get(char)
+            if child is None:
+                child = node.children[char] = _Node()
+                self._nodes += 1
+            node = child
+            top = node.top
+            if old_entry in top:
+                top.remove(old_entry)
+            elif len(top) >= self.top_k and entry >= top[-1]:
+                continue
+            top.append(entry)
+            top.sort()
+            del top[self.top_k:]
+
+    def approx_bytes(self) -> int:
+        """Rough memory held by the nodes, their top lists and the weights"""
+        return self._nodes * (150 + 16 * self.top_k) + 120 * len(self._weights)
+
+    def complete(self, prefix: str, limit: int = 8) -> List[str]:
+        """Most frequent values starting with prefix"""
+        node = self._root
+        for char in prefix.lower():
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return [value for _, value in node.top[:limit]]
+
+
+class SuggestionIndex:
+    """One prefix trie per suggestion kind (vendors, items, invoice numbers, order ids)"""
+
+    def __init__(self, top_k: int = 8):
+        self._tries = {kind: PrefixTrie(top_k) for kind in SUGGESTION_KINDS}
+        self._lock = threading.Lock()
+
+    def approx_bytes(self) -> int:
+        return sum(trie.approx_bytes() for trie in self._tries.values())
+
+    def add_order(self, metadata: Dict):
+        """Index the suggestable fields of one order"""
+        with self._lock:
+            self._tries['vendor'].add(metadata['vendor_name'])
+            self._tries['item'].add(metadata['item_name'])
+            self._tries['invoice'].add(metadata['invoice_no'])
+            self._tries['order'].add(str(metadata['order_id']))
+
+    def has_order(self, order_id) -> bool:
+        """Whether an order was already indexed (order ids are unique, unlike vendors or items)"""
+        with self._lock:
+            return str(order_id) in self._tries['order']
+
+    def suggest(self, text: str, limit: int = 8) -> Dict:
+        """
+        Suggest completions for what the user is typing
+
+        The last three, two and finally one words of text are tried as the
+        prefix, so "orders for sakthi tr" completes "sakthi tr".
+
+        Returns:
+            Dict with the matched "prefix" and a list of {"type", "value"} suggestions
+        """
+        words = text.lstrip().split(" ")
+        for size in range(min(3, len(words)), 0, -1):
+            prefix = " ".join(words[-size:])
+            if not prefix.strip():
+                continue
+            suggestions = []
+            for kind in SUGGESTION_KINDS:
+                for value in self._tries[kind].complete(prefix, limit):
+                    suggestions.append({"type": kind, "value": value})
+            if suggestions:
+                return {"prefix": prefix, "suggestions": suggestions[:limit]}
+        return {"prefix": "", "suggestions": []}
@@ -0,0 +1,319 @@
+"""
+Quantized vector tier with full-precision rescoring
+
+Embeddings are kept twice in memory-mapped .npy files: a quantized copy
+(int8 with a per-vector scale, or float16) that is scanned for every query,
+and the float32 originals that are only touched for the few candidates
+that survive the first pass.
+
+Ids, vendors and order dates are memory-mapped columns too: fixed-width
+byte strings for ids and dates, and int32 codes into the vendor names
+listed in meta.json. meta.json also holds the row count, which is written
+last; compact() appends the new rows to every file in place and then
+commits them by rewriting meta.json, so the existing rows are never copied.
+"""
+
+import io
+import json
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+QUANTIZED_DTYPES = ('int8', 'float16')
+
+# Rows converted to float32 at a time during the first pass, bounding scratch memory
+SCAN_BLOCK_ROWS = 65536
+
+# Minimum width of the id column, so later, longer ids can usually be appended in place
+ID_WIDTH = 24
+DATE_WIDTH = 10
+
+
+def quantize(vectors: np.ndarray, dtype: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Quantize float32 vectors
+
+    Args:
+        vectors: Array of shape (n, dim)
+        dtype: "int8" (symmetric, per-vector scale) or "float16"
+
+    Returns:
+        Tuple of (quantized vectors, per-vector scales)
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if dtype == 'float16':
+        return vectors.astype(np.float16), np.ones(len(vectors), dtype=np.float32)
+    if dtype != 'int8':
+        raise ValueError(f"Unsupported quantized dtype: {dtype}")
+
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    quantized = np.round(vectors / scales[:, None]).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+
+def _save_atomic(path: str, array: np.ndarray):
+    """Write an .npy file via rename so open memory maps keep seeing the old file"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+
+def _encode(values: List[str], width: int) -> np.ndarray:
+    """Fixed-width UTF-8 byte strings, at least width bytes wide"""
+    encoded = [str(value).encode("utf-8") for value in values]
+    width = max([width] + [len(value) for value in encoded])
+    return np.array(encoded, dtype=f"S{width}")
+
+
+def _append_rows(path: str, rows: np.ndarray, count: int):
+    """
+    Write rows after the first count rows of an .npy file
+
+    The data goes in place and the header's shape is updated after it
+    (NumPy pads headers so the row count can grow); rows past count, left
+    by an append that was never committed, are overwritten. Memory maps of
+    the existing rows stay valid. The file is only rewritten when the
+    header can't grow or the rows are wider than its dtype.
+    """
+    with open(path, "r+b") as f:
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            read_header, write_header = np.lib.format.read_array_header_1_0, np.lib.format.write_array_header_1_0
+        else:
+            read_header, write_header = np.lib.format.read_array_header_2_0, np.lib.format.write_array_header_2_0
+        shape, fortran_order, dtype = read_header(f)
+        data_offset = f.tell()
+        if dtype.kind == 'S' and rows.dtype.kind == 'S' and rows.itemsize <= dtype.itemsize:
+            rows = rows.astype(dtype)
+        if rows.dtype == dtype and not fortran_order and tuple(shape[1:]) == rows.shape[1:]:
+            header = io.BytesIO()
+            write_header(header, {'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False,
+                                  'shape': (count + len(rows),) + tuple(shape[1:])})
+            if header.tell() == data_offset:
+                f.seek(data_offset + count * int(np.prod(shape[1:], dtype=np.int64)) * dtype.itemsize)
+                f.truncate()
+                f.write(np.ascontiguousarray(rows).tobytes())
+                f.flush()
+                f.seek(0)
+                f.write(header.getvalue())
+                return
+
+    existing = np.load(path, mmap_mode='r')[:count]
+    _save_atomic(path, np.concatenate([existing, rows]))
+
+
+def _write_columns(path: str, ids: List[str], vendors: List[str], dates: Optional[List[str]]) -> List[str]:
+    """Write the id, vendor code and date columns, returning the vendor names the codes index"""
+    vendor_names = sorted(set(vendors))
+    codes = {vendor: code for code, vendor in enumerate(vendor_names)}
+    _save_atomic(os.path.join(path, "ids.npy"), _encode(ids, ID_WIDTH))
+    _save_atomic(os.path.join(path, "vendor_codes.npy"), np.array([codes[v] for v in vendors], dtype=np.int32))
+    _save_atomic(os.path.join(path, "dates.npy"), _encode(dates or [""] * len(ids), DATE_WIDTH))
+    return vendor_names
+
+
+def _write_meta(path: str, dtype: str, count: int, vendor_names: List[str]):
+    """Atomically write meta.json, committing the rows written before it"""
+    tmp_path = os.path.join(path, "meta.json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"dtype": dtype, "count": count, "vendor_names": vendor_names}, f)
+    os.replace(tmp_path, os.path.join(path, "meta.json"))
+
+
+class QuantizedVectorIndex:
+    """Memory-mapped quantized embeddings searched with NumPy, rescored in float32"""
+
+    def __init__(self, path: str):
+        """
+        Open an index directory written by build()
+
+        Args:
+            path: Directory holding the index files
+        """
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if 'ids' in meta:
+            meta = self._migrate(path, meta)
+        self.dtype = meta['dtype']
+        self.count: int = meta['count']
+        self.vendor_names: List[str] = meta['vendor_names']
+        self._vendor_codes = {vendor: code for code, vendor in enumerate(self.vendor_names)}
+
+        def load(file_name: str) -> np.ndarray:
+            # Rows past count belong to an append that was never committed
+            return np.load(os.path.join(path, file_name), mmap_mode='r')[:self.count]
+
+        self.quantized = load("quantized.npy")
+        self.scales = load("scales.npy")
+        self.full = load("full.npy")
+        self.id_column = load("ids.npy")
+        self.vendor_column = load("vendor_codes.npy")
+        self.date_column = load("dates.npy")
+
+        # Orders added after the build, searched exactly until the next rebuild
+        self._extra_ids: List[str] = []
+        self._extra_vendors: List[str] = []
+        self._extra_dates: List[str] = []
+        self._extra_vectors: List[np.ndarray] = []
+
+    @classmethod
+    def build(cls, path: str, ids: List[str], embeddings, vendors: List[str],
+              dtype: str = 'int8', dates: Optional[List[str]] = None) -> "QuantizedVectorIndex":
+        """
+        Write a new index and open it
+
+        Args:
+            path: Directory to write the index files into
+            ids: Collection ids, one per embedding
+            embeddings: Float embeddings of shape (n, dim)
+            vendors: Vendor name of each order, used for filtering
+            dtype: Quantized storage type, one of QUANTIZED_DTYPES
+            dates: Optional order date (YYYY-MM-DD) of each order, used for filtering
+        """
+        os.makedirs(path, exist_ok=True)
+        full = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(full, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        full = full / norms
+
+        quantized, scales = quantize(full, dtype)
+        _save_atomic(os.path.join(path, "full.npy"), full)
+        _save_atomic(os.path.join(path, "quantized.npy"), quantized)
+        _save_atomic(os.path.join(path, "scales.npy"), scales)
+        vendor_names = _write_columns(path, list(ids), list(vendors), list(dates) if dates is not None else None)
+        _write_meta(path, dtype, len(ids), vendor_names)
+
+        return cls(path)
+
+    @staticmethod
+    def _migrate(path: str, meta: dict) -> dict:
+        """Move the id, vendor and date lists of an index written before the columns existed out of meta.json"""
+        vendor_names = _write_columns(path, meta['ids'], meta['vendors'], meta.get('dates'))
+        _write_meta(path, meta['dtype'], len(meta['ids']), vendor_names)
+        return {"dtype": meta['dtype'], "count": len(meta['ids']), "vendor_names": vendor_names}
+
+    @staticmethod
+    def stored_count(path: str) -> int:
+        """Number of orders written to an index directory, without opening it"""
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        return meta['count'] if 'count' in meta else len(meta['ids'])
+
+    def __len__(self) -> int:
+        return self.count + len(self._extra_ids)
+
+    @property
+    def ids(self) -> List[str]:
+        """Ids of the written orders, decoded from the id column (for checks, not the query path)"""
+        return [order_id.decode("utf-8") for order_id in self.id_column.tolist()]
+
+    @property
+    def dates(self) -> List[str]:
+        """Order dates of the written orders"""
+        return [date.decode("utf-8") for date in self.date_column.tolist()]
+
+    @property
+    def pending(self) -> int:
+        """Orders added since the files were written (lost if the index is dropped before compact())"""
+        return len(self._extra_ids)
+
+    def approx_bytes(self) -> int:
+        """Approximate memory held by the index when its quantized pages are resident"""
+        per_row = (self.quantized.itemsize * self.quantized.shape[1] + self.scales.itemsize
+                   + self.id_column.itemsize + self.vendor_column.itemsize + self.date_column.itemsize)
+        extra = sum(vector.nbytes + 64 for vector in self._extra_vectors)
+        return self.count * per_row + extra
+
+    def add(self, order_id: str, embedding, vendor: str, date: str = ""):
+        """Add one order without rewriting the memory-mapped files"""
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        self._extra_ids.append(order_id)
+        self._extra_vendors.append(vendor)
+        self._extra_dates.append(date)
+        self._extra_vectors.append(vector / norm if norm else vector)
+
+    def compact(self) -> "QuantizedVectorIndex":
+        """Append the added orders to the index files, returning the reopened index"""
+        if not self._extra_ids:
+            return self
+        full = np.vstack(self._extra_vectors).astype(np.float32)
+        quantized, scales = quantize(full, self.dtype)
+        vendor_names = list(self.vendor_names)
+        codes = dict(self._vendor_codes)
+        for vendor in self._extra_vendors:
+            if vendor not in codes:
+                codes[vendor] = len(vendor_names)
+                vendor_names.append(vendor)
+
+        columns = {
+            "full.npy": full,
+            "quantized.npy": quantized,
+            "scales.npy": scales,
+            "ids.npy": _encode(self._extra_ids, ID_WIDTH),
+            "vendor_codes.npy": np.array([codes[vendor] for vendor in self._extra_vendors], dtype=np.int32),
+            "dates.npy": _encode(self._extra_dates, DATE_WIDTH),
+        }
+        for file_name, rows in columns.items():
+            _append_rows(os.path.join(self.path, file_name), rows, self.count)
+        _write_meta(self.path, self.dtype, self.count + len(full), vendor_names)
+        return QuantizedVectorIndex(self.path)
+
+    def search(self, query_embedding, k: int = 10, rescore_factor: int = 4,
+               vendor_filter: Optional[str] = None,
+               date_range: Optional[Tuple[str, str]] = None) -> Tuple[List[str], List[float]]:
+        """
+        Find the k most similar orders
+
+        Args:
+            query_embedding: Query vector (any norm)
+            k: Number of results
+            rescore_factor: Candidates kept from the quantized pass per result
+            vendor_filter: Optional vendor name to restrict results to
+            date_range: Optional inclusive (start, end) YYYY-MM-DD order date range
+
+        Returns:
+            Tuple of (ids, cosine distances), closest first
+        """
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+
+        # First pass over the quantized vectors, block by block
+        approx = np.empty(self.count, dtype=np.float32)
+        for start in range(0, self.count, SCAN_BLOCK_ROWS):
+            block = self.quantized[start:start + SCAN_BLOCK_ROWS].astype(np.float32)
+            approx[start:start + len(block)] = block @ query
+        approx *= self.scales
+        if vendor_filter is not None:
+            code = self._vendor_codes.get(vendor_filter, -1)
+            approx = np.where(self.vendor_column == code, approx, -np.inf)
+        if date_range is not None:
+            low, high = date_range[0].encode("utf-8"), date_range[1].encode("utf-8")
+            approx = np.where((self.date_column >= low) & (self.date_column <= high), approx, -np.inf)
+
+        n_candidates = min(len(approx), k * rescore_factor)
+        if n_candidates > 0:
+            candidates = np.argpartition(-approx, n_candidates - 1)[:n_candidates]
+            candidates = np.sort(candidates[np.isfinite(approx[candidates])])
+            # Rescore the survivors against the float32 originals
+            exact = self.full[candidates] @ query
+            scored = list(zip((self.id_column[i].decode("utf-8") for i in candidates), exact.tolist()))
+        else:
+            scored = []
+
+        for order_id, vendor, date, vector in zip(
+                self._extra_ids, self._extra_vendors, self._extra_dates, self._extra_vectors):
+            if vendor_filter is not None and vendor != vendor_filter:
+                continue
+            if date_range is not None and not date_range[0] <= date <= date_range[1]:
+                continue
+            scored.append((order_id, float(vector @ query)))
+
+        scored.sort(key=lambda pair: -pair[1])
+        top = scored[:k]
+        return [order_id for order_id, _ in top], [1.0 - score for _, score in top]
@@ -7,28 +7,154 @@ import pandas as pd
 import chromadb
 from chromadb.config import Settings
 from sentence_transformers import SentenceTransformer
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import os
-from datetime import datetime
+import re
+import shutil
+import calendar
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from fuzzy_index import TrigramIndex, COMMON_VENDOR_WORDS
+from order_store import OrderStore, order_number
+from quantized_index import QuantizedVectorIndex
+from partitions import PartitionedIndex
+from prefix_trie import SuggestionIndex
+from session_cache import SessionContext
+from dedup import DuplicateIndex, DuplicateMatch, KEY_COLUMNS, ON_DUPLICATE_ACTIONS
+from validation import validate_orders, validate_order, quarantine
+from snapshot import publish_generation
+from memory_budget import MemoryBudget
+from archive import OrderArchive
+from answer_snapshots import AnswerSnapshots, PRERENDERED_VIEWS, RenderedAnswer, VendorSnapshot
+
+
+# Intent keywords recognised with typo tolerance, plus extra aliases for each
+INTENT_KEYWORDS = {
+    'payment': [],
+    'status': ['stat'],
+}
+
+# Text that gets embedded for each order. "full" embeds the whole display
+# document; the compact templates keep only fields that carry meaning for
+# semantic search (no contact numbers, bill numbers or rupee amounts).
+EMBEDDING_TEMPLATES = {
+    'full': None,
+    'compact': (
+        "Vendor: {vendor_name}\n"
+        "Item: {item_name} ({item_category})\n"
+        "State: {vendor_state}\n"
+        "Order Date: {order_date}\n"
+        "Payment Status: {payment_status}\n"
+        "Payment Mode: {payment_mode}\n"
+        "Transport Mode: {transport_mode}\n"
+        "Quality Check: {quality_check_status}"
+    ),
+    'minimal': "{vendor_name} - {item_name} ({item_category}) - payment {payment_status}",
+}
+
+# Words that refer back to the previous vendor ("their gst number?")
+FOLLOW_UP_WORDS = {'their', 'they', 'them', 'its', 'it', 'those', 'these', 'same'}
+# Short questions with these words but no vendor ("gst number?") also refer to the previous vendor
+VENDOR_QUESTION_WORDS = {'payment', 'status', 'gst', 'total', 'amount', 'spent', 'item', 'items', 'date', 'dates', 'detail', 'details'}
+PAYMENT_STATUSES = {'pending': 'Pending', 'paid': 'Paid', 'partial': 'Partial'}
+# Continue the last listing
+PAGING_WORDS = {'more', 'next'}
+# Words that may surround the above in a follow-up without changing its subject
+FOLLOW_UP_FILLER = {'and', 'also', 'what', 'whats', 'about', 'is', 'are', 'was', 'were', 'the', 'a', 'an', 'of',
+                    'for', 'in', 'me', 'show', 'tell', 'give', 'get', 'list', 'how', 'much', 'many', 'did', 'do',
+                    'does', 'please', 'order', 'orders', 'ones', 'only', 'just', 'number', 'payments', 'page', 'full'}
+# Questions about everything are never follow-ups ("show all pending payments")
+GLOBAL_SCOPE_WORDS = {'all', 'every', 'everything', 'each', 'any', 'overall', 'vendors', 'everyone'}
+FOLLOW_UP_MAX_WORDS = 6
+
+MONTH_NAMES = {name.lower(): number for number, name in enumerate(calendar.month_name) if name}
+MONTH_NAMES.update({name.lower(): number for number, name in enumerate(calendar.month_abbr) if name})
+
+
+def parse_date_scope(query: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Extract an order date scope such as "march 2025", "q1 2025" or "in 2025" from a query
+    
+    A year on its own only counts after a date word ("in 2025", "during 2025",
+    "year 2025", "fy 2025"), so "order 2031" or "2000 kg" are not date scopes.
+    
+    Returns:
+        Inclusive (date_from, date_to) in YYYY-MM-DD form, or (None, None)
+    """
+    query_lower = query.lower()
+    
+    match = re.search(r"\b([a-z]+)\s+(20\d\d)\b", query_lower)
+    if match and match.group(1) in MONTH_NAMES:
+        year, month = int(match.group(2)), MONTH_NAMES[match.group(1)]
+        last_day = calendar.monthrange(year, month)[1]
+        return f"{year}-{month:02d}-01", f"{year}-{month:02d}-{last_day}"
+    
+    match = re.search(r"\bq([1-4])\s+(20\d\d)\b", query_lower)
+    if match:
+        year, quarter = int(match.group(2)), int(match.group(1))
+        first, last = quarter * 3 - 2, quarter * 3
+        return f"{year}-{first:02d}-01", f"{year}-{last:02d}-{calendar.monthrange(year, last)[1]}"
+    
+    match = re.search(r"\b(?:in|during|year|fy)\s+(20\d\d)\b", query_lower)
+    if match:
+        return f"{match.group(1)}-01-01", f"{match.group(1)}-12-31"
+    
+    return None, None
+
+
+def stored_embedding_template(order_store: OrderStore) -> Optional[str]:
+    """
+    Embedding template the stored vectors were built with
+    
+    Databases loaded before the template was recorded were always embedded
+    with "full". None means an empty database that can take any template.
+    """
+    template = order_store.get_setting("embedding_template")
+    if template is None and order_store.count() > 0:
+        return "full"
+    return template
 
 
 class SakthiTextilesRAG:
     """RAG system for Sakthi Textiles order management"""
     
-    def __init__(self, csv_path: str = "textile_orders_5000.csv", db_path: str = "./chroma_db"):
+    def __init__(self, csv_path: str = "textile_orders_5000.csv", db_path: str = "./chroma_db",
+                 embedding_template: str = "full", partition_by: Optional[str] = None,
+                 partition_memory_mb: float = 256, embedder=None, memory_budget_mb: float = 512):
         """
         Initialize the RAG system
         
         Args:
             csv_path: Path to the CSV file containing order data
             db_path: Path to store ChromaDB database
+            embedding_template: Key of EMBEDDING_TEMPLATES used for the embedded text
+            partition_by: "month" or "quarter" to search per-period partitions
+                of order_date instead of the single collection, None to disable
+            partition_memory_mb: Memory budget for loaded partitions
+            embedder: Optional replacement for the MiniLM model, used both for
+                query embeddings and as the collection's embedding function
+                (e.g. offline_embedder.HashingEmbedder for load tests)
+            memory_budget_mb: Total memory allowed for caches and in-memory indexes
         """
+        if embedding_template not in EMBEDDING_TEMPLATES:
+            raise ValueError(f"Unknown embedding template: {embedding_template}")
+        
         self.csv_path = csv_path
         self.db_path = db_path
+        self.embedding_template = embedding_template
         
         # Initialize embedding model
-        print("Loading embedding model...")
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        if embedder is None:
+            print("Loading embedding model...")
+            self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+            self._collection_options = {}
+        else:
+            self.embedding_model = embedder
+            self._collection_options = {"embedding_function": embedder}
         
         # Initialize ChromaDB
         print("Initializing vector database...")
@@ -37,11 +163,137 @@ class SakthiTextilesRAG:
         # Get or create collection
         self.collection = self.client.get_or_create_collection(
             name="textile_orders",
-            metadata={"description": "Sakthi Textiles order records"}
+            metadata={"description": "Sakthi Textiles order records"},
+            **self._collection_options
         )
         
+        # Optional per-month/quarter partitions for date-scoped and fan-out search
+        self.partitions: Optional[PartitionedIndex] = None
+        if partition_by:
+            self.partitions = PartitionedIndex(
+                os.path.join(db_path, "partitions", partition_by),
+                granularity=partition_by,
+                memory_budget_mb=partition_memory_mb
+            )
+        # Whether the partitions were checked against the collection since startup
+        self._partitions_checked = False
+        
+        self._init_state(db_path, memory_budget_mb)
+        self._check_embedding_template()
+        self._register_memory()
+        
         print(f"RAG system initialized. Current records in DB: {self.collection.count()}")
     
+    def _check_embedding_template(self):
+        """
+        Record the embedding template, refusing to mix vectors from two templates
+        
+        Raises:
+            ValueError: If the database was embedded with a different template;
+                reload it with initialize_database() to switch templates
+        """
+        stored = stored_embedding_template(self.order_store)
+        if stored is None and self.collection.count() > 0:
+            stored = "full"
+        if stored == self.embedding_template:
+            if self.order_store.get_setting("embedding_template") is None:
+                self.order_store.set_setting("embedding_template", stored)
+            return
+        if stored is not None:
+            raise ValueError(
+                f"{self.db_path} was embedded with the '{stored}' template, not '{self.embedding_template}'; "
+                f"reload it with initialize_database(embedding_template='{self.embedding_template}')"
+            )
+        self.order_store.set_setting("embedding_template", self.embedding_template)
+    
+    def _init_state(self, db_path: str, memory_budget_mb: float):
+        """
+        Set up the stores, lazy indexes and caches shared by every kind of RAG system
+        
+        Subclasses that don't open Chroma (serve.SnapshotRAG) call this instead
+        of __init__, so a new cache or index only has to be added here.
+        """
+        # Full order records, returned at display time
+        self.order_store = OrderStore(os.path.join(db_path, "order_store.sqlite3"))
+        
+        # Orders failing validation are appended here instead of being indexed
+        self.quarantine_path = os.path.join(db_path, "quarantine.jsonl")
+        
+        # Cold tier: old, fully paid orders moved out of the collection by archive_orders()
+        self.archive = OrderArchive(os.path.join(db_path, "archive"))
+        self.archive_after_days = 365
+        
+        # Optional int8/float16 vector tier, opened on first quantized query
+        self.quantized_path = os.path.join(db_path, "quantized")
+        self.quantized_index: Optional[QuantizedVectorIndex] = None
+        
+        # Typo-tolerant vendor/item/intent index, built lazily from the collection
+        self._term_index: Optional[TrigramIndex] = None
+        self._vendor_names: List[str] = []
+        
+        # Typeahead tries over vendors, items, invoice numbers and order ids
+        self._suggestion_index: Optional[SuggestionIndex] = None
+        
+        # Changes whenever orders are added, so cached answers can tell they are stale
+        self.data_version = 0
+        self._snapshot_version = None
+        
+        # MinHash/LSH index of stored orders for duplicate checks at ingest, built lazily
+        self._duplicate_index: Optional[DuplicateIndex] = None
+        self.rejected_duplicates: deque = deque(maxlen=1000)
+        # One list per side index being built outside the ingest lock, see _catching_up()
+        self._insert_logs: List[list] = []
+        # Reentrant: an insert holding it may enforce the memory budget, whose evictions take it too
+        self._ingest_lock = threading.RLock()
+        
+        # (data version, orders grouped by vendor) while shared_vendor_scans() is active
+        self._shared_scans: Optional[Tuple[Any, Dict[str, Dict[str, List]]]] = None
+        
+        # Ready-to-serve answers per vendor, re-rendered only for vendors an insert touches
+        self.answer_snapshots = AnswerSnapshots(self._render_vendor_answers)
+        
+        # Every cache and in-memory index reports its size here and is evicted beyond the budget
+        self.memory = MemoryBudget(memory_budget_mb)
+    
+    def _register_memory(self):
+        """Register the caches and in-memory indexes with the memory budget"""
+        def size_of(name):
+            return lambda: getattr(self, name).approx_bytes() if getattr(self, name) is not None else 0
+        
+        def drop(name):
+            def evict(bytes_to_free):
+                # Under the ingest lock, so an insert never sees an index vanish half way;
+                # while one is running the index is kept and evicted at a later check
+                if self._ingest_lock.acquire(blocking=False):
+                    try:
+                        setattr(self, name, None)
+                    finally:
+                        self._ingest_lock.release()
+            return evict
+        
+        model_bytes = sum(parameter.numel() * parameter.element_size()
+                          for parameter in getattr(self.embedding_model, 'parameters', lambda: [])())
+        self.memory.register('embedding_model', lambda: model_bytes)
+        self.memory.register('term_index', size_of('_term_index'), drop('_term_index'))
+        self.memory.register('suggestion_index', size_of('_suggestion_index'), drop('_suggestion_index'))
+        self.memory.register('duplicate_index', size_of('_duplicate_index'), drop('_duplicate_index'))
+        self.memory.register('quantized_index', size_of('quantized_index'), self._evict_quantized_index)
+        self.memory.register('vendor_scans', self._shared_scans_bytes, drop('_shared_scans'))
+        self.memory.register('archive_summary', self.archive.approx_bytes, self.archive.drop_summary)
+        self.memory.register('answer_snapshots', self.answer_snapshots.approx_bytes, self.answer_snapshots.clear)
+        if self.partitions is not None:
+            self.memory.register('partitions', self.partitions.loaded_bytes, self.partitions.shrink)
+    
+    def _evict_quantized_index(self, bytes_to_free: int):
+        """Close the quantized tier unless it holds orders not yet written to its files"""
+        if not self._ingest_lock.acquire(blocking=False):
+            return
+        try:
+            if self.quantized_index is not None and not self.quantized_index.pending:
+                self.quantized_index = None
+        finally:
+            self._ingest_lock.release()
+    
     def create_document_from_order(self, order: Dict[str, Any]) -> str:
         """
         Convert an order record to a structured text document
@@ -79,6 +331,62 @@ Quality Check: {order['quality_check_status']}"""
         
         return doc
     
+    def create_embedding_text(self, order: Dict[str, Any]) -> str:
+        """
+        Build the text that is embedded for an order
+        
+        Args:
+            order: Dictionary containing order data
+            
+        Returns:
+            Text rendered with the configured embedding template
+        """
+        template = EMBEDDING_TEMPLATES[self.embedding_template]
+        if template is None:
+            return self.create_document_from_order(order)
+        return template.format(**order)
+    
+    def create_metadata_from_order(self, order: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the filterable metadata stored alongside each embedding"""
+        return {
+            "order_id": str(order['order_id']),
+            "invoice_no": str(order['invoice_no']),
+            "vendor_id": str(order['vendor_id']),
+            "vendor_name": str(order['vendor_name']),
+            "gst_number": str(order['gst_number']),
+            "item_id": str(order['item_id']),
+            "item_name": str(order['item_name']),
+            "item_category": str(order['item_category']),
+            "order_date": str(order['order_date']),
+            "payment_status": str(order['payment_status']),
+            "total_invoice_amount": float(order['total_invoice_amount']),
+        }
+    
+    def get_display_documents(self, ids: List[str], documents: Optional[List[str]] = None) -> List[str]:
+        """
+        Get full display documents for order ids
+        
+        Args:
+            ids: Collection ids of the orders
+            documents: Documents returned by the collection, used when the
+                store has no entry (e.g. a database built before the store existed);
+                fetched from the collection if not given
+                
+        Returns:
+            One full document per id
+        """
+        stored = self.order_store.get_documents(ids)
+        missing = [order_id for order_id, doc in zip(ids, stored) if doc is None]
+        if missing and not documents:
+            fetched = self.collection.get(ids=missing, include=["documents"])
+            by_id = dict(zip(fetched['ids'], fetched['documents'] or []))
+            documents = [by_id.get(order_id, "") for order_id in ids]
+        documents = documents or []
+        return [
+            doc if doc is not None else (documents[i] if i < len(documents) else "")
+            for i, doc in enumerate(stored)
+        ]
+    
     def load_csv_data(self) -> pd.DataFrame:
         """Load order data from CSV file"""
         print(f"Loading data from {self.csv_path}...")
@@ -86,46 +394,119 @@ Quality Check: {order['quality_check_status']}"""
         print(f"✅ Loaded {len(df)} orders from CSV")
         return df
     
-    def add_orders_to_db(self, df: pd.DataFrame, batch_size: int = 100):
+    def add_orders_to_db(self, df: pd.DataFrame, batch_size: int = 100,
+                         on_duplicate: str = "reject", validate: bool = True) -> List[Dict[str, str]]:
         """
         Add orders to the vector database
         
         Args:
             df: DataFrame containing order data
             batch_size: Number of records to process at once
+            on_duplicate: "reject" to skip orders that duplicate a stored order
+                (or an earlier row of df), "flag" to add them but report them,
+                "allow" to skip the check
+            validate: Normalise dates/enums/GST numbers and quarantine invalid rows
+            
+        Returns:
+            The duplicates found, as {"order_id", "duplicate_of", "kind"} dicts
         """
+        if on_duplicate not in ON_DUPLICATE_ACTIONS:
+            raise ValueError(f"on_duplicate must be one of {ON_DUPLICATE_ACTIONS}")
+        if validate:
+            df = self._validate_orders(df)
         print(f"Processing {len(df)} orders...")
         
+        with self._ingest_lock:
+            df = self._skip_stored_ids(df)
+            duplicates = self._check_duplicates(df, on_duplicate)
+            if on_duplicate == "reject" and duplicates:
+                rejected_ids = {match.order_id for match in duplicates}
+                df = df[[f"order_{order_id}" not in rejected_ids for order_id in df['order_id']]]
+            self._write_orders(df, batch_size)
+            if self.quantized_index is not None and len(df):
+                # A closed tier catches up when it is next opened
+                self._fold_into_quantized_index([f"order_{order_id}" for order_id in df['order_id']])
+            if self.partitions is not None and self._partitions_checked and len(df):
+                self._fold_into_partitions([f"order_{order_id}" for order_id in df['order_id']])
+            duplicate_index = self._duplicate_index
+            if duplicate_index is not None:
+                duplicate_index.add(
+                    [f"order_{order_id}" for order_id in df['order_id']],
+                    df.to_dict('records'),
+                    duplicates if on_duplicate == "flag" else None
+                )
+            self._index_terms(df['vendor_name'].unique(), df['item_name'].unique())
+            self._suggestion_index = None
+            self._log_insert([f"order_{order_id}" for order_id in df['order_id']], df.to_dict('records'),
+                             duplicates if on_duplicate == "flag" else None)
+        
+        self.data_version += 1
+        self.answer_snapshots.vendors_changed(df['vendor_name'].unique(), self.data_version - 1, self.data_version)
+        
+        print(f"✅ Successfully added all orders to database!")
+        print(f"   Total records in DB: {self.collection.count()}")
+        return [match.to_dict() for match in duplicates]
+    
+    def _validate_orders(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Validate and normalise orders, quarantining the invalid ones"""
+        valid, rejected, report = validate_orders(df)
+        print(f"🧪 {report}")
+        if len(rejected):
+            quarantine(rejected, self.quarantine_path)
+            print(f"⚠️  {len(rejected)} invalid orders quarantined to {self.quarantine_path} "
+                  f"(e.g. order {rejected['order_id'].iloc[0]}: {rejected['errors'].iloc[0]})")
+        return valid
+    
+    def _skip_stored_ids(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Drop rows whose order id is already stored or archived rather than overwrite those orders"""
+        ids = [f"order_{order_id}" for order_id in df['order_id']]
+        taken = self.order_store.existing(ids) | self.archive.archived_ids(ids)
+        if not taken:
+            return df
+        print(f"⚠️  {len(taken)} orders reuse an existing order id, skipping them "
+              f"(e.g. {sorted(taken)[0]})")
+        return df[[order_id not in taken for order_id in ids]]
+    
+    def _check_duplicates(self, df: pd.DataFrame, on_duplicate: str) -> List[DuplicateMatch]:
+        """Find rows of df that duplicate stored orders or earlier rows"""
+        if on_duplicate == "allow" or df.empty:
+            return []
+        index = self.get_duplicate_index()
+        order_ids = [f"order_{order_id}" for order_id in df['order_id']]
+        duplicates = [match for match in index.check(order_ids, df.to_dict('records')) if match]
+        if duplicates:
+            action = "skipping" if on_duplicate == "reject" else "adding and flagging"
+            print(f"⚠️  {len(duplicates)} duplicate orders found, {action} them "
+                  f"(e.g. {duplicates[0].order_id} duplicates {duplicates[0].duplicate_of})")
+            if on_duplicate == "reject":
+                self.rejected_duplicates.extend(duplicates)
+        return duplicates
+    
+    def _write_orders(self, df: pd.DataFrame, batch_size: int):
+        """Write orders to the order store and the collection in batches"""
         documents = []
         metadatas = []
         ids = []
+        full_documents = []
+        records = []
         
         for idx, row in df.iterrows():
-            # Create document
-            doc = self.create_document_from_order(row.to_dict())
-            documents.append(doc)
+            order = row.to_dict()
+            
+            # Create embedded text and full display document
+            documents.append(self.create_embedding_text(order))
+            full_documents.append(self.create_document_from_order(order))
+            records.append(order)
             
             # Create metadata
-            metadata = {
-                "order_id": str(row['order_id']),
-                "invoice_no": str(row['invoice_no']),
-                "vendor_id": str(row['vendor_id']),
-                "vendor_name": str(row['vendor_name']),
-                "gst_number": str(row['gst_number']),
-                "item_id": str(row['item_id']),
-                "item_name": str(row['item_name']),
-                "item_category": str(row['item_category']),
-                "order_date": str(row['order_date']),
-                "payment_status": str(row['payment_status']),
-                "total_invoice_amount": float(row['total_invoice_amount']),
-            }
-            metadatas.append(metadata)
+            metadatas.append(self.create_metadata_from_order(order))
             
             # Create unique ID
             ids.append(f"order_{row['order_id']}")
             
             # Add in batches
             if len(documents) >= batch_size:
+                self.order_store.put_many(ids, full_documents, records)
                 self.collection.add(
                     documents=documents,
                     metadatas=metadatas,
@@ -135,20 +516,106 @@ Quality Check: {order['quality_check_status']}"""
                 documents = []
                 metadatas = []
                 ids = []
+                full_documents = []
+                records = []
         
         # Add remaining documents
         if documents:
+            self.order_store.put_many(ids, full_documents, records)
             self.collection.add(
                 documents=documents,
                 metadatas=metadatas,
                 ids=ids
             )
             print(f"  Added final batch of {len(documents)} orders...")
+    
+    def build_quantized_index(self, dtype: str = "int8") -> QuantizedVectorIndex:
+        """
+        Write the quantized vector tier from the embeddings stored in Chroma
         
-        print(f"✅ Successfully added all orders to database!")
-        print(f"   Total records in DB: {self.collection.count()}")
+        Args:
+            dtype: "int8" or "float16"
+            
+        Returns:
+            The newly opened index
+        """
+        print(f"Building {dtype} quantized index...")
+        all_records = self.collection.get(include=["embeddings", "metadatas"])
+        self.quantized_index = QuantizedVectorIndex.build(
+            self.quantized_path,
+            all_records['ids'],
+            all_records['embeddings'],
+            [metadata['vendor_name'] for metadata in all_records['metadatas']],
+            dtype=dtype,
+            dates=[metadata['order_date'] for metadata in all_records['metadatas']]
+        )
+        print(f"✅ Quantized index ready ({len(self.quantized_index)} vectors)")
+        return self.quantized_index
+    
+    def build_partitions(self):
+        """Rewrite the time partitions from the embeddings stored in Chroma"""
+        print(f"Building {self.partitions.granularity} partitions...")
+        all_records = self.collection.get(include=["embeddings", "metadatas"])
+        self.partitions.rebuild(all_records['ids'], all_records['embeddings'], all_records['metadatas'])
+        print(f"✅ Partitions ready ({len(self.partitions.keys())} partitions)")
+    
+    def get_quantized_index(self) -> QuantizedVectorIndex:
+        """Open the quantized tier from disk, building it if it doesn't exist yet"""
+        index = self.quantized_index
+        if index is None:
+            with self._ingest_lock:
+                if self.quantized_index is None:
+                    self._open_quantized_index()
+                index = self.quantized_index
+        self.memory.touch('quantized_index')
+        return index
+    
+    def _open_quantized_index(self):
+        """
+        Open the quantized tier and bring it up to date with the collection
+        
+        Its files can lag behind: orders added while it was closed, or added
+        and not compacted before a restart, are folded in. If it holds orders
+        the collection no longer has, it is rebuilt.
+        """
+        if not os.path.exists(os.path.join(self.quantized_path, "meta.json")):
+            self.build_quantized_index()
+            return
+        
+        self.quantized_index = QuantizedVectorIndex(self.quantized_path)
+        if len(self.quantized_index) == self.collection.count():
+            return
+        stored = self.collection.get(include=[])['ids']
+        known = set(self.quantized_index.ids)
+        missing = [order_id for order_id in stored if order_id not in known]
+        if len(known) + len(missing) != len(stored):
+            print(f"⚠️  Quantized tier holds orders that are no longer stored, rebuilding it")
+            self.build_quantized_index(dtype=self.quantized_index.dtype)
+            return
+        print(f"⚠️  Quantized tier is missing {len(missing)} orders, adding them")
+        self._fold_into_quantized_index(missing)
+    
+    def _fold_into_quantized_index(self, ids: List[str]):
+        """Add stored orders to the open quantized tier and rewrite its files with them"""
+        index = self.quantized_index
+        for start in range(0, len(ids), 500):
+            records = self.collection.get(ids=ids[start:start + 500], include=["embeddings", "metadatas"])
+            for order_id, embedding, metadata in zip(records['ids'], records['embeddings'], records['metadatas']):
+                index.add(order_id, embedding, metadata['vendor_name'], metadata['order_date'])
+        self.quantized_index = index.compact()
     
-    def query(self, query_text: str, n_results: int = 10, vendor_filter: Optional[str] = None) -> Dict[str, Any]:
+    def _fold_into_partitions(self, ids: List[str]):
+        """Add stored orders to their time partitions, writing each touched partition once"""
+        fetched = {'ids': [], 'embeddings': [], 'metadatas': []}
+        for start in range(0, len(ids), 500):
+            records = self.collection.get(ids=ids[start:start + 500], include=["embeddings", "metadatas"])
+            for key in fetched:
+                fetched[key].extend(records[key])
+        self.partitions.add_many(fetched['ids'], fetched['embeddings'], fetched['metadatas'])
+    
+    def query(self, query_text: str, n_results: int = 10, vendor_filter: Optional[str] = None,
+              use_quantized: bool = False, date_from: Optional[str] = None,
+              date_to: Optional[str] = None) -> Dict[str, Any]:
         """
         Query the RAG system
         
@@ -156,10 +623,29 @@ Quality Check: {order['quality_check_status']}"""
             query_text: Natural language query
             n_results: Number of results to retrieve
             vendor_filter: Optional vendor name to filter by
+            use_quantized: Search the quantized tier and rescore in float32
+                instead of querying the Chroma HNSW index
+            date_from: Optional first order date (YYYY-MM-DD) to search
+            date_to: Optional last order date (YYYY-MM-DD) to search
             
         Returns:
             Dictionary containing results and metadata
         """
+        if self.partitions is not None:
+            return self._query_partitions(query_text, n_results, vendor_filter, date_from, date_to)
+        
+        if use_quantized or date_from or date_to:
+            # Chroma can't range-filter string dates, so date scopes use the quantized tier
+            index = self.get_quantized_index()
+            query_embedding = self.embedding_model.encode(query_text, normalize_embeddings=True)
+            date_range = None
+            if date_from or date_to:
+                date_range = (date_from or "0000-00-00", date_to or "9999-99-99")
+            ids, distances = index.search(
+                query_embedding, k=n_results, vendor_filter=vendor_filter, date_range=date_range
+            )
+            return self._results_from_ids(ids, distances)
+        
         # Build where clause for filtering
         where_clause = None
         if vendor_filter:
@@ -174,16 +660,95 @@ Quality Check: {order['quality_check_status']}"""
         
         return results
     
+    def _query_partitions(self, query_text: str, n_results: int, vendor_filter: Optional[str],
+                          date_from: Optional[str], date_to: Optional[str]) -> Dict[str, Any]:
+        """Search the time partitions overlapping the date scope"""
+        if not self._partitions_checked:
+            with self._ingest_lock:
+                if not self._partitions_checked:
+                    # Orders left pending in a partition are lost when the process stops
+                    if self.partitions.count() != self.collection.count():
+                        self.build_partitions()
+                    self._partitions_checked = True
+        query_embedding = self.embedding_model.encode(query_text, normalize_embeddings=True)
+        self.memory.touch('partitions')
+        ids, distances = self.partitions.search(
+            query_embedding, k=n_results, vendor_filter=vendor_filter,
+            date_from=date_from, date_to=date_to
+        )
+        return self._results_from_ids(ids, distances)
+    
+    def _results_from_ids(self, ids: List[str], distances: List[float]) -> Dict[str, Any]:
+        """Fetch metadata and documents for ranked ids, shaped like collection.query()"""
+        records = self.collection.get(ids=ids, include=["metadatas", "documents"]) if ids else {
+            'ids': [], 'metadatas': [], 'documents': []
+        }
+        by_id = {
+            order_id: (metadata, document)
+            for order_id, metadata, document in zip(records['ids'], records['metadatas'], records['documents'])
+        }
+        hits = [(order_id, distance) for order_id, distance in zip(ids, distances) if order_id in by_id]
+        ids = [order_id for order_id, _ in hits]
+        
+        return {
+            'ids': [ids],
+            'distances': [[distance for _, distance in hits]],
+            'metadatas': [[by_id[order_id][0] for order_id in ids]],
+            'documents': [[by_id[order_id][1] for order_id in ids]],
+        }
+    
     def get_vendor_orders(self, vendor_name: str) -> List[Dict[str, Any]]:
         """Get all orders for a specific vendor"""
+        shared = self._shared_scans
+        if shared is not None and shared[0] == self.data_version:
+            self.memory.touch('vendor_scans')
+            return shared[1].get(vendor_name, {'ids': [], 'metadatas': [], 'documents': []})
+        
         results = self.collection.get(
             where={"vendor_name": {"$eq": vendor_name}}
         )
         return results
     
-    def get_vendor_items(self, vendor_name: str) -> List[str]:
-        """Get unique item names for a vendor"""
-        results = self.get_vendor_orders(vendor_name)
+    @contextmanager
+    def shared_vendor_scans(self):
+        """
+        Serve get_vendor_orders() from one read of the whole collection while active
+        
+        Batch runs ask many questions about the same few vendors; a single
+        scan grouped by vendor replaces a filtered Chroma read per question.
+        The scan is ignored once orders are added, and may be evicted by the
+        memory budget, in which case lookups go back to Chroma.
+        
+        Yields:
+            Number of vendors in the scan
+        """
+        started = time.perf_counter()
+        records = self.collection.get(include=["metadatas", "documents"])
+        scans: Dict[str, Dict[str, List]] = {}
+        for order_id, metadata, document in zip(records['ids'], records['metadatas'] or [],
+                                                records['documents'] or []):
+            scan = scans.setdefault(metadata['vendor_name'], {'ids': [], 'metadatas': [], 'documents': []})
+            scan['ids'].append(order_id)
+            scan['metadatas'].append(metadata)
+            scan['documents'].append(document)
+        
+        self._shared_scans = (self.data_version, scans)
+        self.memory.touch('vendor_scans', rebuild_seconds=time.perf_counter() - started)
+        try:
+            yield len(scans)
+        finally:
+            self._shared_scans = None
+    
+    def _shared_scans_bytes(self) -> int:
+        """Rough memory held by the shared vendor scans"""
+        shared = self._shared_scans
+        if shared is None:
+            return 0
+        return sum(len(scan['ids']) * 1500 + sum(len(document or "") for document in scan['documents']) for scan in shared[1].values())
+    
+    def get_vendor_items(self, vendor_name: str, results: Optional[Dict[str, Any]] = None) -> List[str]:
+        """Get unique item names for a vendor (from results if already fetched)"""
+        results = results or self.get_vendor_orders(vendor_name)
         
         if not results['metadatas']:
             return []
@@ -194,9 +759,9 @@ Quality Check: {order['quality_check_status']}"""
         
         return sorted(list(items))
     
-    def calculate_vendor_total(self, vendor_name: str) -> float:
-        """Calculate total amount spent by a vendor"""
-        results = self.get_vendor_orders(vendor_name)
+    def calculate_vendor_total(self, vendor_name: str, results: Optional[Dict[str, Any]] = None) -> float:
+        """Calculate total amount spent by a vendor (from results if already fetched)"""
+        results = results or self.get_vendor_orders(vendor_name)
         
         if not results['metadatas']:
             return 0.0
@@ -204,9 +769,9 @@ Quality Check: {order['quality_check_status']}"""
         total = sum(metadata['total_invoice_amount'] for metadata in results['metadatas'])
         return total
     
-    def get_vendor_gst(self, vendor_name: str) -> Optional[str]:
-        """Get GST number for a vendor"""
-        results = self.get_vendor_orders(vendor_name)
+    def get_vendor_gst(self, vendor_name: str, results: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """Get GST number for a vendor (from results if already fetched)"""
+        results = results or self.get_vendor_orders(vendor_name)
         
         if not results['metadatas']:
             return None
@@ -220,46 +785,279 @@ Quality Check: {order['quality_check_status']}"""
         )
         return results
     
-    def add_new_order(self, order_data: Dict[str, Any]) -> bool:
+    def next_order_id(self) -> int:
+        """
+        Numeric id for the next new order
+        
+        One past the highest id ever used. Counting the collection is not
+        enough: archived orders leave it, and their ids must not be reused.
+        """
+        highest = max(self.order_store.max_order_number(), self.archive.max_order_number())
+        if self.order_store.count() < self.collection.count():
+            # Databases built before the order store existed keep some ids only in the collection
+            indexed = self.collection.get(include=[])['ids']
+            highest = max([highest] + [order_number(order_id) for order_id in indexed])
+        return highest + 1
+    
+    def add_new_order(self, order_data: Dict[str, Any], on_duplicate: str = "reject") -> bool:
         """
         Add a new order to the database
         
         Args:
             order_data: Dictionary containing order information
+            on_duplicate: "reject", "flag" or "allow" (see add_orders_to_db)
             
         Returns:
-            True if successful
+            True if successful, False on errors, invalid orders or a rejected duplicate
+        """
+        return self.try_add_order(order_data, on_duplicate)[0]
+    
+    def try_add_order(self, order_data: Dict[str, Any],
+                      on_duplicate: str = "reject") -> Tuple[bool, Optional[Dict[str, str]]]:
+        """
+        Add a new order, also reporting the stored order it duplicates
+        
+        The duplicate is the one found by the check made under the ingest
+        lock, so callers don't need a second, racy find_duplicate().
+        
+        Returns:
+            (added, duplicate) where duplicate is {"order_id", "duplicate_of", "kind"} or None
         """
         try:
-            # Create document
-            doc = self.create_document_from_order(order_data)
+            order_data, errors = validate_order(order_data)
+            if errors:
+                print(f"❌ Invalid order {order_data.get('order_id')}: {'; '.join(errors)}")
+                quarantine(pd.DataFrame([{**order_data, 'errors': "; ".join(errors)}]), self.quarantine_path)
+                return False, None
+            
+            # Create embedded text and full display document
+            doc = self.create_embedding_text(order_data)
+            order_id = f"order_{order_data['order_id']}"
             
             # Create metadata
-            metadata = {
-                "order_id": str(order_data['order_id']),
-                "invoice_no": str(order_data['invoice_no']),
-                "vendor_id": str(order_data['vendor_id']),
-                "vendor_name": str(order_data['vendor_name']),
-                "gst_number": str(order_data['gst_number']),
-                "item_id": str(order_data['item_id']),
-                "item_name": str(order_data['item_name']),
-                "item_category": str(order_data['item_category']),
-                "order_date": str(order_data['order_date']),
-                "payment_status": str(order_data['payment_status']),
-                "total_invoice_amount": float(order_data['total_invoice_amount']),
-            }
-            
-            # Add to collection
-            self.collection.add(
-                documents=[doc],
-                metadatas=[metadata],
-                ids=[f"order_{order_data['order_id']}"]
-            )
+            metadata = self.create_metadata_from_order(order_data)
             
-            return True
+            with self._ingest_lock:
+                match = None
+                if on_duplicate != "allow":
+                    match = self.get_duplicate_index().check([order_id], [order_data])[0]
+                if match is not None:
+                    print(f"⚠️  Order {order_id} duplicates {match.duplicate_of} ({match.kind})")
+                    if on_duplicate == "reject":
+                        self.rejected_duplicates.append(match)
+                        return False, match.to_dict()
+                
+                # Add to collection
+                self.order_store.put_many([order_id], [self.create_document_from_order(order_data)], [order_data])
+                self.collection.add(
+                    documents=[doc],
+                    metadatas=[metadata],
+                    ids=[order_id]
+                )
+                duplicate_index = self._duplicate_index
+                if duplicate_index is not None:
+                    duplicate_index.add([order_id], [order_data], [match])
+                # Under the lock, so a rebuild of the side indexes can't drop the order
+                self._index_terms([metadata['vendor_name']], [metadata['item_name']])
+                suggestion_index = self._suggestion_index
+                if suggestion_index is not None:
+                    suggestion_index.add_order(metadata)
+                self._log_insert([order_id], [order_data], [match])
+            
+            self.data_version += 1
+            self.answer_snapshots.order_added(metadata['vendor_name'], self.data_version - 1, self.data_version,
+                                              order_id, metadata, doc)
+            
+            if self.quantized_index is not None or self.partitions is not None:
+                embedding = self.collection.get(ids=[order_id], include=["embeddings"])['embeddings'][0]
+                with self._ingest_lock:
+                    quantized_index = self.quantized_index
+                    if quantized_index is not None:
+                        quantized_index.add(order_id, embedding, metadata['vendor_name'], metadata['order_date'])
+                    if self.partitions is not None:
+                        self.partitions.add(order_id, embedding, metadata)
+            
+            return True, match.to_dict() if match else None
         except Exception as e:
             print(f"Error adding order: {e}")
+            return False, None
+    
+    def compact_storage(self) -> Dict[str, Any]:
+        """
+        Vacuum the order store and fold orders added since the last build into the quantized tier
+        
+        Chroma 0.4 has no API to compact its HNSW segments, so its files are left alone.
+        """
+        result = {'order_store_bytes_freed': self.order_store.vacuum()}
+        with self._ingest_lock:
+            quantized_index = self.quantized_index
+            if quantized_index is not None:
+                self.quantized_index = quantized_index.compact()
+                result['quantized_vectors'] = len(self.quantized_index)
+            if self.partitions is not None:
+                result['partition_vectors_written'] = self.partitions.compact()
+        return result
+    
+    def rebuild_side_indexes(self) -> Dict[str, int]:
+        """
+        Rebuild the term, suggestion and duplicate indexes from scratch and swap them in
+        
+        The new indexes are built without the ingest lock, so inserts don't
+        wait behind a long (and possibly niced) rebuild. Orders inserted
+        meanwhile are folded into them under the lock just before the swap.
+        """
+        with self._catching_up() as inserted:
+            term = self._build_term_index() if self._term_index is not None else None
+            suggestion = self._build_suggestion_index() if self._suggestion_index is not None else None
+            duplicate = self._build_duplicate_index() if self._duplicate_index is not None else None
+            with self._ingest_lock:
+                if self._catch_up(inserted, term, suggestion, duplicate):
+                    if term is not None:
+                        self._term_index, self._vendor_names = term
+                    if suggestion is not None:
+                        self._suggestion_index = suggestion
+                    if duplicate is not None:
+                        self._duplicate_index = duplicate
+        return {'vendors': len(self._vendor_names),
+                'duplicate_orders': len(duplicate) if duplicate is not None else 0}
+    
+    @contextmanager
+    def _catching_up(self):
+        """
+        Record the orders inserted while side indexes are built outside the ingest lock
+        
+        Yields:
+            A list collecting (order ids, order records, duplicate matches) per
+            insert, plus None if archiving replaced the stored orders meanwhile,
+            for _catch_up() to fold in under the lock before the swap
+        """
+        inserted = []
+        with self._ingest_lock:
+            self._insert_logs.append(inserted)
+        try:
+            yield inserted
+        finally:
+            with self._ingest_lock:
+                self._insert_logs.remove(inserted)
+    
+    def _log_insert(self, order_ids: List[str], records: List[Dict[str, Any]],
+                    matches: Optional[List[Optional[DuplicateMatch]]] = None):
+        """Hand an insert to every side index being built (call under the ingest lock)"""
+        for inserted in self._insert_logs:
+            inserted.append((order_ids, records, matches))
+    
+    def _catch_up(self, inserted: list, term: Optional[Tuple[TrigramIndex, List[str]]] = None,
+                  suggestion: Optional[SuggestionIndex] = None, duplicate: Optional[DuplicateIndex] = None) -> bool:
+        """
+        Fold the orders recorded by _catching_up() into freshly built side indexes
+        
+        The build may or may not have seen them, so each index skips orders it
+        already holds. Call under the ingest lock.
+        
+        Returns:
+            False if the stored orders were replaced meanwhile and the indexes must be discarded
+        """
+        if None in inserted:
             return False
+        for order_ids, records, matches in inserted:
+            if term is not None:
+                self._add_terms(term[0], term[1], [record['vendor_name'] for record in records],
+                                [record['item_name'] for record in records])
+            if suggestion is not None:
+                for record in records:
+                    if not suggestion.has_order(record['order_id']):
+                        suggestion.add_order(record)
+            if duplicate is not None:
+                duplicate.add(order_ids, records, matches)
+        return True
+    
+    def archive_orders(self, older_than_days: Optional[float] = None, paid_only: bool = True) -> Dict[str, Any]:
+        """
+        Move old orders out of the collection into the Parquet archive
+        
+        Archived orders leave the collection, the order store and the vector
+        tiers; their totals and items stay available from the archive's
+        summary table and date-scoped questions scan the archive.
+        
+        Args:
+            older_than_days: Archive orders placed more than this many days
+                ago (default: self.archive_after_days)
+            paid_only: Only archive fully paid orders, keeping pending and
+                partially paid ones in the hot tier however old they are
+        
+        Returns:
+            Dict with the date "cutoff" and the number of orders "archived"
+        """
+        if older_than_days is None:
+            older_than_days = self.archive_after_days
+        cutoff = (datetime.now() - timedelta(days=older_than_days)).strftime("%Y-%m-%d")
+        
+        with self._ingest_lock:
+            records = self.collection.get(include=["metadatas", "documents"])
+            selected = [
+                (order_id, metadata, document)
+                for order_id, metadata, document in zip(records['ids'], records['metadatas'] or [],
+                                                        records['documents'] or [])
+                if metadata['order_date'] < cutoff and (not paid_only or metadata['payment_status'] == 'Paid')
+            ]
+            if not selected:
+                return {'cutoff': cutoff, 'archived': 0}
+        
+            ids = [order_id for order_id, _, _ in selected]
+            stored = self.order_store.get_records(ids)
+            documents = self.get_display_documents(ids, [document for _, _, document in selected])
+            rows = [
+                {**metadata, **(record or {}), 'id': order_id, 'document': document}
+                for (order_id, metadata, _), record, document in zip(selected, stored, documents)
+            ]
+            self.archive.append(pd.DataFrame(rows))
+        
+            for start in range(0, len(ids), 500):
+                self.collection.delete(ids=ids[start:start + 500])
+            self.order_store.delete(ids)
+            self.data_version += 1
+        
+            if self.quantized_index is not None:
+                self.build_quantized_index(dtype=self.quantized_index.dtype)
+            elif os.path.exists(os.path.join(self.quantized_path, "meta.json")):
+                self.build_quantized_index(dtype=QuantizedVectorIndex(self.quantized_path).dtype)
+            if self.partitions is not None and self.partitions.keys():
+                self.build_partitions()
+            self._term_index = None
+            self._suggestion_index = None
+            self._duplicate_index = None
+            for inserted in self._insert_logs:
+                inserted.append(None)
+        
+        print(f"🗄️  Archived {len(ids)} orders placed before {cutoff} ({self.collection.count()} remain in the index)")
+        return {'cutoff': cutoff, 'archived': len(ids)}
+
+    def persist_snapshot(self) -> Optional[str]:
+        """Publish a read-only index generation if orders changed since the last one"""
+        if self._snapshot_version == self.data_version:
+            return None
+        version = self.data_version
+        name = publish_generation(self.collection, os.path.join(self.db_path, "generations"))
+        self._snapshot_version = version
+        return name
+    
+    def warm_caches(self, queries: List[str], pause=None) -> Dict[str, Any]:
+        """
+        Build the lazy indexes and replay queries so their pages and caches are warm
+        
+        Args:
+            queries: Queries to answer (results are discarded)
+            pause: Called between queries, e.g. to stay under a CPU budget
+        """
+        started = datetime.now()
+        self.get_term_index()
+        self.get_suggestion_index()
+        self.prerender_answers()
+        for query in queries:
+            self.answer_query(query)
+            if pause is not None:
+                pause()
+        return {'queries': len(queries), 'seconds': round((datetime.now() - started).total_seconds(), 3)}
     
     def get_all_vendor_names(self) -> List[str]:
         """Get all unique vendor names from the database"""
@@ -279,23 +1077,169 @@ Quality Check: {order['quality_check_status']}"""
             print(f"Error getting vendor names: {e}")
             return []
     
-    def find_vendor_in_query(self, query: str) -> Optional[str]:
+    def get_term_index(self) -> TrigramIndex:
+        """Get the trigram index over vendor names, item names and intent keywords"""
+        index = self._term_index
+        if index is None:
+            started = time.perf_counter()
+            with self._ingest_lock:
+                if self._term_index is None:
+                    self._term_index, self._vendor_names = self._build_term_index()
+                index = self._term_index
+            self.memory.touch('term_index', rebuild_seconds=time.perf_counter() - started)
+        else:
+            self.memory.touch('term_index')
+        return index
+    
+    def _build_term_index(self) -> Tuple[TrigramIndex, List[str]]:
+        """Build a term index and the sorted vendor names it covers"""
+        index = TrigramIndex()
+        for intent, aliases in INTENT_KEYWORDS.items():
+            index.add(intent, "intent")
+            for alias in aliases:
+                index.add(intent, "intent", alias=alias)
+        vendor_names, item_names = self._term_sources()
+        # Vendors and items whose orders are all archived are still recognised
+        vendor_names = sorted({str(vendor) for vendor in vendor_names} | set(self.archive.vendors()))
+        item_names = sorted({str(item) for item in item_names} | set(self.archive.items()))
+        for vendor in vendor_names:
+            index.add_vendor(vendor)
+        for item in item_names:
+            index.add(str(item), "item")
+        return index, vendor_names
+    
+    def _term_sources(self) -> Tuple[List[str], List[str]]:
+        """Distinct vendor and item names to index"""
+        all_records = self.collection.get(include=["metadatas"])
+        metadatas = all_records['metadatas'] or []
+        return (
+            sorted({metadata['vendor_name'] for metadata in metadatas}),
+            sorted({metadata['item_name'] for metadata in metadatas})
+        )
+    
+    def _index_terms(self, vendor_names, item_names):
+        """Add newly seen vendor and item names to the term index if it is built"""
+        index = self._term_index
+        if index is not None:
+            self._add_terms(index, self._vendor_names, vendor_names, item_names)
+    
+    @staticmethod
+    def _add_terms(index: TrigramIndex, known_vendors: List[str], vendor_names, item_names):
+        """Add vendor and item names to a term index, keeping its sorted vendor list in step"""
+        for vendor in vendor_names:
+            vendor = str(vendor)
+            if vendor not in known_vendors:
+                known_vendors.append(vendor)
+                index.add_vendor(vendor)
+        known_vendors.sort()
+        for item in item_names:
+            index.add(str(item), "item")
+    
+    def get_suggestion_index(self) -> SuggestionIndex:
+        """Get the typeahead tries, building them from the collection on first use"""
+        index = self._suggestion_index
+        if index is None:
+            started = time.perf_counter()
+            with self._ingest_lock:
+                if self._suggestion_index is None:
+                    self._suggestion_index = self._build_suggestion_index()
+                index = self._suggestion_index
+            self.memory.touch('suggestion_index', rebuild_seconds=time.perf_counter() - started)
+        else:
+            self.memory.touch('suggestion_index')
+        return index
+    
+    def _build_suggestion_index(self) -> SuggestionIndex:
+        index = SuggestionIndex()
+        all_records = self.collection.get(include=["metadatas"])
+        for metadata in all_records['metadatas'] or []:
+            index.add_order(metadata)
+        return index
+    
+    def get_duplicate_index(self) -> DuplicateIndex:
+        """Get the duplicate index, building it from the order store on first use"""
+        index = self._duplicate_index
+        if index is None:
+            started = time.perf_counter()
+            # Built without the ingest lock; orders inserted meanwhile are folded in before it is kept
+            with self._catching_up() as inserted:
+                index = self._build_duplicate_index()
+                with self._ingest_lock:
+                    if self._duplicate_index is not None:
+                        index = self._duplicate_index
+                    elif self._catch_up(inserted, duplicate=index):
+                        self._duplicate_index = index
+            self.memory.touch('duplicate_index', rebuild_seconds=time.perf_counter() - started)
+        else:
+            self.memory.touch('duplicate_index')
+        return index
+    
+    def _build_duplicate_index(self) -> DuplicateIndex:
+        index = DuplicateIndex()
+        ids, records = self.order_store.all_records()
+        index.add(ids, records)
+        # Re-imports of archived orders are duplicates too
+        archived = self.archive.scan(columns=['id'] + list(KEY_COLUMNS))
+        if len(archived):
+            index.add(archived['id'].tolist(), archived.to_dict('records'))
+        # Duplicates stored before checks existed show up in the report too
+        index.scan()
+        return index
+    
+    def find_duplicate(self, order_data: Dict[str, Any]) -> Optional[Dict[str, str]]:
+        """The stored order that order_data duplicates, as {"order_id", "duplicate_of", "kind"}, or None"""
+        match = self.get_duplicate_index().check([f"order_{order_data['order_id']}"], [order_data])[0]
+        return match.to_dict() if match else None
+    
+    def duplicate_report(self) -> Dict[str, Any]:
         """
-        Find vendor name in query by checking against all known vendors
+        Clusters of stored duplicate orders and recently rejected duplicates
+        
+        Returns:
+            Dict with "clusters" (order ids, vendor, item, order date and the
+            amount counted more than once), their total "excess_amount" and
+            the "rejected" duplicates
+        """
+        index = self.get_duplicate_index()
+        clusters = []
+        for ids in index.clusters():
+            records = [record for record in self.order_store.get_records(ids) if record]
+            if not records:
+                continue
+            amounts = [float(record.get('total_invoice_amount', 0) or 0) for record in records]
+            clusters.append({
+                'order_ids': ids,
+                'vendor_name': records[0].get('vendor_name'),
+                'item_name': records[0].get('item_name'),
+                'order_date': records[0].get('order_date'),
+                'excess_amount': round(sum(amounts) - amounts[0], 2),
+            })
+        return {
+            'clusters': clusters,
+            'excess_amount': round(sum(cluster['excess_amount'] for cluster in clusters), 2),
+            'rejected': [match.to_dict() for match in self.rejected_duplicates],
+        }
+    
+    def suggest(self, text: str, limit: int = 8) -> Dict[str, Any]:
+        """Typeahead suggestions for partially typed vendors, items, invoices and order ids"""
+        return self.get_suggestion_index().suggest(text, limit)
+    
+    def resolve_vendor(self, query: str) -> Tuple[Optional[str], float]:
+        """
+        Resolve the vendor mentioned in a query, tolerating typos
         
         Args:
             query: User query string
             
         Returns:
-            Matched vendor name or None
+            Tuple of (vendor name or None, confidence between 0 and 1).
+            Exact name matches score 1.0, misspellings score lower.
         """
+        index = self.get_term_index()
         query_lower = query.lower()
         
-        # Get all vendor names from database
-        all_vendors = self.get_all_vendor_names()
-        
         # Check for exact or partial matches
-        for vendor in all_vendors:
+        for vendor in self._vendor_names:
             vendor_lower = vendor.lower()
             
             # Check if vendor name or significant part is in query
@@ -303,32 +1247,56 @@ Quality Check: {order['quality_check_status']}"""
             
             # Check for full vendor name match
             if vendor_lower in query_lower:
-                return vendor
+                return vendor, 1.0
             
             # Check for partial match (at least 2 words or single significant word)
             if len(vendor_words) >= 2:
-                # Check if any 2+ consecutive words match
+                # Check if any 2+ consecutive words match, unless both are generic ("yarn mills")
                 for i in range(len(vendor_words) - 1):
                     partial = ' '.join(vendor_words[i:i+2])
+                    if set(vendor_words[i:i+2]) <= COMMON_VENDOR_WORDS:
+                        continue
                     if partial in query_lower and len(partial) > 5:  # Avoid short matches
-                        return vendor
+                        return vendor, 1.0
             
             # Check for single word match if it's significant (>4 chars)
             for word in vendor_words:
                 if len(word) > 4 and word in query_lower:
                     # Verify it's not a common word
-                    common_words = ['textiles', 'traders', 'mills', 'fabrics', 'spinning', 'yarn', 'tech']
-                    if word not in common_words:
-                        return vendor
+                    if word not in COMMON_VENDOR_WORDS:
+                        return vendor, 1.0
         
-        return None
+        # Fall back to typo-tolerant trigram matching before any semantic search
+        return index.find_in_text(query, "vendor")
     
-    def answer_query(self, user_query: str) -> str:
+    def find_vendor_in_query(self, query: str) -> Optional[str]:
+        """
+        Find vendor name in query by checking against all known vendors
+        
+        Args:
+            query: User query string
+            
+        Returns:
+            Matched vendor name or None
+        """
+        return self.resolve_vendor(query)[0]
+    
+    def find_item_in_query(self, query: str) -> Tuple[Optional[str], float]:
+        """Find an item name in query, tolerating typos"""
+        return self.get_term_index().find_in_text(query, "item")
+    
+    def has_intent(self, query: str, intent: str) -> bool:
+        """Check whether a query mentions an intent keyword, tolerating typos"""
+        return self.get_term_index().has_intent(query, intent)
+    
+    def answer_query(self, user_query: str, session: Optional[SessionContext] = None) -> str:
         """
         Process user query and return answer
         
         Args:
             user_query: Natural language question
+            session: Optional conversation context; follow-ups reuse its
+                vendor and cached result set
             
         Returns:
             Answer string
@@ -336,148 +1304,355 @@ Quality Check: {order['quality_check_status']}"""
         query_lower = user_query.lower()
         
         # Try to find vendor name in query
-        vendor_name = self.find_vendor_in_query(user_query)
+        vendor_name, confidence = self.resolve_vendor(user_query)
+        
+        if session is not None and vendor_name is None and session.vendor and self._is_followup(user_query):
+            followup = self._answer_followup(query_lower, session)
+            if followup is not None:
+                return followup
+            
+            # "and their payment status?" refers to the vendor of the previous question
+            vendor_name, confidence = session.vendor, 1.0
+        
+        response = self._answer_vendor_query(user_query, query_lower, vendor_name, session)
+        if response is None:
+            return self._answer_semantic_query(user_query)
+        
+        # Tell the user when a misspelled vendor name was corrected
+        if vendor_name and confidence < 1.0:
+            response = f"🔎 Showing results for {vendor_name} (match confidence {confidence:.0%})\n\n" + response
+        return response
+    
+    def _vendor_orders(self, vendor_name: str, session: Optional[SessionContext]) -> Dict[str, Any]:
+        """Vendor orders from the session cache, fetching (and caching) them on a miss"""
+        if session is not None:
+            cached = session.cached_results(vendor_name, self.data_version)
+            if cached is not None:
+                return cached
+        
+        results = self.get_vendor_orders(vendor_name)
+        if session is not None and results['metadatas']:
+            session.remember(vendor_name, results, self.data_version)
+        return results
+    
+    def _archived_scope(self, user_query: str) -> Tuple[Optional[str], Optional[str]]:
+        """The query's date scope if it reaches archived months, else (None, None)"""
+        date_from, date_to = parse_date_scope(user_query)
+        if date_from and self.archive.covers(date_from, date_to):
+            return date_from, date_to
+        return None, None
+    
+    def _scoped_vendor_orders(self, vendor_name: str, session: Optional[SessionContext],
+                              date_from: Optional[str], date_to: Optional[str]) -> Dict[str, Any]:
+        """Vendor orders, limited to a date scope and including the archived ones in it when one is given"""
+        results = self._vendor_orders(vendor_name, session)
+        if not date_from:
+            return results
+        
+        scoped = {'ids': [], 'metadatas': [], 'documents': []}
+        archived = self.archive.scan(vendor=vendor_name, date_from=date_from, date_to=date_to)
+        for record in archived.to_dict('records'):
+            scoped['ids'].append(record['id'])
+            scoped['metadatas'].append(self.create_metadata_from_order(record))
+            scoped['documents'].append(record.get('document'))
+        
+        documents = results.get('documents') or []
+        for i, (order_id, metadata) in enumerate(zip(results['ids'], results['metadatas'])):
+            if date_from <= metadata['order_date'] <= date_to:
+                scoped['ids'].append(order_id)
+                scoped['metadatas'].append(metadata)
+                scoped['documents'].append(documents[i] if i < len(documents) else None)
+        return scoped
+    
+    def _archived_note(self, vendor_name: str) -> str:
+        """Pointer to a vendor's archived orders, for answers listing only the live ones"""
+        archived = int(self.archive.totals(vendor_name)['orders'])
+        if not archived:
+            return ""
+        return (f"\n\n🗄️  {archived} older orders of {vendor_name} are archived; "
+                f"mention a month or year (e.g. \"march 2024\") to include them")
+    
+    def _archived_matches(self, user_query: str) -> str:
+        """Archived orders in the query's date scope, narrowed by item and payment status when mentioned"""
+        date_from, date_to = self._archived_scope(user_query)
+        if not date_from:
+            return ""
+        
+        where = {}
+        item, _ = self.find_item_in_query(user_query)
+        if item:
+            where['item_name'] = item
+        words = set(re.findall(r"[a-z]+", user_query.lower()))
+        for word, status in PAYMENT_STATUSES.items():
+            if word in words:
+                where['payment_status'] = status
+        
+        orders = self.archive.scan(date_from=date_from, date_to=date_to, where=where,
+                                   columns=['vendor_name', 'item_name', 'order_date', 'total_invoice_amount'])
+        if orders.empty:
+            return ""
+        response = (f"\n\n🗄️  Archived orders from {date_from} to {date_to}: {len(orders)} "
+                    f"(₹{orders['total_invoice_amount'].sum():,.2f})\n")
+        for i, order in enumerate(orders.head(5).itertuples()):
+            response += f"{i+1}. {order.vendor_name} - {order.item_name} - {order.order_date} - ₹{order.total_invoice_amount:,.2f}\n"
+        return response
+    
+    def _is_followup(self, user_query: str) -> bool:
+        """
+        Whether a question without a vendor continues the previous one
+        
+        Only short questions made of follow-up words ("and their gst number?",
+        "pending ones", "more") count. Anything with other content, naming an
+        item or asking about everything is answered on its own.
+        """
+        words = re.findall(r"[a-z0-9]+", user_query.lower())
+        if not words or len(words) > FOLLOW_UP_MAX_WORDS or set(words) & GLOBAL_SCOPE_WORDS:
+            return False
+        
+        references = FOLLOW_UP_WORDS | VENDOR_QUESTION_WORDS | PAGING_WORDS | set(PAYMENT_STATUSES)
+        if not set(words) & references:
+            return False
+        for word in words:
+            # Dates narrow the previous vendor's orders ("their orders in march 2025")
+            is_date = word in MONTH_NAMES or re.fullmatch(r"(20\d\d|q[1-4])", word)
+            if word not in references and word not in FOLLOW_UP_FILLER and not is_date:
+                return False
+        return self.find_item_in_query(user_query)[0] is None
+    
+    def _answer_followup(self, query_lower: str, session: SessionContext) -> Optional[str]:
+        """Page or filter the session's last listing, or None if this is not such a follow-up"""
+        words = set(re.findall(r"[a-z]+", query_lower))
+        vendor_name = session.vendor
+        
+        if words & PAGING_WORDS and not words & (VENDOR_QUESTION_WORDS | set(PAYMENT_STATUSES)) and session.listing:
+            start = session.offset
+            page = session.listing[start:start + 10]
+            if not page:
+                return f"No more orders for {vendor_name}."
+            session.offset = start + len(page)
+            
+            response = f"More orders for {vendor_name} ({start + 1}-{session.offset} of {len(session.listing)}):\n\n"
+            for i, metadata in enumerate(page, start + 1):
+                response += f"{i}. Order {metadata['order_id']} - {metadata['item_name']} - ₹{metadata['total_invoice_amount']:,.2f} - {metadata['payment_status']}\n"
+            if session.offset < len(session.listing):
+                response += f"\n💡 Tip: Say 'more' to see the next orders"
+            return response
+        
+        statuses = [PAYMENT_STATUSES[word] for word in words if word in PAYMENT_STATUSES]
+        if len(statuses) == 1 and session.result_metadatas:
+            matching = [m for m in session.result_metadatas if m['payment_status'] == statuses[0]]
+            if not matching:
+                return f"No {statuses[0].lower()} orders for {vendor_name}."
+            
+            shown = matching[:10]
+            response = f"{statuses[0]} orders for {vendor_name} ({len(matching)} of {len(session.result_metadatas)}):\n\n"
+            for i, metadata in enumerate(shown, 1):
+                response += f"{i}. Order {metadata['order_id']} - {metadata['item_name']} - ₹{metadata['total_invoice_amount']:,.2f}\n"
+            if len(matching) > len(shown):
+                response += f"\n... and {len(matching) - len(shown)} more (say 'more')"
+            self._remember_listing(session, 'payment_filter', matching, len(shown))
+            return response
+        
+        return None
+    
+    def _remember_listing(self, session: Optional[SessionContext], intent: str,
+                          listing: List[Dict[str, Any]], shown: int):
+        """Record what the last answer listed so 'more' can continue from there"""
+        if session is None:
+            return
+        session.intent = intent
+        session.listing = listing
+        session.offset = shown
+    
+    def _vendor_view(self, query_lower: str, vendor_name: Optional[str]) -> Optional[str]:
+        """Which view of a vendor's orders a query asks for, or None if semantic search is needed"""
+        if not vendor_name:
+            return None
         
         # Detect if user wants specific vendor details
         show_keywords = ['show', 'details', 'get', 'find', 'list']
         is_show_query = any(keyword in query_lower for keyword in show_keywords)
         
         # Handle different query types
-        if "item" in query_lower and vendor_name:
-            items = self.get_vendor_items(vendor_name)
+        if "item" in query_lower:
+            return 'items'
+        if "total" in query_lower or "amount" in query_lower or "spent" in query_lower:
+            return 'total'
+        if "gst" in query_lower:
+            return 'gst'
+        if "order" in query_lower or "detail" in query_lower or is_show_query or self.has_intent(query_lower, 'payment'):
+            # Check for specific question types (with typo tolerance)
+            if self.has_intent(query_lower, 'payment') and self.has_intent(query_lower, 'status'):
+                return 'payment_status'
+            if "date" in query_lower:
+                return 'dates'
+            
+            # Check if user wants full/all details, or the detailed view
+            full_keywords = ['full', 'all', 'complete', 'everything', 'comprehensive']
+            if any(keyword in query_lower for keyword in full_keywords):
+                return 'full_details'
+            detailed_keywords = ['detail', 'payment', 'status', 'show']
+            if any(keyword in query_lower for keyword in detailed_keywords):
+                return 'details'
+            return 'summary'
+        
+        # If vendor is mentioned but no specific query type, show vendor orders with details
+        return 'orders'
+    
+    def _answer_vendor_query(self, user_query: str, query_lower: str, vendor_name: Optional[str],
+                             session: Optional[SessionContext] = None) -> Optional[str]:
+        """Answer a query using structured lookups, or None if semantic search is needed"""
+        view = self._vendor_view(query_lower, vendor_name)
+        if view is None:
+            return None
+        
+        # Questions about archived months also read the archive
+        date_from, date_to = self._archived_scope(user_query)
+        if date_from or view not in PRERENDERED_VIEWS:
+            results = self._scoped_vendor_orders(vendor_name, session, date_from, date_to)
+            answer = self._render_vendor_view(view, vendor_name, results, scoped=bool(date_from))
+        else:
+            snapshot = self.get_answer_snapshot(vendor_name)
+            results, answer = snapshot.results, snapshot.answers[view]
+            if session is not None and results['metadatas'] and \
+                    session.cached_results(vendor_name, self.data_version) is None:
+                session.remember(vendor_name, results, self.data_version)
+        
+        if answer.shown:
+            self._remember_listing(session, view, results['metadatas'], answer.shown)
+        elif session is not None and view in ('items', 'total', 'gst'):
+            session.intent = view
+        return answer
+    
+    def get_answer_snapshot(self, vendor_name: str) -> VendorSnapshot:
+        """Pre-rendered answers about a vendor, rendered now if it has none at this data version"""
+        self.memory.touch('answer_snapshots')
+        return self.answer_snapshots.get(vendor_name, self.data_version,
+                                         lambda: self.get_vendor_orders(vendor_name))
+    
+    def prerender_answers(self) -> int:
+        """Render the snapshots of every known vendor, returning how many vendors there are"""
+        self.get_term_index()
+        for vendor_name in self._vendor_names:
+            self.get_answer_snapshot(vendor_name)
+        return len(self._vendor_names)
+    
+    def _render_vendor_answers(self, vendor_name: str, results: Dict[str, Any]) -> Dict[str, RenderedAnswer]:
+        return {view: self._render_vendor_view(view, vendor_name, results) for view in PRERENDERED_VIEWS}
+    
+    def _render_vendor_view(self, view: str, vendor_name: str, results: Dict[str, Any],
+                            scoped: bool = False) -> RenderedAnswer:
+        """
+        Render one view of a vendor's orders
+        
+        Args:
+            view: "items", "total", "gst", "payment_status", "dates",
+                "full_details", "details", "summary" or "orders"
+            vendor_name: Vendor the orders belong to
+            results: The vendor's orders (collection.get() shape)
+            scoped: results are limited to a date scope and already include
+                archived orders; otherwise archived orders are added from the
+                summary table or pointed to
+        """
+        metadatas = results['metadatas'] or []
+        count = len(metadatas)
+        note = "" if scoped else self._archived_note(vendor_name)
+        
+        if view == 'items':
+            items = self.get_vendor_items(vendor_name, results)
+            if not scoped:
+                items = sorted(set(items) | set(self.archive.items(vendor_name)))
             if not items:
-                return f"No records found for {vendor_name}."
-            return f"Items ordered by {vendor_name}:\n" + "\n".join(f"• {item}" for item in items)
-        
-        elif "total" in query_lower or "amount" in query_lower or "spent" in query_lower:
-            if vendor_name:
-                total = self.calculate_vendor_total(vendor_name)
-                if total == 0:
-                    return f"No records found for {vendor_name}."
-                return f"Total amount spent by {vendor_name}: ₹{total:,.2f}"
-        
-        elif "gst" in query_lower and vendor_name:
-            gst = self.get_vendor_gst(vendor_name)
+                return RenderedAnswer(f"No records found for {vendor_name}.")
+            return RenderedAnswer(f"Items ordered by {vendor_name}:\n" + "\n".join(f"• {item}" for item in items))
+        
+        if view == 'total':
+            total = self.calculate_vendor_total(vendor_name, results)
+            if not scoped:
+                total += self.archive.totals(vendor_name)['total_invoice_amount']
+            if total == 0:
+                return RenderedAnswer(f"No records found for {vendor_name}.")
+            return RenderedAnswer(f"Total amount spent by {vendor_name}: ₹{total:,.2f}")
+        
+        if view == 'gst':
+            gst = self.get_vendor_gst(vendor_name, results)
             if not gst:
-                return f"No records found for {vendor_name}."
-            return f"GST Number of {vendor_name}: {gst}"
+                archived = self.archive.scan(vendor=vendor_name, columns=['gst_number'])
+                gst = archived['gst_number'].iloc[-1] if len(archived) else None
+            if not gst:
+                return RenderedAnswer(f"No records found for {vendor_name}.")
+            return RenderedAnswer(f"GST Number of {vendor_name}: {gst}")
         
-        elif ((("order" in query_lower or "detail" in query_lower or is_show_query) and vendor_name) or 
-              ("payment" in query_lower and vendor_name)):
-            results = self.get_vendor_orders(vendor_name)
-            if not results['metadatas']:
-                return f"No records found for {vendor_name}."
-            
-            # Get full document for detailed info
-            documents = results.get('documents', [])
-            metadatas = results['metadatas']
-            count = len(metadatas)
-            
-            # Check for specific question types (with typo tolerance)
-            payment_keywords = ['payment', 'payemnt', 'paymnt', 'pymnt']
-            status_keywords = ['status', 'sttaus', 'staus', 'stat']
-            
-            has_payment = any(keyword in query_lower for keyword in payment_keywords)
-            has_status = any(keyword in query_lower for keyword in status_keywords)
-            
-            if has_payment and has_status:
-                # Only show payment status
-                response = f"💳 Payment Status for {vendor_name}:\n\n"
-                for i, metadata in enumerate(metadatas[:5]):
-                    response += f"{i+1}. Order {metadata['order_id']} - Payment: {metadata['payment_status']}\n"
-                return response
-            
-            elif "gst" in query_lower and "number" in query_lower:
-                # Only show GST
-                gst = metadatas[0]['gst_number']
-                return f"🏢 GST Number of {vendor_name}: {gst}"
-            
-            elif "date" in query_lower:
-                # Only show dates
-                response = f"📅 Order Dates for {vendor_name}:\n\n"
-                for i, metadata in enumerate(metadatas[:5]):
-                    response += f"{i+1}. Order {metadata['order_id']} - Date: {metadata['order_date']}\n"
-                return response
-            
-            # Check if user wants full/all details
-            full_keywords = ['full', 'all', 'complete', 'everything', 'comprehensive']
-            show_full = any(keyword in query_lower for keyword in full_keywords)
+        if not metadatas:
+            return RenderedAnswer(f"No records found for {vendor_name}." + note)
+        
+        if view == 'payment_status':
+            # Only show payment status
+            response = f"💳 Payment Status for {vendor_name}:\n\n"
+            for i, metadata in enumerate(metadatas[:5]):
+                response += f"{i+1}. Order {metadata['order_id']} - Payment: {metadata['payment_status']}\n"
+            return RenderedAnswer(response + note, min(count, 5))
+        
+        if view == 'dates':
+            # Only show dates
+            response = f"📅 Order Dates for {vendor_name}:\n\n"
+            for i, metadata in enumerate(metadatas[:5]):
+                response += f"{i+1}. Order {metadata['order_id']} - Date: {metadata['order_date']}\n"
+            return RenderedAnswer(response + note, min(count, 5))
+        
+        if view == 'full_details':
+            # Show ALL fields from the document
+            response = f"📋 COMPLETE Details for {vendor_name} ({count} total orders):\n\n"
             
-            # Check if user wants detailed view
-            detailed_keywords = ['detail', 'payment', 'status', 'show']
-            show_detailed = any(keyword in query_lower for keyword in detailed_keywords)
+            max_show = min(count, 3)
             
-            if show_full:
-                # Show ALL fields from the document
-                response = f"📋 COMPLETE Details for {vendor_name} ({count} total orders):\n\n"
-                
-                max_show = min(count, 3)
-                for i in range(max_show):
-                    response += f"{'='*70}\n"
-                    response += f"ORDER #{i+1}\n"
-                    response += f"{'='*70}\n"
-                    
-                    # Parse the document to show all fields
-                    if documents and i < len(documents):
-                        doc = documents[i]
-                        response += doc + "\n\n"
-                    else:
-                        # Fallback to metadata
-                        metadata = metadatas[i]
-                        for key, value in metadata.items():
-                            response += f"{key}: {value}\n"
-                        response += "\n"
-                
-                if count > max_show:
-                    response += f"... and {count - max_show} more orders\n"
-                    
-            elif show_detailed:
-                # Show key details (enhanced version)
-                response = f"📋 Detailed Orders for {vendor_name} ({count} total):\n\n"
-                
-                max_show = min(count, 5)
-                for i, metadata in enumerate(metadatas[:max_show]):
-                    response += f"{'='*60}\n"
-                    response += f"Order #{i+1} - ID: {metadata['order_id']}\n"
-                    response += f"{'='*60}\n"
-                    response += f"📦 Item: {metadata['item_name']} ({metadata['item_category']})\n"
-                    response += f"💰 Amount: ₹{metadata['total_invoice_amount']:,.2f}\n"
-                    response += f"💳 Payment Status: {metadata['payment_status']}\n"
-                    response += f"📅 Order Date: {metadata['order_date']}\n"
-                    response += f"🏢 GST Number: {metadata['gst_number']}\n"
-                    response += f"📄 Invoice: {metadata['invoice_no']}\n\n"
-                
-                if count > max_show:
-                    response += f"... and {count - max_show} more orders\n"
-                    
-                response += f"\n💡 Tip: Use 'full details' or 'all details' to see every field"
-            else:
-                # Show summary view
-                response = f"Found {count} orders for {vendor_name}:\n\n"
-                
-                max_show = min(count, 10)
-                for i, metadata in enumerate(metadatas[:max_show]):
-                    response += f"{i+1}. Order {metadata['order_id']} - {metadata['item_name']} - ₹{metadata['total_invoice_amount']:,.2f}\n"
-                
-                if count > max_show:
-                    response += f"\n... and {count - max_show} more orders"
+            # Get full documents from the order store for the orders shown
+            documents = self.get_display_documents(
+                results['ids'][:max_show], (results.get('documents') or [])[:max_show]
+            )
+            for i in range(max_show):
+                response += f"{'='*70}\n"
+                response += f"ORDER #{i+1}\n"
+                response += f"{'='*70}\n"
                 
-                response += f"\n\n💡 Tip: Add 'details' to see more, or ask specific questions like 'payment status'"
+                # Parse the document to show all fields
+                if documents[i]:
+                    doc = documents[i]
+                    response += doc + "\n\n"
+                else:
+                    # Fallback to metadata
+                    metadata = metadatas[i]
+                    for key, value in metadata.items():
+                        response += f"{key}: {value}\n"
+                    response += "\n"
             
-            return response
+            if count > max_show:
+                response += f"... and {count - max_show} more orders\n"
+            return RenderedAnswer(response + note, max_show)
         
-        # If vendor is mentioned but no specific query type, show vendor orders with details
-        elif vendor_name:
-            results = self.get_vendor_orders(vendor_name)
-            if not results['metadatas']:
-                return f"No records found for {vendor_name}."
+        if view == 'summary':
+            # Show summary view
+            response = f"Found {count} orders for {vendor_name}:\n\n"
             
-            count = len(results['metadatas'])
-            response = f"📋 Orders for {vendor_name} ({count} total):\n\n"
+            max_show = min(count, 10)
+            for i, metadata in enumerate(metadatas[:max_show]):
+                response += f"{i+1}. Order {metadata['order_id']} - {metadata['item_name']} - ₹{metadata['total_invoice_amount']:,.2f}\n"
             
-            # Show detailed information for first 3 orders
-            max_show = min(count, 3)
-            for i, metadata in enumerate(results['metadatas'][:max_show]):
+            if count > max_show:
+                response += f"\n... and {count - max_show} more orders"
+            
+            response += f"\n\n💡 Tip: Add 'details' to see more, or ask specific questions like 'payment status'"
+            return RenderedAnswer(response + note, max_show)
+        
+        if view in ('details', 'orders'):
+            # Key details of the first orders: 5 for "details", 3 when no view was asked for
+            if view == 'details':
+                response = f"📋 Detailed Orders for {vendor_name} ({count} total):\n\n"
+                max_show = min(count, 5)
+            else:
+                response = f"📋 Orders for {vendor_name} ({count} total):\n\n"
+                max_show = min(count, 3)
+            for i, metadata in enumerate(metadatas[:max_show]):
                 response += f"{'='*60}\n"
                 response += f"Order #{i+1} - ID: {metadata['order_id']}\n"
                 response += f"{'='*60}\n"
@@ -490,32 +1665,49 @@ Quality Check: {order['quality_check_status']}"""
             
             if count > max_show:
                 response += f"... and {count - max_show} more orders\n"
-            
-            return response
+            if view == 'details':
+                response += f"\n💡 Tip: Use 'full details' or 'all details' to see every field"
+            return RenderedAnswer(response + note, max_show)
         
-        # Default: semantic search (only if no vendor found)
-        results = self.query(user_query, n_results=5)
+        raise ValueError(f"Unknown vendor view: {view}")
+    
+    def _answer_semantic_query(self, user_query: str) -> str:
+        """Default: semantic search (only if no vendor found)"""
+        date_from, date_to = parse_date_scope(user_query) if self.partitions is not None else (None, None)
+        results = self.query(user_query, n_results=5, date_from=date_from, date_to=date_to)
+        archived = self._archived_matches(user_query)
         
         if not results['metadatas'] or len(results['metadatas'][0]) == 0:
-            return "No records found for the requested information."
+            return archived.lstrip() if archived else "No records found for the requested information."
         
         # Format response
         response = "Here are the relevant orders:\n\n"
         for i, metadata in enumerate(results['metadatas'][0]):
             response += f"{i+1}. {metadata['vendor_name']} - {metadata['item_name']} - ₹{metadata['total_invoice_amount']:,.2f}\n"
         
-        return response
+        return response + archived
 
 
-def initialize_database(csv_path: str = "textile_orders_5000.csv", interactive: bool = True):
+def initialize_database(csv_path: str = "textile_orders_5000.csv", interactive: bool = True,
+                        embedding_template: str = "full", partition_by: Optional[str] = None,
+                        db_path: str = "./chroma_db", embedder=None, memory_budget_mb: float = 512):
     """Initialize the database with CSV data"""
-    rag = SakthiTextilesRAG(csv_path=csv_path)
+    # Open with the template the stored vectors were built with; a different one forces a reload
+    store = OrderStore(os.path.join(db_path, "order_store.sqlite3"))
+    stored_template = stored_embedding_template(store)
+    store.close()
+    rag = SakthiTextilesRAG(csv_path=csv_path, db_path=db_path, embedding_template=stored_template or embedding_template,
+                            partition_by=partition_by, embedder=embedder, memory_budget_mb=memory_budget_mb)
+    template_changed = rag.embedding_template != embedding_template
     
     # Check if database is already populated
     if rag.collection.count() > 0:
         print(f"Database already contains {rag.collection.count()} records.")
         
-        if interactive:
+        if template_changed:
+            print(f"⚠️ Records were embedded with the '{rag.embedding_template}' template; "
+                  f"reloading with '{embedding_template}'.")
+        elif interactive:
             response = input("Do you want to reload all data? (yes/no): ")
             if response.lower() != 'yes':
                 return rag
@@ -528,8 +1720,18 @@ def initialize_database(csv_path: str = "textile_orders_5000.csv", interactive:
         rag.client.delete_collection("textile_orders")
         rag.collection = rag.client.create_collection(
             name="textile_orders",
-            metadata={"description": "Sakthi Textiles order records"}
+            metadata={"description": "Sakthi Textiles order records"},
+            **rag._collection_options
         )
+        rag.order_store.clear()
+        rag.archive.clear()
+        rag._duplicate_index = None
+        if os.path.exists(rag.quantized_path):
+            shutil.rmtree(rag.quantized_path)
+    
+    if template_changed:
+        rag.embedding_template = embedding_template
+        rag.order_store.set_setting("embedding_template", embedding_template)
     
     # Load and add data
     df = rag.load_csv_data()
@@ -0,0 +1,410 @@
+"""
+Production serving mode for the web assistant
+
+Starts one writer process and N pre-forked worker processes:
+
+- The writer owns the Chroma database. It handles every order insert and
+  publishes read-only index generations (see snapshot.py).
+- Workers answer /api/query from the current generation through memory
+  maps, so the embedding matrix, order columns and vendor index exist once
+  in the page cache no matter how many workers run. The embedding model is
+  loaded before forking and shared copy-on-write. Workers pick up a newly
+  published generation on their next request.
+- Conversation sessions stay in the worker that created them, so a
+  follow-up question that another worker receives is answered as a new
+  question.
+
+Usage:
+    python serve.py --workers 4 --port 5000
+"""
+
+import argparse
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from rag_system import SakthiTextilesRAG, initialize_database, stored_embedding_template
+from snapshot import IndexGeneration, ReadOnlyCollection, current_generation, publish_generation
+from maintenance import DEFAULT_SCHEDULES, parse_schedules, schedule_maintenance
+
+
+# The writer also republishes a generation every 30 minutes if orders changed
+# without one being published (the snapshot job is off in app.py)
+WRITER_SCHEDULES = {**DEFAULT_SCHEDULES, 'snapshot': 1800}
+
+# Tries at opening the current generation before a worker keeps the one it has
+OPEN_ATTEMPTS = 5
+
+
+class OrderWriter:
+    """Single owner of the database: adds orders and publishes generations"""
+
+    def __init__(self, rag: SakthiTextilesRAG, root: str, publish_interval: float = 5.0):
+        """
+        Args:
+            rag: RAG system backed by the Chroma database
+            root: Directory to publish generations into
+            publish_interval: Minimum seconds between two generations
+        """
+        self.rag = rag
+        self.root = root
+        self.publish_interval = publish_interval
+        self._lock = threading.Lock()
+        # Orders publishes without holding up inserts, which only take _lock
+        self._publish_lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._reserved_id = rag.next_order_id() - 1
+        self._published_version = None
+        self.maintenance = None
+
+    def publish(self) -> str:
+        """
+        Publish a generation of the current database
+
+        The export runs without the writer lock, so inserts carry on meanwhile.
+        The version is read first: an insert that lands during the export may
+        or may not be in the generation, and either way snapshot() and the
+        publisher see it as unpublished.
+        """
+        with self._publish_lock:
+            with self._lock:
+                version = self.rag.data_version
+            name = publish_generation(self.rag.collection, self.root)
+            self._published_version = version
+        print(f"📦 Published index generation {name}")
+        return name
+
+    def snapshot(self) -> Optional[str]:
+        """Publish a generation if orders changed since the last one (maintenance job)"""
+        if self._published_version == self.rag.data_version:
+            return None
+        return self.publish()
+
+    def _publisher(self):
+        """Publish at most once per interval while there are unpublished inserts"""
+        while True:
+            self._dirty.wait()
+            time.sleep(self.publish_interval)
+            self._dirty.clear()
+            self.publish()
+
+    def archive(self) -> Dict[str, Any]:
+        """Archive old orders (maintenance job) and publish a generation without them"""
+        with self._lock:
+            result = self.rag.archive_orders()
+        if result['archived']:
+            self._dirty.set()
+        return result
+
+    def handle(self, command: str, payload: Any) -> Any:
+        """Run one request from a worker"""
+        if command == "next_order_id":
+            with self._lock:
+                self._reserved_id = max(self._reserved_id + 1, self.rag.next_order_id())
+                return self._reserved_id
+        if command == "add_order":
+            order_data, on_duplicate = payload
+            with self._lock:
+                success, duplicate = self.rag.try_add_order(order_data, on_duplicate=on_duplicate)
+            if success:
+                self._dirty.set()
+            return success, duplicate
+        if command == "find_duplicate":
+            with self._lock:
+                return self.rag.find_duplicate(payload)
+        if command == "duplicate_report":
+            with self._lock:
+                return self.rag.duplicate_report()
+        if command == "maintenance_status":
+            return self.maintenance.status() if self.maintenance else None
+        if command == "memory_report":
+            return self.rag.memory.report()
+        raise ValueError(f"Unknown writer command: {command}")
+
+    def _serve_connection(self, conn):
+        with conn:
+            while True:
+                try:
+                    command, payload = conn.recv()
+                except EOFError:
+                    return
+                try:
+                    conn.send((True, self.handle(command, payload)))
+                except Exception as e:
+                    conn.send((False, str(e)))
+
+    def serve(self, address: Tuple[str, int], authkey: bytes):
+        """
+        Accept worker connections forever
+
+        Args:
+            address: Local address to listen on
+            authkey: Secret workers must present. Connections carry pickles,
+                so it is generated per run and never leaves the process tree.
+        """
+        threading.Thread(target=self._publisher, daemon=True).start()
+        with Listener(address, authkey=authkey) as listener:
+            while True:
+                try:
+                    conn = listener.accept()
+                except (AuthenticationError, EOFError, ConnectionError) as e:
+                    # A client without the key (or one that hung up) must not stop the writer
+                    print(f"⚠️  Refused writer connection: {type(e).__name__}")
+                    continue
+                threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+
+
+class SnapshotRAG(SakthiTextilesRAG):
+    """Read-only RAG system answering from memory-mapped generations"""
+
+    def __init__(self, root: str, embedding_model, writer_address: Tuple[str, int], writer_authkey: bytes,
+                 db_path: str = "./chroma_db", refresh_interval: float = 1.0, memory_budget_mb: float = 512):
+        """
+        Args:
+            root: Directory holding the published generations
+            embedding_model: Already loaded SentenceTransformer
+            writer_address: Address of the OrderWriter
+            writer_authkey: Key the writer's listener was started with
+            db_path: Database directory (for the order store)
+            refresh_interval: Seconds between checks for a new generation
+            memory_budget_mb: Total memory allowed for this worker's caches and indexes
+        """
+        # Deliberately no super().__init__(): workers never open Chroma.
+        # The archive is shared with the writer, the only process moving orders into it.
+        self.csv_path = None
+        self.db_path = db_path
+        self.embedding_model = embedding_model
+        self.partitions = None
+        self._init_state(db_path, memory_budget_mb)
+        self.embedding_template = stored_embedding_template(self.order_store) or "full"
+        self.quantized_path = None
+
+        self.root = root
+        self.writer_address = writer_address
+        self.writer_authkey = writer_authkey
+        self.refresh_interval = refresh_interval
+        self._checked_at = 0.0
+        self.generation = None
+        if not self._swap_to_current():
+            raise RuntimeError(f"No index generation could be opened in {root}")
+
+        self._register_memory()
+        # Generation vectors are memory maps shared by all workers, never dropped
+        self.memory.register('quantized_index', lambda: self.quantized_index.approx_bytes())
+
+    def _swap(self, name: str):
+        """Point every reader at a generation"""
+        previous, self.generation = self.generation, IndexGeneration(self.root, name)
+        if previous is not None:
+            previous.close()
+        self.collection = ReadOnlyCollection(self.generation, self.embedding_model)
+        self.quantized_index = self.generation.vectors
+        self._term_index = None
+        self._suggestion_index = None
+        self.data_version = name
+
+    def refresh(self):
+        """Swap in a newer generation if the writer published one"""
+        now = time.monotonic()
+        if now - self._checked_at < self.refresh_interval:
+            return
+        self._checked_at = now
+        if not self._swap_to_current():
+            print(f"⚠️  Could not open the current index generation, still serving {self.generation.name}")
+
+    def _swap_to_current(self) -> bool:
+        """
+        Swap in the generation CURRENT points at, unless it is already open
+
+        A generation can be removed between reading CURRENT and opening it
+        when the writer publishes twice in between; CURRENT has then moved
+        on, so it is read again.
+
+        Returns:
+            False if no generation could be opened
+        """
+        for _ in range(OPEN_ATTEMPTS):
+            name = current_generation(self.root)
+            if name is None:
+                return self.generation is not None
+            if self.generation is not None and name == self.generation.name:
+                return True
+            try:
+                self._swap(name)
+                return True
+            except FileNotFoundError:
+                continue
+        return False
+
+    def _term_sources(self) -> Tuple[List[str], List[str]]:
+        generation = self.generation
+        return generation.vendor_names, np.unique(generation.columns['item_name']).tolist()
+
+    def _call_writer(self, command: str, payload: Any = None) -> Any:
+        with Client(self.writer_address, authkey=self.writer_authkey) as conn:
+            conn.send((command, payload))
+            ok, result = conn.recv()
+        if not ok:
+            raise RuntimeError(result)
+        return result
+
+    def next_order_id(self) -> int:
+        return self._call_writer("next_order_id")
+
+    def try_add_order(self, order_data: Dict[str, Any],
+                      on_duplicate: str = "reject") -> Tuple[bool, Optional[Dict[str, str]]]:
+        try:
+            return self._call_writer("add_order", (order_data, on_duplicate))
+        except Exception as e:
+            print(f"Error adding order: {e}")
+            return False, None
+
+    # Duplicate checks run in the writer, the only process that sees every insert
+    def find_duplicate(self, order_data: Dict[str, Any]) -> Optional[Dict[str, str]]:
+        return self._call_writer("find_duplicate", order_data)
+
+    def duplicate_report(self) -> Dict[str, Any]:
+        return self._call_writer("duplicate_report")
+
+    def writer_maintenance_status(self) -> Optional[Dict[str, Any]]:
+        return self._call_writer("maintenance_status")
+
+    def writer_memory_report(self) -> Dict[str, Any]:
+        return self._call_writer("memory_report")
+
+
+def make_embedder(args):
+    """Offline embedder when requested, else None for the MiniLM model"""
+    if args.offline_embedder:
+        from offline_embedder import HashingEmbedder
+        return HashingEmbedder()
+    return None
+
+
+def run_writer(args, root: str, authkey: bytes):
+    """Writer process: open the database, publish the first generation, then serve inserts"""
+    rag = initialize_database(interactive=False, db_path=args.db_path, embedder=make_embedder(args),
+                              memory_budget_mb=args.memory_budget_mb)
+    rag.archive_after_days = args.archive_after_days
+    writer = OrderWriter(rag, root, publish_interval=args.publish_interval)
+    writer.publish()
+    # Storage compaction, archiving and snapshots (the writer's own generations) happen here
+    writer.maintenance = schedule_maintenance(rag, None, parse_schedules(args.maintenance, WRITER_SCHEDULES),
+                                              cpu_budget=args.maintenance_cpu,
+                                              jobs=['compact', 'rebuild_indexes', 'snapshot', 'archive'],
+                                              overrides={'archive': writer.archive, 'snapshot': writer.snapshot})
+    writer.serve(("127.0.0.1", args.writer_port), authkey)
+
+
+def run_worker(args, root: str, sock: socket.socket, embedding_model, authkey: bytes):
+    """Worker process: serve the Flask app from the shared generation"""
+    from werkzeug.serving import make_server
+    import app as web
+
+    rag = SnapshotRAG(root, embedding_model, ("127.0.0.1", args.writer_port), authkey, db_path=args.db_path,
+                      memory_budget_mb=args.memory_budget_mb)
+    web.app.before_request(rag.refresh)
+    web.setup_rag(rag, parse_schedules(args.maintenance), args.maintenance_cpu,
+                  jobs=['rebuild_indexes', 'warm_cache'])
+    server = make_server(args.host, args.port, web.app, threaded=True, fd=sock.fileno())
+    server.serve_forever()
+
+
+def fork(target, *target_args) -> int:
+    """Run target in a child process, returning the child's pid"""
+    pid = os.fork()
+    if pid == 0:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        try:
+            target(*target_args)
+        finally:
+            os._exit(0)
+    return pid
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-fork server for the Sakthi Textiles assistant")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--writer-port", type=int, default=5099)
+    parser.add_argument("--db-path", default="./chroma_db")
+    parser.add_argument("--publish-interval", type=float, default=5.0,
+                        help="Minimum seconds between index generations after inserts")
+    parser.add_argument("--maintenance", default="",
+                        help='Maintenance schedules, e.g. "compact=6h,warm_cache=15m" (0 disables a job)')
+    parser.add_argument("--maintenance-cpu", type=float, default=0.25,
+                        help="Fraction of one core each process's maintenance thread may use")
+    parser.add_argument("--archive-after-days", type=float, default=365,
+                        help='Age at which fully paid orders are archived (when the "archive" job is scheduled)')
+    parser.add_argument("--memory-budget-mb", type=float, default=512,
+                        help="Memory allowed for caches and in-memory indexes, per process")
+    parser.add_argument("--offline-embedder", action="store_true",
+                        help="Use the deterministic hashing embedder (load tests only, separate --db-path)")
+    args = parser.parse_args()
+
+    root = os.path.join(args.db_path, "generations")
+    published_before = current_generation(root)
+
+    # Fresh secret for writer connections, inherited by every forked child
+    authkey = os.urandom(32)
+
+    # The writer is forked before anything heavy is loaded in this process
+    writer_pid = fork(run_writer, args, root, authkey)
+    print("⏳ Waiting for the writer to publish an index generation...")
+    while current_generation(root) in (None, published_before):
+        if os.waitpid(writer_pid, os.WNOHANG)[0]:
+            print("❌ Writer process exited during startup")
+            sys.exit(1)
+        time.sleep(0.5)
+
+    # Loaded once here and shared copy-on-write with every worker
+    embedding_model = make_embedder(args)
+    if embedding_model is None:
+        from sentence_transformers import SentenceTransformer
+        embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(128)
+    sock.set_inheritable(True)
+
+    workers = {fork(run_worker, args, root, sock, embedding_model, authkey) for _ in range(args.workers)}
+    print(f"✅ Serving on http://{args.host}:{args.port} with {args.workers} workers")
+
+    def shutdown(signum=None, frame=None):
+        for pid in workers | {writer_pid}:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    # Restart workers that die; stop everything if the writer dies
+    while True:
+        pid, _ = os.wait()
+        if pid == writer_pid:
+            print("❌ Writer process exited, shutting down")
+            workers.discard(pid)
+            shutdown()
+        if pid in workers:
+            workers.discard(pid)
+            workers.add(fork(run_worker, args, root, sock, embedding_model, authkey))
+            print(f"♻️  Restarted worker {pid}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Per-conversation context so follow-up questions reuse what was resolved
+
+A session remembers the last vendor, the last answer's intent and that
+vendor's result set (ids plus metadata), so "and their payment status?"
+or "show more" are answered from memory instead of another database call.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+
+class SessionContext:
+    """What a conversation has resolved so far"""
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.vendor: Optional[str] = None
+        self.intent: Optional[str] = None
+        self.result_ids: List[str] = []
+        self.result_metadatas: List[Dict[str, Any]] = []
+        self.data_version: Any = None
+        # Rows the last answer listed (all or a filtered subset) and how many were shown
+        self.listing: List[Dict[str, Any]] = []
+        self.offset = 0
+
+    def remember(self, vendor: str, results: Dict[str, Any], data_version: Any = None):
+        """Keep a vendor's full result set, tagged with the data version it was read at"""
+        if vendor != self.vendor:
+            self.listing = []
+            self.offset = 0
+        self.vendor = vendor
+        self.result_ids = list(results.get('ids') or [])
+        self.result_metadatas = list(results.get('metadatas') or [])
+        self.data_version = data_version
+
+    def cached_results(self, vendor: str, data_version: Any = None) -> Optional[Dict[str, Any]]:
+        """The remembered result set if it belongs to vendor and is still current"""
+        if vendor != self.vendor or not self.result_ids or data_version != self.data_version:
+            return None
+        return {'ids': self.result_ids, 'metadatas': self.result_metadatas}
+
+    def approx_bytes(self) -> int:
+        """Rough memory held by the cached result set"""
+        return 200 + sum(64 + len(order_id) for order_id in self.result_ids) + 600 * len(self.result_metadatas)
+
+
+class SessionStore:
+    """Bounded TTL store of SessionContext objects keyed by session id"""
+
+    def __init__(self, ttl_seconds: float = 1800, max_sessions: int = 1000):
+        """
+        Args:
+            ttl_seconds: Idle time after which a session is forgotten
+            max_sessions: Sessions kept at most; the least recently used go first
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()  # id -> (last used, context)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, session_id: Optional[str] = None) -> SessionContext:
+        """Get a live session, or start a new one (with a fresh id if none was given)"""
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            if session_id and session_id in self._sessions:
+                _, context = self._sessions.pop(session_id)
+            else:
+                context = SessionContext(session_id or uuid.uuid4().hex)
+            self._sessions[context.session_id] = (now, context)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            return context
+
+    def _expire(self, now: float):
+        """Drop sessions idle for longer than the TTL (oldest are at the front)"""
+        while self._sessions:
+            session_id, (last_used, _) = next(iter(self._sessions.items()))
+            if now - last_used <= self.ttl_seconds:
+                break
+            del self._sessions[session_id]
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+
+    def approx_bytes(self) -> int:
+        """Rough memory held by all live sessions"""
+        with self._lock:
+            return sum(context.approx_bytes() for _, context in self._sessions.values())
+
+    def shrink(self, bytes_to_free: int):
+        """Forget least recently used sessions until about bytes_to_free were released"""
+        with self._lock:
+            freed = 0
+            while self._sessions and freed < bytes_to_free:
+                _, (_, context) = self._sessions.popitem(last=False)
+                freed += context.approx_bytes()
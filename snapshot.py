@@ -0,0 +1,309 @@
+"""
+Read-only, memory-mapped index generations for multi-process serving
+
+A generation is a directory holding everything the query path reads:
+the quantized/float32 embedding matrices, one column array per metadata
+field, the documents as one UTF-8 blob with offsets, and a vendor index
+(row positions grouped by vendor). Worker processes memory-map the same
+files, so the data lives once in the OS page cache however many workers
+there are.
+
+The writer publishes a new generation into a fresh directory and then
+atomically replaces the CURRENT pointer file; workers notice the new
+pointer and swap their reference. Each open generation holds a lease file
+in its readers/ directory, and old generations are only removed once no
+live process holds a lease on them.
+"""
+
+import json
+import os
+import shutil
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from quantized_index import QuantizedVectorIndex
+
+
+STRING_FIELDS = [
+    "order_id", "invoice_no", "vendor_id", "vendor_name", "gst_number",
+    "item_id", "item_name", "item_category", "order_date", "payment_status",
+]
+FLOAT_FIELDS = ["total_invoice_amount"]
+
+CURRENT_FILE = "CURRENT"
+READERS_DIR = "readers"
+
+
+def _save(path: str, array: np.ndarray):
+    """Save an array without the pickle fallback so it can be memory-mapped"""
+    np.save(path, array, allow_pickle=False)
+
+
+def publish_generation(collection, root: str, keep: int = 2) -> str:
+    """
+    Write a new generation from a Chroma collection and make it current
+
+    Args:
+        collection: Source collection (owned by the writer process)
+        root: Directory holding all generations
+        keep: Number of most recent generations to keep on disk
+
+    Returns:
+        Name of the published generation
+    """
+    os.makedirs(root, exist_ok=True)
+    name = f"gen-{time.time_ns()}"
+    path = os.path.join(root, name)
+    os.makedirs(os.path.join(path, READERS_DIR))
+
+    records = collection.get(include=["embeddings", "metadatas", "documents"])
+    metadatas = records['metadatas'] or []
+    ids = records['ids']
+
+    QuantizedVectorIndex.build(
+        os.path.join(path, "vectors"),
+        ids,
+        records['embeddings'] if ids else np.zeros((0, 384), dtype=np.float32),
+        [metadata['vendor_name'] for metadata in metadatas],
+        dates=[metadata['order_date'] for metadata in metadatas],
+    )
+
+    # Column arrays of metadata
+    _save(os.path.join(path, "ids.npy"), np.array(ids, dtype=str))
+    for field in STRING_FIELDS:
+        _save(os.path.join(path, f"col_{field}.npy"),
+              np.array([str(metadata.get(field, "")) for metadata in metadatas], dtype=str))
+    for field in FLOAT_FIELDS:
+        _save(os.path.join(path, f"col_{field}.npy"),
+              np.array([float(metadata.get(field, 0.0)) for metadata in metadatas], dtype=np.float64))
+
+    # Documents as one UTF-8 blob plus offsets
+    encoded = [(document or "").encode("utf-8") for document in (records['documents'] or [])]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(blob) for blob in encoded])
+    _save(os.path.join(path, "doc_offsets.npy"), offsets)
+    with open(os.path.join(path, "documents.bin"), "wb") as f:
+        f.write(b"".join(encoded))
+
+    # Vendor index: row positions grouped by vendor
+    vendors = np.array([metadata['vendor_name'] for metadata in metadatas], dtype=str)
+    vendor_names, vendor_codes = np.unique(vendors, return_inverse=True)
+    order = np.argsort(vendor_codes, kind="stable").astype(np.int64)
+    vendor_offsets = np.searchsorted(vendor_codes[order], np.arange(len(vendor_names) + 1)).astype(np.int64)
+    _save(os.path.join(path, "vendor_rows.npy"), order)
+    _save(os.path.join(path, "vendor_offsets.npy"), vendor_offsets)
+    with open(os.path.join(path, "vendors.json"), "w", encoding="utf-8") as f:
+        json.dump(vendor_names.tolist(), f)
+
+    # Atomically point readers at the new generation
+    tmp_pointer = os.path.join(root, CURRENT_FILE + ".tmp")
+    with open(tmp_pointer, "w", encoding="utf-8") as f:
+        f.write(name)
+    os.replace(tmp_pointer, os.path.join(root, CURRENT_FILE))
+
+    # Older generations go once no worker has them open; a worker that loses the race
+    # to open one gets FileNotFoundError and reads CURRENT again
+    generations = sorted(d for d in os.listdir(root) if d.startswith("gen-"))
+    for old in generations[:-keep]:
+        if not _has_readers(os.path.join(root, old)):
+            shutil.rmtree(os.path.join(root, old), ignore_errors=True)
+
+    return name
+
+
+def _has_readers(path: str) -> bool:
+    """Whether a live process holds a lease on a generation (stale leases are removed)"""
+    try:
+        leases = os.listdir(os.path.join(path, READERS_DIR))
+    except FileNotFoundError:
+        return False
+    in_use = False
+    for lease in leases:
+        try:
+            os.kill(int(lease.split("-")[0]), 0)
+        except ProcessLookupError:
+            # The worker died without closing the generation
+            try:
+                os.remove(os.path.join(path, READERS_DIR, lease))
+            except FileNotFoundError:
+                pass
+            continue
+        except (PermissionError, ValueError):
+            pass
+        in_use = True
+    return in_use
+
+
+def current_generation(root: str) -> Optional[str]:
+    """Name of the current generation, or None if nothing was published yet"""
+    try:
+        with open(os.path.join(root, CURRENT_FILE), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+class IndexGeneration:
+    """One published generation, memory-mapped read-only"""
+
+    def __init__(self, root: str, name: str):
+        """
+        Open a generation, taking a lease that keeps the writer from removing it until close()
+
+        Args:
+            root: Directory holding all generations
+            name: Generation directory name
+
+        Raises:
+            FileNotFoundError: If the generation was removed (it is no longer current)
+        """
+        self.name = name
+        path = os.path.join(root, name)
+
+        readers = os.path.join(path, READERS_DIR)
+        try:
+            # Not makedirs: a removed generation must not be recreated
+            os.mkdir(readers)
+        except FileExistsError:
+            pass
+        self._lease: Optional[str] = os.path.join(readers, f"{os.getpid()}-{id(self)}")
+        open(self._lease, "x").close()
+        try:
+            self._load(path)
+        except BaseException:
+            self.close()
+            raise
+
+    def _load(self, path: str):
+        """Memory-map the generation's files"""
+        def load(file_name: str) -> np.ndarray:
+            return np.load(os.path.join(path, file_name), mmap_mode='r')
+
+        self.vectors = QuantizedVectorIndex(os.path.join(path, "vectors"))
+        self.ids = load("ids.npy")
+        self.columns = {field: load(f"col_{field}.npy") for field in STRING_FIELDS + FLOAT_FIELDS}
+        self.doc_offsets = load("doc_offsets.npy")
+        self.documents = np.memmap(os.path.join(path, "documents.bin"), dtype=np.uint8, mode='r') \
+            if self.doc_offsets[-1] > 0 else np.zeros(0, dtype=np.uint8)
+        self.vendor_rows = load("vendor_rows.npy")
+        self.vendor_offsets = load("vendor_offsets.npy")
+        with open(os.path.join(path, "vendors.json"), encoding="utf-8") as f:
+            self.vendor_names: List[str] = json.load(f)
+        self._vendor_positions = {vendor: i for i, vendor in enumerate(self.vendor_names)}
+        self._id_positions: Optional[Dict[str, int]] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def close(self):
+        """
+        Release the lease so the writer may remove the generation
+
+        Arrays already mapped stay readable: unlinked files remain valid while mapped.
+        """
+        lease, self._lease = self._lease, None
+        if lease is not None:
+            try:
+                os.remove(lease)
+            except FileNotFoundError:
+                pass
+
+    def rows_for_vendor(self, vendor_name: str) -> np.ndarray:
+        """Row positions of a vendor's orders, in insertion order"""
+        position = self._vendor_positions.get(vendor_name)
+        if position is None:
+            return np.zeros(0, dtype=np.int64)
+        return self.vendor_rows[self.vendor_offsets[position]:self.vendor_offsets[position + 1]]
+
+    def rows_for_ids(self, ids: List[str]) -> np.ndarray:
+        """Row positions of collection ids (unknown ids are skipped)"""
+        if self._id_positions is None:
+            self._id_positions = {str(order_id): i for i, order_id in enumerate(self.ids)}
+        return np.array([self._id_positions[i] for i in ids if i in self._id_positions], dtype=np.int64)
+
+    def metadata(self, row: int) -> Dict[str, Any]:
+        """Metadata dict of one row, shaped like Chroma's"""
+        record: Dict[str, Any] = {field: str(self.columns[field][row]) for field in STRING_FIELDS}
+        for field in FLOAT_FIELDS:
+            record[field] = float(self.columns[field][row])
+        return record
+
+    def document(self, row: int) -> str:
+        """Stored document of one row"""
+        start, end = self.doc_offsets[row], self.doc_offsets[row + 1]
+        return bytes(self.documents[start:end]).decode("utf-8")
+
+
+class ReadOnlyCollection:
+    """Subset of the Chroma collection API served from an IndexGeneration"""
+
+    def __init__(self, generation: IndexGeneration, embedding_model):
+        """
+        Args:
+            generation: Open generation to read from
+            embedding_model: Model used to embed query texts
+        """
+        self.generation = generation
+        self.embedding_model = embedding_model
+
+    def count(self) -> int:
+        return len(self.generation)
+
+    def _rows_for_where(self, where: Optional[Dict[str, Any]]) -> np.ndarray:
+        """Rows matching a where clause of {field: {"$eq": value}} conditions"""
+        generation = self.generation
+        if not where:
+            return np.arange(len(generation), dtype=np.int64)
+
+        conditions = where.get("$and", [where])
+        rows = None
+        for condition in conditions:
+            (field, test), = condition.items()
+            value = test["$eq"] if isinstance(test, dict) else test
+            if field == "vendor_name":
+                matched = generation.rows_for_vendor(value)
+            else:
+                matched = np.flatnonzero(np.asarray(generation.columns[field]) == value)
+            rows = matched if rows is None else np.intersect1d(rows, matched)
+        return rows
+
+    def _records(self, rows, include: List[str]) -> Dict[str, Any]:
+        generation = self.generation
+        return {
+            'ids': [str(generation.ids[row]) for row in rows],
+            'metadatas': [generation.metadata(row) for row in rows] if "metadatas" in include else None,
+            'documents': [generation.document(row) for row in rows] if "documents" in include else None,
+            'embeddings': [np.asarray(generation.vectors.full[row]) for row in rows] if "embeddings" in include else None,
+        }
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None,
+            include: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Same call shape as Collection.get()"""
+        include = include or ["metadatas", "documents"]
+        rows = self._rows_for_where(where)
+        if ids is not None:
+            wanted = self.generation.rows_for_ids(ids)
+            rows = wanted[np.isin(wanted, rows)] if where else wanted
+        return self._records(rows, include)
+
+    def query(self, query_texts: List[str], n_results: int = 10,
+              where: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Same call shape as Collection.query(), searched on the quantized vectors"""
+        vendor_filter = None
+        if where:
+            vendor_filter = where["vendor_name"]["$eq"]
+
+        results = {'ids': [], 'distances': [], 'metadatas': [], 'documents': []}
+        for text in query_texts:
+            query_embedding = self.embedding_model.encode(text, normalize_embeddings=True)
+            ids, distances = self.generation.vectors.search(
+                query_embedding, k=n_results, vendor_filter=vendor_filter
+            )
+            records = self._records(self.generation.rows_for_ids(ids), ["metadatas", "documents"])
+            results['ids'].append(records['ids'])
+            results['distances'].append(distances)
+            results['metadatas'].append(records['metadatas'])
+            results['documents'].append(records['documents'])
+        return results
@@ -4,9 +4,108 @@ document.getElementById('userInput').addEventListener('keypress', function (e) {
     }
 });
 
+// Typeahead suggestions (debounced, stale requests cancelled)
+let suggestTimer = null;
+let suggestController = null;
+let suggestPrefix = '';
+let activeSuggestion = -1;
+
+document.getElementById('userInput').addEventListener('input', function () {
+    clearTimeout(suggestTimer);
+    const text = this.value;
+    suggestTimer = setTimeout(() => fetchSuggestions(text), 150);
+});
+
+document.getElementById('userInput').addEventListener('keydown', function (e) {
+    const items = document.querySelectorAll('#suggestions .suggestion');
+    if (!items.length) return;
+
+    if (e.key === 'ArrowDown' || e.key === 'ArrowUp') {
+        e.preventDefault();
+        const step = e.key === 'ArrowDown' ? 1 : -1;
+        activeSuggestion = (activeSuggestion + step + items.length) % items.length;
+        items.forEach((item, i) => item.classList.toggle('active', i === activeSuggestion));
+    } else if (e.key === 'Enter' && activeSuggestion >= 0) {
+        // Prevents the keypress handler from sending the message
+        e.preventDefault();
+        applySuggestion(items[activeSuggestion].dataset.value);
+    } else if (e.key === 'Escape') {
+        hideSuggestions();
+    }
+});
+
+function fetchSuggestions(text) {
+    if (suggestController) suggestController.abort();
+    if (!text.trim()) {
+        hideSuggestions();
+        return;
+    }
+
+    suggestController = new AbortController();
+    fetch(`/api/suggest?q=${encodeURIComponent(text)}`, { signal: suggestController.signal })
+        .then(response => response.json())
+        .then(data => showSuggestions(data))
+        .catch(error => {
+            if (error.name !== 'AbortError') console.error('Error:', error);
+        });
+}
+
+function showSuggestions(data) {
+    const box = document.getElementById('suggestions');
+    box.innerHTML = '';
+    suggestPrefix = data.prefix;
+    activeSuggestion = -1;
+
+    if (!data.suggestions.length) {
+        box.style.display = 'none';
+        return;
+    }
+
+    data.suggestions.forEach(suggestion => {
+        const item = document.createElement('div');
+        item.className = 'suggestion';
+        item.dataset.value = suggestion.value;
+
+        const value = document.createElement('span');
+        value.textContent = suggestion.value;
+        const type = document.createElement('span');
+        type.className = 'suggestion-type';
+        type.textContent = suggestion.type;
+
+        item.append(value, type);
+        item.addEventListener('mousedown', e => {
+            e.preventDefault();
+            applySuggestion(suggestion.value);
+        });
+        box.appendChild(item);
+    });
+    box.style.display = 'block';
+}
+
+function applySuggestion(value) {
+    const input = document.getElementById('userInput');
+    if (input.value.endsWith(suggestPrefix)) {
+        input.value = input.value.slice(0, input.value.length - suggestPrefix.length) + value;
+    }
+    hideSuggestions();
+    input.focus();
+}
+
+function hideSuggestions() {
+    clearTimeout(suggestTimer);
+    if (suggestController) suggestController.abort();
+    const box = document.getElementById('suggestions');
+    box.innerHTML = '';
+    box.style.display = 'none';
+    activeSuggestion = -1;
+}
+
+document.getElementById('userInput').addEventListener('blur', hideSuggestions);
+
 function sendMessage() {
     const input = document.getElementById('userInput');
     const message = input.value.trim();
+    hideSuggestions();
     if (!message) return;
 
     // Add user message to UI
@@ -20,10 +119,12 @@ function sendMessage() {
     fetch('/api/query', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ query: message })
+        body: JSON.stringify({ query: message, session_id: sessionStorage.getItem('sessionId') })
     })
         .then(response => response.json())
         .then(data => {
+            // Keep the conversation's session so follow-up questions work
+            if (data.session_id) sessionStorage.setItem('sessionId', data.session_id);
             // Remove loading
             removeMessage(loadingId);
             // Show bot response
@@ -92,7 +193,7 @@ document.getElementById('orderForm').addEventListener('submit', function (e) {
                 this.reset();
                 appendMessage(`✅ I've added a new order for **${data.vendor_name}**.`, 'bot');
             } else {
-                alert('❌ Failed to add order.');
+                alert('❌ ' + (response.error || 'Failed to add order.'));
             }
         });
 });
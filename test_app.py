@@ -0,0 +1,73 @@
+"""
+Tests for the web API: serving setup and conditional responses
+"""
+
+import pytest
+
+import app as web
+
+
+VENDOR_ANSWER = "/api/vendors/Sakthi Traders/answers/total"
+
+
+@pytest.fixture
+def client(rag, monkeypatch):
+    monkeypatch.setattr(web, "rag", rag)
+    monkeypatch.setattr(web, "sessions", web.SessionStore())
+    return web.app.test_client()
+
+
+def test_setup_rag_prepares_a_built_system(rag, monkeypatch):
+    for name in ("rag", "query_log", "maintenance"):
+        monkeypatch.setattr(web, name, None)
+    schedules = {job: 0 for job in web.parse_schedules("")}
+
+    assert web.setup_rag(rag, schedules) is rag
+    web.maintenance.stop()
+
+    assert web.get_rag() is rag
+    assert rag._suggestion_index is not None
+    assert 'sessions' in [component['name'] for component in rag.memory.report()['components']]
+    assert web.query_log.path.startswith(rag.db_path)
+
+
+def test_vendor_answer_is_conditional(client, rag, orders):
+    first = client.get(VENDOR_ANSWER)
+    assert first.status_code == 200
+    assert first.get_json()['answer'].startswith("Total amount spent by Sakthi Traders")
+    etag = first.headers['ETag']
+
+    assert client.get(VENDOR_ANSWER, headers={'If-None-Match': etag}).status_code == 304
+
+    order = orders[orders['vendor_name'] == "Sakthi Traders"].iloc[0].to_dict()
+    order.update(order_id=rag.next_order_id(), invoice_no="INV-T1")
+    assert rag.add_new_order(order, on_duplicate="allow")
+    changed = client.get(VENDOR_ANSWER, headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+
+
+def test_query_is_never_not_modified(client):
+    first = client.post("/api/query", json={'query': "total spent by Sakthi Traders"})
+    session_id = first.get_json()['session_id']
+
+    repeated = client.post("/api/query", json={'query': "total spent by Sakthi Traders", 'session_id': session_id},
+                           headers={'If-None-Match': '*'})
+
+    assert repeated.status_code == 200
+    assert 'ETag' not in repeated.headers
+    assert repeated.get_json()['answer'] == first.get_json()['answer']
+
+
+def test_duplicate_add_reports_the_original(client, rag, monkeypatch):
+    # The 409 comes from the check made by the insert itself
+    monkeypatch.setattr(rag, "find_duplicate", None)
+    body = {'vendor_name': "Kaveri Weaves", 'item_name': "Silk Thread", 'quantity': 120, 'unit_price': 310,
+            'order_date': "2025-03-18"}
+
+    added = client.post("/api/add", json=body)
+    assert added.status_code == 200
+    repeated = client.post("/api/add", json=body)
+
+    assert repeated.status_code == 409
+    assert repeated.get_json()['duplicate_of'] == str(added.get_json()['order_id'])
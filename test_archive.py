@@ -0,0 +1,100 @@
+"""
+Tests for archiving old orders and order id allocation around it
+"""
+
+import os
+
+import pytest
+
+from conftest import new_order
+from order_store import OrderStore, order_number
+
+
+def test_archive_keeps_totals_and_items(rag):
+    vendor = "Sakthi Traders"
+    total = rag.answer_query(f"total spent by {vendor}")
+    items = rag.answer_query(f"items ordered by {vendor}")
+
+    result = rag.archive_orders(older_than_days=0)
+
+    assert result['archived'] > 0
+    assert len(rag.archive) == result['archived']
+    assert rag.answer_query(f"total spent by {vendor}") == total
+    assert rag.answer_query(f"items ordered by {vendor}") == items
+    assert rag.archive_orders(older_than_days=0)['archived'] == 0
+
+
+def test_next_order_id_after_archiving_never_reuses_an_id(rag, orders):
+    highest = int(orders.head(500)['order_id'].max())
+    rag.archive_orders(older_than_days=0)
+    ids_before, records_before = rag.order_store.all_records()
+    documents_before = rag.order_store.get_documents(ids_before)
+
+    order_id = rag.next_order_id()
+
+    assert order_id == highest + 1
+    assert rag.add_new_order(new_order(orders, order_id), on_duplicate="allow")
+    assert rag.order_store.get_records(ids_before) == records_before
+    assert rag.order_store.get_documents(ids_before) == documents_before
+    assert rag.collection.count() == len(ids_before) + 1
+    assert rag.next_order_id() == order_id + 1
+
+
+def test_next_order_id_counts_archived_ids(rag):
+    rag.archive_orders(older_than_days=0)
+    archived = rag.archive.scan(columns=['id'])['id']
+
+    assert rag.next_order_id() > max(order_number(order_id) for order_id in archived)
+
+
+def test_bulk_add_skips_stored_and_archived_ids(rag, orders):
+    rag.archive_orders(older_than_days=0)
+    count = rag.collection.count()
+    ids_before, records_before = rag.order_store.all_records()
+
+    rag.add_orders_to_db(orders.head(500), on_duplicate="allow")
+
+    assert rag.collection.count() == count
+    assert rag.order_store.get_records(ids_before) == records_before
+
+
+def test_put_many_refuses_to_overwrite():
+    store = OrderStore(":memory:")
+    store.put_many(["order_1"], ["first"], [{'order_id': 1}])
+
+    with pytest.raises(ValueError, match="order_1"):
+        store.put_many(["order_2", "order_1"], ["second", "replaced"], [{'order_id': 2}, {'order_id': 1}])
+
+    assert store.get_documents(["order_1", "order_2"]) == ["first", None]
+    assert store.max_order_number() == 1
+
+
+def test_add_new_order_refuses_a_taken_id(rag, orders):
+    record = rag.order_store.get_records(["order_1"])[0]
+
+    assert not rag.add_new_order(new_order(orders, 1, row=5), on_duplicate="allow")
+    assert rag.order_store.get_records(["order_1"])[0] == record
+
+
+def test_archived_ids_come_from_the_id_file(rag, monkeypatch):
+    rag.archive_orders(older_than_days=0)
+    archived = set(rag.archive.scan(columns=['id'])['id'])
+    reopened = type(rag.archive)(rag.archive.path)
+
+    def no_scan(*args, **kwargs):
+        raise AssertionError("the archive was scanned")
+
+    monkeypatch.setattr(reopened, "scan", no_scan)
+    assert reopened.archived_ids(sorted(archived) + ["order_999999"]) == archived
+    assert reopened.max_order_number() == max(order_number(order_id) for order_id in archived)
+
+
+def test_id_file_is_built_for_older_archives(rag):
+    rag.archive_orders(older_than_days=0)
+    archived = set(rag.archive.scan(columns=['id'])['id'])
+    os.remove(rag.archive.ids_path)
+
+    reopened = type(rag.archive)(rag.archive.path)
+
+    assert reopened.archived_ids(sorted(archived)) == archived
+    assert os.path.exists(rag.archive.ids_path)
@@ -0,0 +1,53 @@
+"""
+Tests for batch mode (main.py --batch)
+"""
+
+import io
+import json
+
+from main import read_queries, run_batch
+
+
+def test_read_queries_accepts_text_and_json_lines():
+    source = io.StringIO('# vendors\n\ntotal spent by ABC Textiles\n{"id": "q7", "query": "pending payments"}\n'
+                         '{"query": "gst number of Vijay Spinning"}\n')
+
+    assert read_queries(source) == [
+        {'id': 3, 'query': "total spent by ABC Textiles"},
+        {'id': "q7", 'query': "pending payments"},
+        {'id': 5, 'query': "gst number of Vijay Spinning"},
+    ]
+
+
+def test_run_batch_answers_in_input_order(rag):
+    questions = ["total spent by ABC Textiles", "items ordered by Sri Yarn Mills", "pending payments",
+                 "gst number of Vijay Spinning", "orders for Lakshmi Fabrics"] * 3
+    queries = [{'id': i, 'query': question} for i, question in enumerate(questions)]
+    expected = [rag.answer_query(question) for question in questions]
+    output = io.StringIO()
+
+    summary = run_batch(rag, queries, output, workers=4)
+
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [result['id'] for result in results] == list(range(len(questions)))
+    assert [result['answer'] for result in results] == expected
+    assert summary['queries'] == len(questions) and summary['failed'] == 0
+
+
+def test_run_batch_records_errors(rag, monkeypatch):
+    answer_query = rag.answer_query
+
+    def failing(query, **kwargs):
+        if query == "boom":
+            raise RuntimeError("broken")
+        return answer_query(query, **kwargs)
+
+    monkeypatch.setattr(rag, "answer_query", failing)
+    output = io.StringIO()
+
+    summary = run_batch(rag, [{'id': 1, 'query': "boom"}, {'id': 2, 'query': "pending payments"}], output)
+
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert results[0]['answer'] is None and results[0]['error'] == "broken"
+    assert results[1]['answer'] and 'error' not in results[1]
+    assert summary['failed'] == 1
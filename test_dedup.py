@@ -0,0 +1,97 @@
+"""
+Tests for MinHash duplicate detection at ingest
+"""
+
+import threading
+import time
+
+import numpy as np
+
+from conftest import new_order
+from dedup import DuplicateIndex, MinHasher
+
+
+def test_minhash_estimates_jaccard_similarity():
+    hasher = MinHasher(num_perm=256)
+    base = [f"t{i}" for i in range(20)]
+    half = base[:10] + [f"u{i}" for i in range(10)]
+
+    signatures = hasher.signatures([base, list(reversed(base)), half])
+
+    assert (signatures[0] == signatures[1]).all()
+    assert abs(np.mean(signatures[0] == signatures[2]) - 10 / 30) < 0.1
+
+
+def test_copies_are_found_and_classified(orders):
+    stored = orders.head(200).to_dict('records')
+    index = DuplicateIndex()
+    index.add([f"order_{order['order_id']}" for order in stored], stored)
+    original = stored[7]
+
+    reimport = dict(original, order_id=9001)
+    rekeyed = dict(original, order_id=9002, invoice_no="INV-T9002")
+    typo = dict(rekeyed, order_id=9003, vendor_name=original['vendor_name'].replace("i", "", 1))
+    changed = dict(rekeyed, order_id=9004, quantity=original['quantity'] + 5)
+    matches = index.check(["order_9001", "order_9002", "order_9003", "order_9004"],
+                          [reimport, rekeyed, typo, changed])
+
+    assert [(match.duplicate_of, match.kind) for match in matches[:3]] == [
+        (f"order_{original['order_id']}", "exact"),
+        (f"order_{original['order_id']}", "near"),
+        (f"order_{original['order_id']}", "near"),
+    ]
+    assert matches[3] is None
+
+
+def test_duplicates_within_one_batch(orders):
+    order = orders.iloc[0].to_dict()
+    copy = dict(order, order_id=9001, invoice_no="INV-T9001")
+
+    matches = DuplicateIndex().check([f"order_{order['order_id']}", "order_9001"], [order, copy])
+
+    assert matches[0] is None
+    assert (matches[1].duplicate_of, matches[1].kind) == (f"order_{order['order_id']}", "near")
+
+
+def test_reject_skips_and_flag_reports_duplicates(rag, orders):
+    count = rag.collection.count()
+    copies = orders.head(3).assign(order_id=[9001, 9002, 9003],
+                                   invoice_no=["INV-T9001", "INV-T9002", "INV-T9003"])
+
+    rejected = rag.add_orders_to_db(copies)
+    assert [match['kind'] for match in rejected] == ["near"] * 3
+    assert rag.collection.count() == count
+
+    rag.add_orders_to_db(copies, on_duplicate="flag")
+    assert rag.collection.count() == count + 3
+    clustered = {order_id for cluster in rag.duplicate_report()['clusters'] for order_id in cluster['order_ids']}
+    assert {"order_9001", "order_9002", "order_9003"} <= clustered
+
+
+def test_single_order_duplicate_is_refused(rag, orders):
+    added, duplicate = rag.try_add_order(new_order(orders, 9003))
+    assert not added and duplicate['duplicate_of'] == f"order_{orders.iloc[0]['order_id']}"
+    assert not rag.add_new_order(new_order(orders, 9001))
+    assert rag.rejected_duplicates[-1].duplicate_of == f"order_{orders.iloc[0]['order_id']}"
+    assert rag.add_new_order(new_order(orders, 9002), on_duplicate="allow")
+
+
+def test_insert_during_lazy_duplicate_build_is_kept(rag, orders, monkeypatch):
+    rag._duplicate_index = None
+    building = threading.Event()
+    all_records = rag.order_store.all_records
+
+    def slow_records():
+        records = all_records()
+        building.set()
+        time.sleep(0.3)
+        return records
+
+    monkeypatch.setattr(rag.order_store, "all_records", slow_records)
+    build = threading.Thread(target=rag.get_duplicate_index)
+    build.start()
+    assert building.wait(5)
+    assert rag.add_new_order(new_order(orders, 9001, vendor_name="Kaveri Weaves"), on_duplicate="allow")
+    build.join()
+
+    assert rag.find_duplicate(new_order(orders, 9002, vendor_name="Kaveri Weaves"))['duplicate_of'] == "order_9001"
@@ -0,0 +1,35 @@
+"""
+Tests for the embedding template recorded with a database
+"""
+
+import pytest
+
+from conftest import CSV_PATH
+from offline_embedder import HashingEmbedder
+from rag_system import SakthiTextilesRAG, initialize_database
+
+
+def test_template_is_recorded(make_rag):
+    rag = make_rag(rows=50, embedding_template="compact")
+
+    assert rag.order_store.get_setting("embedding_template") == "compact"
+
+
+def test_opening_with_another_template_is_refused(make_rag):
+    rag = make_rag(rows=50, embedding_template="compact")
+
+    with pytest.raises(ValueError, match="'compact' template"):
+        SakthiTextilesRAG(csv_path=CSV_PATH, db_path=rag.db_path, embedder=HashingEmbedder(),
+                          embedding_template="minimal")
+
+
+def test_initialize_database_reloads_on_a_new_template(make_rag):
+    rag = make_rag(rows=50)
+
+    reloaded = initialize_database(CSV_PATH, interactive=False, embedding_template="minimal",
+                                   db_path=rag.db_path, embedder=HashingEmbedder())
+
+    assert reloaded.embedding_template == "minimal"
+    assert reloaded.order_store.get_setting("embedding_template") == "minimal"
+    document = reloaded.collection.get(limit=1)['documents'][0]
+    assert "\n" not in document and " - payment " in document
@@ -0,0 +1,108 @@
+"""
+Tests for typo-tolerant vendor, item and intent lookup
+"""
+
+import random
+import string
+
+import pytest
+
+from fuzzy_index import TrigramIndex, bounded_edit_distance
+
+
+VENDORS = ['ABC Textiles', 'Lakshmi Fabrics', 'Sakthi Traders', 'Sri Yarn Mills', 'Vijay Spinning']
+ITEMS = ['Cotton Yarn', 'Dyed Fabric', 'Grey Fabric', 'Knitted Cloth', 'Polyester Yarn']
+
+
+@pytest.fixture(scope="module")
+def index():
+    index = TrigramIndex()
+    index.add('payment', "intent")
+    index.add('status', "intent")
+    index.add('status', "intent", alias='stat')
+    for vendor in VENDORS:
+        index.add_vendor(vendor)
+    for item in ITEMS:
+        index.add(item, "item")
+    return index
+
+
+@pytest.mark.parametrize("a, b, expected", [
+    ("lakshmi", "lakshmi", 0),
+    ("laksmi", "lakshmi", 1),
+    ("trdaers", "traders", 1),
+    ("fabrcs", "fabrics", 1),
+    ("abc", "xyz", 3),
+])
+def test_bounded_edit_distance(a, b, expected):
+    assert bounded_edit_distance(a, b, 3) == expected
+
+
+@pytest.mark.parametrize("query, vendor", [
+    ("Laksmi Fabrcs orders", "Lakshmi Fabrics"),
+    ("laksmi orders", "Lakshmi Fabrics"),
+    ("sakthi trdaers", "Sakthi Traders"),
+    ("abc textils gst", "ABC Textiles"),
+    ("sri yarn mils", "Sri Yarn Mills"),
+    ("vijay spinnig total", "Vijay Spinning"),
+    ("total spent by vijai", "Vijay Spinning"),
+])
+def test_misspelled_vendors_resolve(index, query, vendor):
+    found, confidence = index.find_in_text(query, "vendor")
+
+    assert found == vendor
+    assert 0.7 <= confidence < 1.0
+
+
+@pytest.mark.parametrize("query", [
+    "list all textiles",
+    "show all mills",
+    "all traders orders",
+    "cotton yarn orders",
+    "state tamil nadu",
+])
+def test_generic_words_do_not_resolve_a_vendor(index, query):
+    assert index.find_in_text(query, "vendor") == (None, 0.0)
+
+
+def test_misspelled_items_resolve(index):
+    assert index.find_in_text("polyster yarn orders", "item")[0] == "Polyester Yarn"
+    assert index.find_in_text("knited cloth", "item")[0] == "Knitted Cloth"
+
+
+@pytest.mark.parametrize("query, intent, expected", [
+    ("paymnet status", "payment", True),
+    ("sakthi statsu", "status", True),
+    ("stat of abc textiles", "status", True),
+    ("state tamil nadu", "status", False),
+    ("orders from tamil nadu", "payment", False),
+])
+def test_intents(index, query, intent, expected):
+    assert index.has_intent(query, intent) is expected
+
+
+def test_lookup_scores_only_a_few_candidates(index):
+    # Lookup cost is edit distance over the trigram candidates, so it stays
+    # flat however many vendors are indexed
+    rng = random.Random(0)
+    large = TrigramIndex()
+    for vendor in VENDORS:
+        large.add_vendor(vendor)
+    for _ in range(5000):
+        large.add_vendor(" ".join("".join(rng.choices(string.ascii_lowercase, k=7)) for _ in range(2)))
+
+    for text in ["laksmi fabrcs", "vijai", "sakthi trdaers", "polyester"]:
+        assert len(large._candidates(text, "vendor")) < len(large) // 100
+    assert large.find_in_text("Laksmi Fabrcs orders", "vendor")[0] == "Lakshmi Fabrics"
+
+
+@pytest.mark.parametrize("query", ["list all textiles", "show yarn mills orders", "orders from tamil nadu state"])
+def test_generic_questions_are_not_vendor_questions(rag, query):
+    assert rag.resolve_vendor(query)[0] is None
+
+
+def test_vendor_typo_is_reported(rag):
+    answer = rag.answer_query("total spent by Laksmi Fabrcs")
+
+    assert answer.startswith("🔎 Showing results for Lakshmi Fabrics")
+    assert "Total amount spent by Lakshmi Fabrics" in answer
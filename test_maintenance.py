@@ -0,0 +1,57 @@
+"""
+Tests for maintenance schedules and index rebuilds running next to inserts
+"""
+
+import threading
+import time
+
+import pytest
+
+from conftest import new_order
+from maintenance import DEFAULT_SCHEDULES, parse_schedules
+from serve import WRITER_SCHEDULES
+
+
+def test_snapshot_job_only_runs_under_serve():
+    assert parse_schedules("")['snapshot'] == 0
+    assert parse_schedules("", WRITER_SCHEDULES)['snapshot'] == 1800
+    assert parse_schedules("snapshot=0,compact=12h", WRITER_SCHEDULES) == {
+        **DEFAULT_SCHEDULES, 'snapshot': 0, 'compact': 12 * 3600}
+
+
+def test_bad_schedule_entries_are_refused():
+    with pytest.raises(ValueError, match="vacuum"):
+        parse_schedules("vacuum=1h")
+    with pytest.raises(ValueError, match="compact"):
+        parse_schedules("compact=soon")
+
+
+def test_insert_during_side_index_rebuild_is_kept(rag, orders, monkeypatch):
+    rag.get_term_index()
+    rag.get_suggestion_index()
+    rag.get_duplicate_index()
+    building = threading.Event()
+    term_sources = rag._term_sources
+
+    def slow_sources():
+        # The rebuild has read the stored names; an insert now must not be lost
+        sources = term_sources()
+        building.set()
+        time.sleep(0.3)
+        return sources
+
+    monkeypatch.setattr(rag, "_term_sources", slow_sources)
+    rebuild = threading.Thread(target=rag.rebuild_side_indexes)
+    rebuild.start()
+    building.wait()
+    order = new_order(orders, 9001, vendor_name="Kaveri Weaves", item_name="Silk Thread")
+    assert rag.add_new_order(order, on_duplicate="allow")
+    # The insert didn't wait for the rebuild to finish
+    assert rebuild.is_alive()
+    rebuild.join()
+
+    assert "Kaveri Weaves" in rag._vendor_names
+    assert rag.get_term_index().find_in_text("orders from kaveri weaves", "vendor")[0] == "Kaveri Weaves"
+    assert {"type": "item", "value": "Silk Thread"} in rag.suggest("silk")['suggestions']
+    assert rag.find_duplicate(new_order(orders, 9002, vendor_name="Kaveri Weaves",
+                                        item_name="Silk Thread"))['duplicate_of'] == "order_9001"
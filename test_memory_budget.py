@@ -0,0 +1,73 @@
+"""
+Tests for the memory budget over caches and indexes
+"""
+
+import memory_budget
+from memory_budget import MB, MemoryBudget
+
+
+class Cache:
+    def __init__(self, size_mb):
+        self.size = int(size_mb * MB)
+
+    def evict(self, _bytes_to_free):
+        self.size = 0
+
+
+def test_evicts_the_least_valuable_component_first():
+    budget = MemoryBudget(budget_mb=10)
+    cheap, costly, pinned = Cache(6), Cache(6), Cache(4)
+    budget.register('cheap', lambda: cheap.size, cheap.evict, rebuild_seconds=0.01)
+    budget.register('costly', lambda: costly.size, costly.evict, rebuild_seconds=5.0)
+    budget.register('pinned', lambda: pinned.size)
+
+    assert budget.enforce() == ['cheap']
+    assert (cheap.size, costly.size, pinned.size) == (0, int(6 * MB), int(4 * MB))
+    assert budget.enforce() == []
+
+
+def test_report_and_metrics():
+    budget = MemoryBudget(budget_mb=1)
+    cache = Cache(2)
+    budget.register('cache', lambda: cache.size, cache.evict)
+    budget.enforce()
+
+    report = budget.report()
+    assert report['components'][0]['evictions'] == 1
+    assert report['total_bytes'] == 0
+    assert 'sakthi_memory_evictions_total{component="cache"} 1' in budget.metrics()
+
+
+def test_rag_answers_the_same_after_evicting_everything(rag):
+    query = "total spent by Lakshmi Fabrics"
+    answer = rag.answer_query(query)
+    rag.get_suggestion_index()
+    rag.get_duplicate_index()
+    rag.memory.budget_bytes = 0
+
+    evicted = rag.memory.enforce()
+
+    assert {'term_index', 'suggestion_index', 'duplicate_index'} <= set(evicted)
+    assert rag.answer_query(query) == answer
+    assert rag.suggest("laksh")['suggestions']
+
+
+def test_touched_component_is_kept():
+    budget = MemoryBudget(budget_mb=1)
+    used, idle = Cache(2), Cache(2)
+    budget.register('used', lambda: used.size, used.evict, rebuild_seconds=0.01)
+    budget.register('idle', lambda: idle.size, idle.evict, rebuild_seconds=5.0)
+
+    budget.touch('used')
+
+    assert used.size == int(2 * MB) and idle.size == 0
+
+
+def test_getters_return_their_index_when_over_budget(rag, monkeypatch):
+    monkeypatch.setattr(memory_budget, "ENFORCE_INTERVAL", 0)
+    rag.memory.budget_bytes = 0
+
+    assert rag.get_term_index() is not None
+    assert rag.get_suggestion_index() is not None
+    assert rag.get_duplicate_index() is not None
+    assert rag.get_quantized_index() is not None
@@ -0,0 +1,127 @@
+"""
+Tests for date scopes and the time-partitioned vector index
+"""
+
+import threading
+
+import numpy as np
+import pytest
+
+from conftest import new_order
+from partitions import COMPACT_EVERY, PartitionedIndex
+from rag_system import parse_date_scope
+
+
+def stored_ids(rag):
+    return set(rag.collection.get(include=[])['ids'])
+
+
+def partition_ids(partitions):
+    return {order_id for key in partitions.keys() for order_id in partitions._get(key).ids}
+
+
+@pytest.mark.parametrize("query, scope", [
+    ("dyed fabric orders in march 2025", ("2025-03-01", "2025-03-31")),
+    ("feb 2024 payments", ("2024-02-01", "2024-02-29")),
+    ("grey fabric q4 2025", ("2025-10-01", "2025-12-31")),
+    ("orders in 2025", ("2025-01-01", "2025-12-31")),
+    ("pending during 2024", ("2024-01-01", "2024-12-31")),
+    ("fy 2025 totals", ("2025-01-01", "2025-12-31")),
+])
+def test_date_scopes(query, scope):
+    assert parse_date_scope(query) == scope
+
+
+@pytest.mark.parametrize("query", [
+    "order 2031",
+    "status of invoice 2045",
+    "2000 kg of cotton yarn",
+    "orders above 2500 rupees",
+    "may i see pending orders",
+])
+def test_numbers_are_not_date_scopes(query):
+    assert parse_date_scope(query) == (None, None)
+
+
+def test_fan_out_merges_partitions_like_a_single_scan(tmp_path):
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(600, 32)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    ids = [f"order_{i}" for i in range(len(vectors))]
+    metadatas = [{'vendor_name': "v", 'order_date': f"2025-{i % 12 + 1:02d}-10"} for i in range(len(ids))]
+    partitions = PartitionedIndex(str(tmp_path / "partitions"))
+    partitions.rebuild(ids, vectors, metadatas)
+    query = rng.normal(size=32).astype(np.float32)
+
+    found, distances = partitions.search(query, k=10)
+
+    exact = [ids[i] for i in np.argsort(-(vectors @ query))[:10]]
+    assert len(partitions.keys()) == 12
+    assert len(set(found) & set(exact)) >= 9
+    assert distances == sorted(distances)
+    scoped, _ = partitions.search(query, k=10, date_from="2025-03-01", date_to="2025-03-31")
+    assert scoped and all(int(order_id.split("_")[1]) % 12 == 2 for order_id in scoped)
+
+
+def test_rebuild_swaps_while_searching(tmp_path):
+    rng = np.random.default_rng(2)
+    vectors = rng.normal(size=(300, 16)).astype(np.float32)
+    ids = [f"order_{i}" for i in range(len(vectors))]
+    metadatas = [{'vendor_name': "v", 'order_date': f"2025-{i % 6 + 1:02d}-01"} for i in range(len(ids))]
+    partitions = PartitionedIndex(str(tmp_path / "partitions"))
+    partitions.rebuild(ids, vectors, metadatas)
+    errors, done = [], threading.Event()
+
+    def search():
+        while not done.is_set():
+            try:
+                partitions.search(vectors[0], k=5)
+            except Exception as e:
+                errors.append(e)
+
+    searcher = threading.Thread(target=search)
+    searcher.start()
+    for _ in range(10):
+        partitions.rebuild(ids, vectors, metadatas)
+    done.set()
+    searcher.join()
+
+    assert not errors
+    assert partitions.count() == len(ids)
+
+
+def test_bulk_add_updates_partitions_without_a_rebuild(make_rag, orders):
+    rag = make_rag(rows=300, partition_by="month")
+    rag.query("cotton yarn", date_from="2025-01-01", date_to="2025-12-31")
+    rag.build_partitions = None
+
+    rag.add_orders_to_db(orders.iloc[300:400])
+
+    assert partition_ids(rag.partitions) == stored_ids(rag)
+
+
+def test_single_adds_are_written_in_batches(make_rag, orders):
+    rag = make_rag(rows=300, partition_by="month")
+    rag.query("cotton yarn")
+    key = rag.partitions.keys()[0]
+    order_date = rag.partitions._get(key).dates[0]
+
+    for order_id in range(9001, 9001 + COMPACT_EVERY - 1):
+        assert rag.add_new_order(new_order(orders, order_id, order_date=order_date), on_duplicate="allow")
+    assert rag.partitions._get(key).pending == COMPACT_EVERY - 1
+
+    assert rag.add_new_order(new_order(orders, 9100, order_date=order_date), on_duplicate="allow")
+    assert rag.partitions._get(key).pending == 0
+    assert rag.partitions.count() == rag.collection.count()
+
+
+def test_pending_partition_orders_survive_a_restart(make_rag, orders):
+    rag = make_rag(rows=300, partition_by="month")
+    rag.query("cotton yarn")
+    assert rag.add_new_order(new_order(orders, 9001), on_duplicate="allow")
+
+    restarted = make_rag(rows=0, partition_by="month")
+
+    found = restarted.query(orders.iloc[0]['item_name'], n_results=400)['ids'][0]
+    assert "order_9001" in found
+    assert partition_ids(restarted.partitions) == stored_ids(restarted)
@@ -0,0 +1,122 @@
+"""
+Tests for the quantized vector tier and keeping it in step with the collection
+"""
+
+import json
+import os
+
+import numpy as np
+
+from conftest import new_order
+from offline_embedder import HashingEmbedder
+from quantized_index import QuantizedVectorIndex
+from rag_system import SakthiTextilesRAG
+
+
+QUERIES = ["pending payment for cotton yarn", "grey fabric partial payment", "Vijay Spinning dyed fabric"]
+
+
+def stored_ids(rag):
+    return set(rag.collection.get(include=[])['ids'])
+
+
+def test_recall_against_exact_scan(tmp_path):
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(2000, 64)).astype(np.float32)
+    ids = [f"order_{i}" for i in range(len(vectors))]
+    index = QuantizedVectorIndex.build(str(tmp_path), ids, vectors, ["v"] * len(ids))
+    full = np.asarray(index.full)
+
+    recalls = []
+    for query in rng.normal(size=(20, 64)).astype(np.float32):
+        expected = {ids[i] for i in np.argsort(-(full @ query))[:10]}
+        found, _ = index.search(query, k=10)
+        recalls.append(len(expected & set(found)) / 10)
+
+    assert np.mean(recalls) >= 0.95
+
+
+def test_quantized_query_matches_collection(rag):
+    rag.build_quantized_index()
+
+    for query in QUERIES:
+        quantized = rag.query(query, n_results=5, use_quantized=True)['ids'][0]
+        exact = rag.query(query, n_results=5)['ids'][0]
+        assert len(set(quantized) & set(exact)) >= 4
+
+
+def test_bulk_add_reaches_open_tier(make_rag, orders):
+    rag = make_rag(rows=300)
+    rag.build_quantized_index()
+
+    rag.add_orders_to_db(orders.iloc[300:400])
+
+    assert set(rag.quantized_index.ids) == stored_ids(rag)
+    assert rag.quantized_index.pending == 0
+
+
+def test_closed_tier_catches_up_when_opened(make_rag, orders):
+    rag = make_rag(rows=300)
+    rag.build_quantized_index()
+    rag.quantized_index = None
+
+    rag.add_orders_to_db(orders.iloc[300:400])
+    assert rag.add_new_order(new_order(orders, 9001), on_duplicate="allow")
+
+    assert set(rag.get_quantized_index().ids) == stored_ids(rag)
+
+
+def test_pending_orders_survive_a_restart(make_rag, orders):
+    rag = make_rag(rows=300)
+    rag.build_quantized_index()
+    assert rag.add_new_order(new_order(orders, 9001), on_duplicate="allow")
+    assert rag.quantized_index.pending == 1
+
+    restarted = SakthiTextilesRAG(db_path=rag.db_path, embedder=HashingEmbedder())
+
+    assert "order_9001" in restarted.get_quantized_index().ids
+    found = restarted.query(orders.iloc[0]['item_name'], n_results=400, use_quantized=True)['ids'][0]
+    assert "order_9001" in found
+
+
+def test_tier_with_removed_orders_is_rebuilt(rag):
+    rag.build_quantized_index()
+    rag.quantized_index = None
+    removed = sorted(stored_ids(rag))[:10]
+    rag.collection.delete(ids=removed)
+
+    index = rag.get_quantized_index()
+
+    assert set(index.ids) == stored_ids(rag)
+    assert not set(removed) & set(index.ids)
+
+
+def test_compact_appends_in_place(tmp_path):
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(50, 16)).astype(np.float32)
+    index = QuantizedVectorIndex.build(str(tmp_path), [f"order_{i}" for i in range(50)], vectors,
+                                       ["ABC Textiles"] * 50, dates=["2024-05-01"] * 50)
+    # The vectors are appended to; only the id column is rewritten, to widen it for the long id
+    inodes = {name: os.stat(tmp_path / name).st_ino for name in ("full.npy", "quantized.npy", "vendor_codes.npy")}
+    new_id = "order_" + "9" * 30
+
+    index.add(new_id, vectors[0], "Kaveri Weaves", "2025-01-02")
+    index = index.compact()
+
+    assert {name: os.stat(tmp_path / name).st_ino for name in inodes} == inodes
+    assert len(index) == 51 and index.pending == 0 and index.ids[-1] == new_id
+    assert index.search(vectors[0], k=5, vendor_filter="Kaveri Weaves")[0] == [new_id]
+    assert index.search(vectors[0], k=5, date_range=("2025-01-01", "2025-01-31"))[0] == [new_id]
+    assert QuantizedVectorIndex(str(tmp_path)).ids == index.ids
+
+
+def test_index_with_metadata_lists_is_migrated(tmp_path):
+    vectors = np.eye(4, dtype=np.float32)
+    QuantizedVectorIndex.build(str(tmp_path), ["a", "b", "c", "d"], vectors, ["v", "w", "v", "w"])
+    with open(tmp_path / "meta.json", "w", encoding="utf-8") as f:
+        json.dump({"dtype": "int8", "ids": ["a", "b", "c", "d"], "vendors": ["v", "w", "v", "w"], "dates": None}, f)
+
+    index = QuantizedVectorIndex(str(tmp_path))
+
+    assert index.ids == ["a", "b", "c", "d"] and QuantizedVectorIndex.stored_count(str(tmp_path)) == 4
+    assert index.search(vectors[1], k=4, vendor_filter="w")[0] == ["b", "d"]
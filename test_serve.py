@@ -0,0 +1,124 @@
+"""
+Tests for the writer/worker handoff of serve.py
+"""
+
+import os
+import socket
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+
+import pytest
+
+import serve
+from conftest import new_order
+from offline_embedder import HashingEmbedder
+from serve import OrderWriter, SnapshotRAG
+from snapshot import IndexGeneration, publish_generation
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def served(rag):
+    """A writer over rag serving on a local port, and a worker reading its generations"""
+    root = os.path.join(rag.db_path, "generations")
+    writer = OrderWriter(rag, root, publish_interval=0.05)
+    writer.publish()
+    address, authkey = ("127.0.0.1", free_port()), os.urandom(32)
+    threading.Thread(target=writer.serve, args=(address, authkey), daemon=True).start()
+    time.sleep(0.2)
+    worker = SnapshotRAG(root, HashingEmbedder(), address, authkey, db_path=rag.db_path, refresh_interval=0)
+    return writer, worker, address
+
+
+def test_worker_answers_like_the_writer(rag, served):
+    _, worker, _ = served
+
+    for query in ["total spent by Sakthi Traders", "items ordered by ABC Textiles", "gst number of Vijay Spinning"]:
+        assert worker.answer_query(query) == rag.answer_query(query)
+
+
+def test_orders_added_through_a_worker_reach_every_reader(rag, orders, served):
+    writer, worker, _ = served
+    first, second = worker.next_order_id(), worker.next_order_id()
+    assert second == first + 1
+
+    published = worker.generation.name
+    assert worker.add_new_order(new_order(orders, first, vendor_name="Kaveri Weaves"), on_duplicate="allow")
+    assert rag.order_store.existing([f"order_{first}"]) == {f"order_{first}"}
+
+    deadline = time.monotonic() + 5
+    while worker.generation.name == published:
+        assert time.monotonic() < deadline, "no generation published after the insert"
+        time.sleep(0.05)
+        worker.refresh()
+    assert writer.snapshot() is None
+    assert "Kaveri Weaves" in worker.get_all_vendor_names()
+    assert worker.answer_query("total spent by Kaveri Weaves") == rag.answer_query("total spent by Kaveri Weaves")
+
+
+def test_writer_refuses_other_keys_and_keeps_serving(served):
+    _, worker, address = served
+    order_id = worker.next_order_id()
+
+    with pytest.raises(AuthenticationError):
+        Client(address, authkey=os.urandom(32))
+    Client(address).close()
+
+    assert worker.next_order_id() == order_id + 1
+
+
+def test_generations_in_use_are_kept(rag):
+    root = os.path.join(rag.db_path, "generations")
+    first = publish_generation(rag.collection, root)
+    generation = IndexGeneration(root, first)
+    for _ in range(3):
+        publish_generation(rag.collection, root)
+    assert os.path.isdir(os.path.join(root, first))
+
+    generation.close()
+    publish_generation(rag.collection, root)
+    assert not os.path.exists(os.path.join(root, first))
+
+
+def test_refresh_retries_a_removed_generation(served, monkeypatch):
+    writer, worker, _ = served
+    latest = writer.publish()
+    names = iter(["gen-0", latest])
+    monkeypatch.setattr(serve, "current_generation", lambda root: next(names))
+
+    worker.refresh()
+
+    assert worker.generation.name == latest
+
+
+def test_publish_does_not_block_inserts(served, orders, monkeypatch):
+    writer, worker, _ = served
+    exporting, release = threading.Event(), threading.Event()
+
+    def slow_publish(collection, root):
+        exporting.set()
+        release.wait(5)
+        return publish_generation(collection, root)
+
+    monkeypatch.setattr(serve, "publish_generation", slow_publish)
+    order = new_order(orders, worker.next_order_id(), vendor_name="Kaveri Weaves")
+    publisher = threading.Thread(target=writer.publish)
+    publisher.start()
+    assert exporting.wait(5)
+    added = []
+    adder = threading.Thread(target=lambda: added.append(worker.add_new_order(order, on_duplicate="allow")))
+    adder.start()
+    adder.join(3)
+    finished_during_export = not adder.is_alive()
+    release.set()
+    publisher.join()
+    adder.join()
+
+    assert finished_during_export and added == [True]
@@ -0,0 +1,63 @@
+"""
+Tests for follow-up questions answered from the session context
+"""
+
+import pytest
+
+from session_cache import SessionContext
+
+
+VENDOR = "Sakthi Traders"
+
+
+@pytest.fixture
+def session(rag):
+    session = SessionContext("test")
+    rag.answer_query(f"show orders for {VENDOR}", session=session)
+    return session
+
+
+@pytest.mark.parametrize("query", [
+    "their gst number?",
+    "and their payment status?",
+    "gst number?",
+    "and also the total",
+])
+def test_followup_uses_previous_vendor(rag, session, query):
+    assert rag._is_followup(query)
+    assert rag.answer_query(query, session=session) == rag.answer_query(f"{query} {VENDOR}")
+
+
+def test_more_pages_the_last_listing(rag, session):
+    shown = session.offset
+
+    answer = rag.answer_query("more", session=session)
+
+    assert answer.startswith(f"More orders for {VENDOR} ({shown + 1}-")
+    assert session.offset > shown
+
+
+def test_payment_status_filters_the_previous_vendor(rag, session):
+    answer = rag.answer_query("pending ones", session=session)
+
+    assert answer.startswith((f"Pending orders for {VENDOR}", f"No pending orders for {VENDOR}"))
+
+
+@pytest.mark.parametrize("query", [
+    "show all pending payments",
+    "list all orders with pending payment",
+    "tell me more about cotton yarn",
+    "cotton yarn and polyester yarn",
+    "pending cotton yarn orders",
+    "what else did we order next to grey fabric last quarter",
+])
+def test_other_questions_are_not_captured_by_the_session(rag, session, query):
+    assert not rag._is_followup(query)
+    assert rag.answer_query(query, session=session) == rag.answer_query(query)
+
+
+def test_new_vendor_replaces_the_session_vendor(rag, session):
+    rag.answer_query("total spent by ABC Textiles", session=session)
+
+    assert session.vendor == "ABC Textiles"
+    assert rag.answer_query("their gst number?", session=session).startswith("GST Number of ABC Textiles")
@@ -0,0 +1,58 @@
+"""
+Tests for order validation, normalisation and quarantine
+"""
+
+import json
+
+from validation import validate_order, validate_orders
+
+
+def test_shipped_orders_are_valid(orders):
+    valid, rejected, report = validate_orders(orders.head(1000), chunk_rows=300)
+
+    assert len(valid) == 1000 and rejected.empty
+    assert report.rejected == 0
+
+
+def test_fields_are_normalised(orders):
+    order = orders.iloc[0].to_dict()
+    order.update(order_date="18-03-2025", invoice_date="18/03/2025", payment_status="paid",
+                 gst_number=" " + order['gst_number'].lower())
+
+    normalised, errors = validate_order(order)
+
+    assert errors == []
+    assert (normalised['order_date'], normalised['invoice_date']) == ("2025-03-18", "2025-03-18")
+    assert normalised['payment_status'] == "Paid"
+    assert normalised['gst_number'] == orders.iloc[0]['gst_number']
+
+
+def test_invalid_rows_are_rejected_with_reasons(orders):
+    df = orders.head(4).copy()
+    df.loc[0, 'gst_number'] = "12345"
+    df.loc[1, 'order_date'] = "sometime"
+    df.loc[2, 'quantity'] = -1
+    df.loc[3, 'total_tax'] = df.loc[3, 'total_tax'] + 10
+
+    valid, rejected, _ = validate_orders(df)
+
+    assert valid.empty
+    errors = rejected['errors'].tolist()
+    assert "bad gst_number" in errors[0]
+    assert "bad order_date" in errors[1]
+    assert "bad quantity" in errors[2]
+    assert "cgst+sgst != total_tax" in errors[3]
+
+
+def test_invalid_orders_are_quarantined(rag, orders):
+    count = rag.collection.count()
+    df = orders.iloc[600:603].copy()
+    df.loc[df.index[0], 'payment_status'] = "Overdue"
+
+    rag.add_orders_to_db(df)
+
+    assert rag.collection.count() == count + 2
+    with open(rag.quarantine_path, encoding="utf-8") as f:
+        quarantined = [json.loads(line) for line in f]
+    assert [row['order_id'] for row in quarantined] == [int(df.iloc[0]['order_id'])]
+    assert quarantined[0]['errors'] == "bad payment_status"
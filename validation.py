@@ -0,0 +1,192 @@
+"""
+Columnar validation and normalisation of orders before they are indexed
+
+Every check runs as a pandas/NumPy operation over a whole chunk of rows:
+GST number format, date parsing (normalised to ISO YYYY-MM-DD), tax
+reconciliation and allowed values for the status and mode columns. Rows
+failing any check are returned separately with the reasons, so callers can
+quarantine them instead of indexing them.
+"""
+
+import os
+import time
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# 13-character codes used in our data (33SAKTR1121Z4) and full 15-character GSTINs (33ABCDE1234F1Z2)
+GST_PATTERN = r"^\d{2}[A-Z]{5}\d{4}(?:[A-Z][1-9A-Z])?Z[0-9A-Z]$"
+
+# Tried in order; day-first forms are the ones people type ("18-03-2025")
+DATE_FORMATS = ("%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y", "%Y/%m/%d", "%d.%m.%Y")
+
+REQUIRED_DATE_COLUMNS = ('order_date',)
+OPTIONAL_DATE_COLUMNS = ('invoice_date', 'delivery_date', 'payment_due_date', 'payment_date')
+
+ENUM_VALUES = {
+    'payment_status': ('Paid', 'Pending', 'Partial'),
+    'payment_mode': ('NEFT', 'RTGS', 'UPI', 'Cheque'),
+    'transport_mode': ('Road', 'Courier'),
+    'quality_check_status': ('Approved', 'Rejected', 'Pending'),
+}
+
+AMOUNT_COLUMNS = ('quantity', 'unit_price', 'taxable_amount', 'cgst_amount', 'sgst_amount',
+                  'total_tax', 'total_invoice_amount')
+
+# Rupees of rounding tolerated when reconciling tax totals
+TAX_TOLERANCE = 0.05
+
+# Columns whose values may be rewritten into normalised form
+NORMALISED_COLUMNS = (('gst_number',) + REQUIRED_DATE_COLUMNS + OPTIONAL_DATE_COLUMNS
+                      + tuple(ENUM_VALUES) + AMOUNT_COLUMNS)
+
+
+class ValidationReport:
+    """Counts and throughput of one validation run"""
+
+    def __init__(self, rows: int, valid: int, seconds: float):
+        self.rows = rows
+        self.valid = valid
+        self.rejected = rows - valid
+        self.seconds = seconds
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else float('inf')
+
+    def __str__(self) -> str:
+        return (f"Validated {self.rows} orders in {self.seconds * 1000:.1f} ms "
+                f"({self.rows_per_second:,.0f} rows/s): {self.valid} valid, {self.rejected} rejected")
+
+
+def _text(df: pd.DataFrame, column: str) -> pd.Series:
+    """A column as stripped strings, empty where missing"""
+    if column not in df:
+        return pd.Series("", index=df.index, dtype=object)
+    values = df[column]
+    return values.where(values.notna(), "").astype(str).str.strip()
+
+
+def parse_dates(values: pd.Series) -> pd.Series:
+    """Parse dates in any DATE_FORMATS into ISO strings (NaN where unparseable)"""
+    text = values.str[:10]
+    parsed = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+    for date_format in DATE_FORMATS:
+        missing = parsed.isna()
+        if not missing.any():
+            break
+        parsed[missing] = pd.to_datetime(text[missing], format=date_format, errors="coerce")
+    return parsed.dt.strftime("%Y-%m-%d")
+
+
+def _validate_chunk(df: pd.DataFrame) -> Tuple[pd.DataFrame, np.ndarray]:
+    """Normalise one chunk and return it with the per-row error text"""
+    df = df.copy()
+    errors = np.full(len(df), "", dtype=object)
+
+    def fail(mask, reason: str):
+        mask = np.asarray(mask, dtype=bool)
+        errors[mask] = errors[mask] + reason + "; "
+
+    for column in ('vendor_name', 'item_name'):
+        fail(_text(df, column) == "", f"missing {column}")
+
+    gst = _text(df, 'gst_number').str.upper().str.replace(" ", "", regex=False)
+    fail(~gst.str.match(GST_PATTERN), "bad gst_number")
+    df['gst_number'] = gst
+
+    for column in REQUIRED_DATE_COLUMNS + OPTIONAL_DATE_COLUMNS:
+        text = _text(df, column)
+        dates = parse_dates(text)
+        present = (text != "") & (text.str.lower() != "nan")
+        if column in REQUIRED_DATE_COLUMNS:
+            fail(dates.isna(), f"bad {column}")
+        else:
+            fail(present & dates.isna(), f"bad {column}")
+        if column in df:
+            df[column] = dates.where(present, df[column])
+
+    for column, allowed in ENUM_VALUES.items():
+        if column not in df:
+            continue
+        text = _text(df, column)
+        canonical = text.str.lower().map({value.lower(): value for value in allowed})
+        fail(canonical.isna(), f"bad {column}")
+        df[column] = canonical.fillna(text)
+
+    amounts = {}
+    for column in AMOUNT_COLUMNS:
+        values = pd.to_numeric(df[column], errors="coerce") if column in df else pd.Series(np.nan, index=df.index)
+        fail(values.isna() | (values < 0), f"bad {column}")
+        amounts[column] = values.to_numpy(dtype=float)
+        if column in df:
+            df[column] = values
+    fail(amounts['quantity'] <= 0, "quantity not positive")
+
+    with np.errstate(invalid="ignore"):
+        fail(np.abs(amounts['cgst_amount'] + amounts['sgst_amount'] - amounts['total_tax']) > TAX_TOLERANCE,
+             "cgst+sgst != total_tax")
+        fail(np.abs(amounts['taxable_amount'] + amounts['total_tax'] - amounts['total_invoice_amount']) > TAX_TOLERANCE,
+             "taxable+tax != total_invoice_amount")
+
+    return df, errors
+
+
+def validate_orders(df: pd.DataFrame, chunk_rows: int = 50000) -> Tuple[pd.DataFrame, pd.DataFrame, ValidationReport]:
+    """
+    Validate and normalise orders chunk by chunk
+
+    Args:
+        df: Orders as read from the CSV (or built from a form)
+        chunk_rows: Rows checked per vectorised pass
+
+    Returns:
+        Tuple of (valid normalised rows, rejected rows with an "errors" column, report)
+    """
+    started = time.perf_counter()
+    valid_parts, rejected_parts = [], []
+    for start in range(0, len(df), chunk_rows):
+        chunk, errors = _validate_chunk(df.iloc[start:start + chunk_rows])
+        bad = errors != ""
+        valid_parts.append(chunk[~bad])
+        if bad.any():
+            rejected = df.iloc[start:start + chunk_rows][bad].copy()
+            rejected['errors'] = [text.rstrip("; ") for text in errors[bad]]
+            rejected_parts.append(rejected)
+
+    valid = pd.concat(valid_parts) if valid_parts else df.iloc[0:0]
+    rejected = pd.concat(rejected_parts) if rejected_parts else df.iloc[0:0].assign(errors=[])
+    report = ValidationReport(len(df), len(valid), time.perf_counter() - started)
+    return valid, rejected, report
+
+
+def validate_order(order_data: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Validate a single order (e.g. from the add-order form)
+
+    Returns:
+        Tuple of (order with normalised fields, list of errors; empty when valid)
+    """
+    valid, rejected, _ = validate_orders(pd.DataFrame([order_data]))
+    if len(rejected):
+        return order_data, rejected['errors'].iloc[0].split("; ")
+    row = valid.iloc[0]
+    normalised = dict(order_data)
+    for column in NORMALISED_COLUMNS:
+        if column in order_data:
+            value = row[column]
+            normalised[column] = value.item() if hasattr(value, 'item') else value
+    return normalised, []
+
+
+def quarantine(rejected: pd.DataFrame, path: str):
+    """Append rejected rows (with their errors and a timestamp) to a JSON-lines side file"""
+    if rejected.empty:
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    rows = rejected.assign(quarantined_at=pd.Timestamp.now().strftime("%Y-%m-%d %H:%M:%S"))
+    text = rows.to_json(orient="records", lines=True, date_format="iso")
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(text if text.endswith("\n") else text + "\n")